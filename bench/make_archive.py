@@ -0,0 +1,97 @@
+'''
+Generates a synthetic run archive for benchmarking s6RunlistGen.py.
+
+Writes <outDir>/stage5_<nruns>.txt with stage5 paths and matching VERITAS.sqlite /
+VOFFLINE.sqlite tables (tblRun_Info, tblRun_Analysis_Comments) that can be read with
+--dbBackend sqlite --dbDir <outDir>, or through bench/fakebin/mysql.
+
+Run IDs are 5 digits (as in /path/<RUN ID>.stage5.root), so lists longer than 90000
+runs repeat run IDs under different source directories.
+'''
+
+import os
+import sys
+import random
+import argparse
+
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from s6listgen import db
+
+
+FIRST_RUN = 10000
+LAST_RUN = 99999
+FIRST_DATE = datetime(2007, 1, 1)
+LAST_DATE = datetime(2016, 6, 1)
+
+#(value, weight) distributions loosely following the real archive
+CONFIG_MASKS = [(15, 80), (7, 4), (11, 4), (13, 4), (14, 4), (0, 2), (3, 1), (12, 1)]
+TEL_CUT_MASKS = [(None, 70), ('0', 15), ('1', 4), ('2', 3), ('4', 3), ('8', 3), ('12', 1), ('3', 1)]
+RUN_TYPES = [('observing', 90), ('obsFilter', 5), ('obsLowHV', 5)]
+DATA_CATEGORIES = [('science', 85), (None, 5), ('moonfilter', 4), ('reducedhv', 4), ('calibration', 2)]
+
+
+def weighted(rng, choices):
+  total = sum(w for v, w in choices)
+  x = rng.uniform(0, total)
+  for value, weight in choices:
+    x -= weight
+    if x <= 0:
+      return value
+  return choices[-1][0]
+
+
+def make_archive(outDir, nruns, seed=0, missing=0.01):
+  '''writes the stage5 list & sqlite tables for nruns runs, returns the path of the list'''
+  rng = random.Random(seed)
+  if not os.path.isdir(outDir):
+    os.makedirs(outDir)
+  for database in ['VERITAS', 'VOFFLINE']:
+    path = os.path.join(outDir, '%s.sqlite' %(database))
+    if os.path.exists(path):
+      os.remove(path)
+
+  backend = db.SQLiteBackend(outDir)
+  backend.create_tables()
+
+  nunique = min(nruns, LAST_RUN - FIRST_RUN + 1)
+  step = (LAST_DATE - FIRST_DATE).total_seconds() / nunique
+  info = []
+  comments = []
+  for n in range(nunique):
+    runID = FIRST_RUN + n
+    start = FIRST_DATE + timedelta(seconds=n*step + rng.uniform(0, step/2))
+    end = start + timedelta(minutes=rng.choice([15, 20, 30, 30, 30]))
+    if rng.random() >= missing:
+      info.append((runID, start.strftime('%Y-%m-%d %H:%M:%S'), end.strftime('%Y-%m-%d %H:%M:%S'),
+                   weighted(rng, CONFIG_MASKS), weighted(rng, RUN_TYPES)))
+    if rng.random() >= missing:
+      comments.append((runID, weighted(rng, TEL_CUT_MASKS), weighted(rng, DATA_CATEGORIES)))
+
+  veritas = backend.connect('VERITAS')
+  veritas.executemany('insert into tblRun_Info values (?,?,?,?,?)', info)
+  veritas.commit()
+  voffline = backend.connect('VOFFLINE')
+  voffline.executemany('insert into tblRun_Analysis_Comments values (?,?,?)', comments)
+  voffline.commit()
+  backend.close()
+
+  listPath = os.path.join(outDir, 'stage5_%d.txt' %(nruns))
+  with open(listPath, 'w') as f:
+    for n in range(nruns):
+      f.write('/data/source%d/%d.stage5.root\n' %(n // nunique, FIRST_RUN + n % nunique))
+  return listPath
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Generates a synthetic stage5 list with matching VERITAS/VOFFLINE sqlite tables.')
+  parser.add_argument('outDir', help="Directory for the stage5 list and the sqlite files.")
+  parser.add_argument('nruns', type=int, help="Number of runs in the list.")
+  parser.add_argument('--seed', type=int, default=0, help="Random seed.")
+  parser.add_argument('--missing', type=float, default=0.01, help="Fraction of runs left out of each table.")
+  args = parser.parse_args()
+  print make_archive(args.outDir, args.nruns, args.seed, args.missing)
+
+if __name__ == '__main__':
+  main()
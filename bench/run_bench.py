@@ -0,0 +1,194 @@
+'''
+Benchmarks ListGen on synthetic run archives (see make_archive.py) or on a real stage5
+list replayed from recorded database responses.
+
+Every phase is timed separately:
+  query     - fetching the VOFFLINE/VERITAS rows, per database mode
+  classify  - get_atm, reconcile_tel_masks and get_array_config on their own, classify_run
+              for whole runs and the vectorized classify_runs
+  ea_names  - get_EA_file for every group and for every run
+  write     - print_runlist into a file
+
+Results are written as JSON (one record per size/phase/mode) together with the git
+commit, so runs from different commits can be compared.
+
+  python2 bench/run_bench.py --sizes 1000,10000,200000 --out bench_results.json
+  python2 bench/run_bench.py --infile real.txt --replay responses.json
+'''
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+from contextlib import contextmanager
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+from s6listgen import db
+from s6listgen import preflight
+from s6listgen.core import ListGen
+import make_archive
+
+#database modes: (backend, batched)
+QUERY_MODES = {'sqlite' : ('sqlite', False),
+               'sqlite-batch' : ('sqlite', True),
+               'cli' : ('cli', False),
+               'cli-batch' : ('cli', True),
+               'replay' : ('replay', False),
+               'replay-batch' : ('replay', True)}
+
+USER_CONFIGS = ['_med', '_Oct2012', '_GrISU', '_Alloff', '_t2', '_LZA']
+
+
+@contextmanager
+def quiet():
+  '''silences the per-run diagnostics so they don't end up in the timings'''
+  stderr = sys.stderr
+  sys.stderr = open(os.devnull, 'w')
+  try:
+    yield
+  finally:
+    sys.stderr.close()
+    sys.stderr = stderr
+
+
+def timed(func, *args):
+  t0 = time.time()
+  result = func(*args)
+  return time.time() - t0, result
+
+
+def git_commit():
+  try:
+    return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=BENCH_DIR,
+                                   stderr=open(os.devnull, 'w')).strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+
+def make_listgen(mode, dbDir, replayFile=None, recordFile=None, jobs=1):
+  backendName, batch = QUERY_MODES[mode]
+  runsobj = ListGen(backend=db.CLIBackend('localhost', ''))
+  if backendName == 'sqlite':
+    runsobj.backend = db.SQLiteBackend(dbDir)
+  elif backendName == 'replay':
+    runsobj.backend = db.ReplayBackend(replayFile)
+  elif backendName == 'cli':
+    #the fake mysql client in bench/fakebin reads the sqlite files
+    os.environ['PATH'] = os.path.join(BENCH_DIR, 'fakebin') + os.pathsep + os.environ['PATH']
+    os.environ['S6_FAKE_DB_DIR'] = dbDir
+  if recordFile is not None:
+    runsobj.backend = db.RecordingBackend(runsobj.backend, recordFile)
+  runsobj.jobs = jobs
+  runsobj.verbose = False
+  return runsobj, batch
+
+
+def bench_list(lines, dbDir, modes, args, results):
+  '''times every phase for one stage5 list'''
+  nruns = len(lines)
+  record = lambda phase, mode, seconds, **extra: results.append(
+    dict(nruns=nruns, phase=phase, mode=mode, seconds=seconds, us_per_run=1e6*seconds/max(nruns, 1), **extra))
+  runIDs = [preflight.get_run_id(run) for run in lines]
+
+  #query
+  q_offline = q_ver = None
+  for mode in modes:
+    if mode.startswith('cli') and not mode.endswith('batch') and nruns > args.cliMax:
+      print >>sys.stderr, "skipping %s for %d runs (more than --cliMax)" %(mode, nruns)
+      continue
+    runsobj, batch = make_listgen(mode, dbDir, args.replay, args.record, args.jobs)
+    with quiet():
+      seconds, (q_offline, q_ver) = timed(runsobj.fetch_runs, runIDs, batch, args.batchSize)
+    runsobj.backend.close()
+    record('query', mode, seconds, jobs=args.jobs)
+  if q_offline is None:
+    return
+
+  #classification, component by component and per run
+  runsobj = ListGen(backend=db.SQLiteBackend(dbDir))
+  rows_ver = [q_ver[r] for r in runIDs if q_ver[r] != 'FAILED']
+  rows_tel = [(runsobj.get_tel_cut_mask(q_offline[r]), runsobj.get_tel_config_mask(q_ver[r]))
+              for r in runIDs if q_offline[r] != 'FAILED' and q_ver[r] != 'FAILED']
+  with quiet():
+    record('classify', 'get_atm', timed(lambda: [runsobj.get_atm(q) for q in rows_ver])[0])
+    record('classify', 'get_array_config', timed(lambda: [runsobj.get_array_config(q) for q in rows_ver])[0])
+    record('classify', 'reconcile_tel_masks', timed(lambda: [runsobj.reconcile_tel_masks(c, m) for c, m in rows_tel])[0])
+    seconds, fullConfigs = timed(lambda: [runsobj.classify_run(r, q_offline[r], q_ver[r]) for r in runIDs])
+    record('classify', 'classify_run', seconds)
+    record('classify', 'classify_runs', timed(runsobj.classify_runs, runIDs, q_offline, q_ver)[0])
+
+  groups = {}
+  for run, fullConfig in zip(lines, fullConfigs):
+    groups.setdefault(fullConfig, []).append(run)
+
+  #EA names
+  record('ea_names', 'per_group', timed(lambda: [runsobj.get_EA_file(c, USER_CONFIGS) for c in groups])[0],
+         ngroups=len(groups))
+  record('ea_names', 'per_run', timed(lambda: [runsobj.get_EA_file(c, USER_CONFIGS) for c in fullConfigs])[0])
+
+  #writing
+  outPath = os.path.join(args.workdir, 'runlist.txt')
+  with open(outPath, 'w') as outfile:
+    seconds = timed(runsobj.print_runlist, groups, outfile, USER_CONFIGS)[0]
+  record('write', 'print_runlist', seconds, bytes=os.path.getsize(outPath))
+
+  runsobj.matchEA = True
+  runsobj.EA_file_dir = args.workdir + '/'
+  runsobj.load_EA_catalog()
+  with open(outPath, 'w') as outfile, quiet():
+    seconds = timed(runsobj.print_runlist, groups, outfile, USER_CONFIGS)[0]
+  record('write', 'print_runlist_EAmatch', seconds, bytes=os.path.getsize(outPath))
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Times the phases of s6RunlistGen.py on synthetic or replayed run lists and saves the results as JSON.')
+  parser.add_argument('--sizes', default='1000,10000,100000', help="Comma separated list sizes of the synthetic archives.")
+  parser.add_argument('--modes', default='sqlite,sqlite-batch,cli,cli-batch', help="Comma separated query modes (%s)." %(', '.join(sorted(QUERY_MODES))))
+  parser.add_argument('--batchSize', type=int, default=500, help="Run IDs per IN-list query in the batch modes.")
+  parser.add_argument('--jobs', type=int, default=1, help="Concurrent queries.")
+  parser.add_argument('--cliMax', type=int, default=2000, help="Largest list queried with the per-run mysql client (two process spawns per run).")
+  parser.add_argument('--infile', default=None, help="Benchmark this stage5 list instead of synthetic archives (use with --replay).")
+  parser.add_argument('--replay', default=None, help="Database responses recorded with --dbRecord/--record, for the replay modes.")
+  parser.add_argument('--record', default=None, help="Record the database responses of the query phase into this JSON file.")
+  parser.add_argument('--workdir', default=None, help="Directory for the archives & output (a temporary one by default).")
+  parser.add_argument('--seed', type=int, default=0, help="Random seed of the synthetic archives.")
+  parser.add_argument('--out', default='bench_results.json', help="JSON file for the results.")
+  args = parser.parse_args()
+
+  cleanup = args.workdir is None
+  if cleanup:
+    args.workdir = tempfile.mkdtemp(prefix='s6bench')
+  modes = args.modes.split(',')
+  results = []
+  try:
+    if args.infile is not None:
+      lines = [l.rstrip() for l in open(args.infile) if l.strip()]
+      if args.replay is not None and not any(m.startswith('replay') for m in modes):
+        modes = ['replay', 'replay-batch']
+      bench_list(lines, args.workdir, modes, args, results)
+    else:
+      for nruns in [int(n) for n in args.sizes.split(',')]:
+        listPath = make_archive.make_archive(args.workdir, nruns, args.seed)
+        lines = [l.rstrip() for l in open(listPath)]
+        bench_list(lines, args.workdir, modes, args, results)
+  finally:
+    if cleanup:
+      shutil.rmtree(args.workdir)
+
+  report = {'commit' : git_commit(), 'python' : platform.python_version(), 'host' : platform.node(),
+            'timestamp' : time.strftime('%Y-%m-%dT%H:%M:%S'), 'results' : results}
+  with open(args.out, 'w') as f:
+    json.dump(report, f, indent=1, sort_keys=True)
+
+  for r in results:
+    print >>sys.stderr, "%7d runs  %-9s %-22s %9.3f s  %8.1f us/run" %(r['nruns'], r['phase'], r['mode'], r['seconds'], r['us_per_run'])
+
+if __name__ == '__main__':
+  main()
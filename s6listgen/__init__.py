@@ -0,0 +1,90 @@
+'''
+VERITAS stage6 runlist generator.
+
+  core       ListGen: run metadata queries, classification into groups, EA naming
+  writers    runlist formats per VEGAS version (2.5.1+ by default, 2.5.4)
+  cli        the s6RunlistGen.py command line
+  db, cache, snapshot, atm, tels, bdt, ea, ...   the pieces ListGen is built from
+
+Nothing is imported until it's used (numpy only for --vectorize, --BDT, npz exports and
+snapshots), so the package is cheap to load. Other tools can generate runlists in-process:
+
+  import s6listgen
+  text = s6listgen.generate(stage5_paths, EAmatch=True, cuts='soft')
+  s6listgen.generate(stage5_paths, 'runlist.txt', vegas='2.5.4', dbBackend='sqlite', dbDir='db/')
+  groups = s6listgen.classify(stage5_paths, batch=True)
+  s6listgen.main(['crab_stage5.txt', 'crab.txt', '--EAmatch'])
+
+Keywords are the long options of s6RunlistGen.py (dest names, e.g. BDTCutsFile). Calls
+that pass listgen=open_listgen(...) reuse its database connections & cache.
+'''
+
+
+class OptionError(ValueError):
+  '''options rejected by the s6RunlistGen.py argument checks'''
+
+
+def get_args(options):
+  '''(parser, args): the s6RunlistGen.py defaults updated with the options dict'''
+  from s6listgen import cli
+  parser = cli.get_parser()
+  def error(message):
+    raise OptionError(message)
+  parser.error = error
+  args = parser.parse_args([])
+  for name, value in options.iteritems():
+    if not hasattr(args, name):
+      raise OptionError("unknown option '%s'" %(name))
+    setattr(args, name, value)
+  return parser, args
+
+
+def open_listgen(**options):
+  '''ListGen with the database, cache & snapshot options given, for reuse across calls'''
+  from s6listgen import cli
+  parser, args = get_args(options)
+  return cli.open_listgen(args)
+
+
+def generate(stage5_paths, outfile=None, listgen=None, **options):
+  '''
+  writes the runlist of the stage5 paths to outfile (file name or open file), or returns
+  it as a string when outfile is None
+  '''
+  from StringIO import StringIO
+  from s6listgen import cli
+  parser, args = get_args(options)
+  args.infile = list(stage5_paths)
+  args.outfile = outfile if outfile is not None else StringIO()
+  pairs = cli.check_args(parser, args)
+  runsobj = listgen if listgen is not None else cli.open_listgen(args)
+  try:
+    cli.run_request(runsobj, args, pairs)
+  finally:
+    if listgen is None:
+      cli.close_listgen(runsobj)
+  if outfile is None:
+    return args.outfile.getvalue()
+
+
+def classify(stage5_paths, listgen=None, **options):
+  '''groups (config -> stage5 paths) of the runs, in order of first appearance'''
+  from collections import OrderedDict
+  from s6listgen import cli, preflight
+  parser, args = get_args(options)
+  runsobj = listgen if listgen is not None else cli.open_listgen(args)
+  try:
+    cli.configure_classification(runsobj, args)
+    try:
+      return runsobj.group_runs(list(preflight.skip_unparsable(stage5_paths)), args.batch, args.batchSize, args.vectorize, groups=OrderedDict())
+    finally:
+      runsobj.report_atm_coverage()
+  finally:
+    if listgen is None:
+      cli.close_listgen(runsobj)
+
+
+def main(argv=None):
+  '''the s6RunlistGen.py command line, with argv instead of sys.argv'''
+  from s6listgen import cli
+  cli.main(argv)
@@ -0,0 +1,73 @@
+'''
+Atmosphere season calendar for s6RunlistGen.py.
+
+The winter (ATM21) periods are read from a CSV file with one "start,end" line per
+winter (dates as YYYY-MM-DD, # starts a comment) into a sorted, flattened list of
+boundaries, so the season of a run is found with one bisect. Calendars are cached by
+path & modification time, editing the file picks up the new dates on the next load.
+'''
+
+import os
+import bisect
+
+from datetime import datetime
+
+
+DEFAULT_CALENDAR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'atm_seasons.csv')
+
+_calendars = {}
+
+
+class AtmCalendar(object):
+
+  def __init__(self, winter_dates, source=''):
+    '''winter_dates: list of (start, end) datetimes of the winter periods'''
+    winter_dates = sorted(winter_dates)
+    for (start, end), (next_start, next_end) in zip(winter_dates, winter_dates[1:] + [(None, None)]):
+      if not start < end or (next_start is not None and next_start < end):
+        raise ValueError("bad or overlapping winter period %s - %s in ATM calendar %s" %(start, end, source))
+
+    self.winter_dates = winter_dates
+    self.source = source
+    #start0, end0, start1, end1, ... a run is in winter if an odd number of boundaries precede it
+    self.bounds = [d for wdate in winter_dates for d in wdate]
+    self._bounds64 = None
+
+  @classmethod
+  def from_file(cls, path):
+    winter_dates = []
+    for n, line in enumerate(open(path)):
+      line = line.split('#')[0].strip()
+      if not line:
+        continue
+      try:
+        start, end = [datetime.strptime(d.strip(), '%Y-%m-%d') for d in line.split(',')]
+      except ValueError:
+        raise ValueError("can't parse line %d of ATM calendar %s: '%s'" %(n+1, path, line))
+      winter_dates.append((start, end))
+    return cls(winter_dates, path)
+
+  def is_covered(self, obs_date):
+    '''whether the date falls within the span of known season transitions'''
+    return self.bounds[0] <= obs_date <= self.bounds[-1]
+
+  def is_winter(self, obs_date):
+    '''strictly between the start & end of a winter period'''
+    n_before = bisect.bisect_left(self.bounds, obs_date)
+    return n_before % 2 == 1 and (n_before == len(self.bounds) or self.bounds[n_before] != obs_date)
+
+  def bounds64(self):
+    '''the boundaries as a numpy datetime64 array, for searchsorted over many runs'''
+    if self._bounds64 is None:
+      import numpy as np
+      self._bounds64 = np.array(self.bounds, dtype='datetime64[s]')
+    return self._bounds64
+
+
+def load_calendar(path=DEFAULT_CALENDAR):
+  '''returns the calendar for a file, reparsing it only when it has changed'''
+  key = os.path.abspath(path)
+  mtime = os.path.getmtime(key)
+  if key not in _calendars or _calendars[key][0] != mtime:
+    _calendars[key] = (mtime, AtmCalendar.from_file(key))
+  return _calendars[key][1]
@@ -0,0 +1,63 @@
+'''
+BDT cuts table for the CONFIG blocks written by s6RunlistGen.py --BDT.
+
+The cuts file has a header line and columns CutName | V4_ATM21 | V4_ATM22 | V5_ATM21 | ...
+It is parsed once per path & modification time and every column's config block is
+rendered up front, so writing a group's cuts is a dict lookup.
+'''
+
+import os
+
+
+_tables = {}
+
+
+class BDTCutsTable(object):
+
+  def __init__(self, path):
+    import numpy as np
+    self.path = path
+    bdtCuts = np.genfromtxt(path,names=True,dtype=["|S20",np.float64,np.float64,np.float64,np.float64,np.float64,np.float64])
+    cutCol = bdtCuts.dtype.names[0]
+    self.columns = bdtCuts.dtype.names[1:]
+
+    #ready to write config block for each column
+    self.blocks = {}
+    for colChoice in self.columns:
+      self.blocks[colChoice] = ''.join(l[0] + " " + str(l[1]) + "\n" for l in zip(bdtCuts[cutCol],bdtCuts[colChoice]))
+
+    self._column_of = {}
+
+  def get_column(self, config):
+    '''picks the epoch/ATM column (e.g. V6_ATM21) for a group config code or EA name'''
+    if config not in self._column_of:
+      colChoice = ""
+      if 'V6' in config:
+        colChoice += "V6_"
+      elif 'V5' in config:
+        colChoice += "V5_"
+      else:
+        colChoice += "V4_"
+
+      if "ATM21" in config:
+        colChoice +="ATM21"
+      else:
+        colChoice +="ATM22"
+      self._column_of[config] = colChoice
+    return self._column_of[config]
+
+  def missing_columns(self, configs):
+    '''columns needed by the given group configs that the file doesn't have'''
+    return sorted(set(self.get_column(c) for c in configs) - set(self.columns))
+
+  def get_block(self, config):
+    return self.blocks[self.get_column(config)]
+
+
+def load_table(path):
+  '''returns the parsed cuts table for a file, reparsing it only when it has changed'''
+  key = os.path.abspath(path)
+  mtime = os.path.getmtime(key)
+  if key not in _tables or _tables[key][0] != mtime:
+    _tables[key] = (mtime, BDTCutsTable(key))
+  return _tables[key][1]
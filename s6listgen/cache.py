@@ -0,0 +1,112 @@
+'''
+Persistent read-through cache of run metadata for s6RunlistGen.py.
+
+Stores the VOFFLINE and VERITAS rows of each run in a local SQLite file keyed by run_id.
+Rows of recent runs (whose DQM tel_cut_mask/data_category may still change) expire after
+recentTTL days, rows of older runs after oldTTL days. The file is bounded to maxEntries
+runs, evicting the least recently used ones.
+'''
+
+import os
+import sqlite3
+import time
+
+from datetime import datetime
+
+
+DAY = 86400.
+
+
+def get_run_time(q_ver):
+  '''start time of a run (epoch seconds) from its VERITAS row, None if unknown'''
+  if q_ver == 'FAILED':
+    return None
+  try:
+    return time.mktime(datetime.strptime(q_ver.split('\t')[0],"%Y-%m-%d %H:%M:%S").timetuple())
+  except ValueError:
+    return None
+
+
+def is_fresh(run_time, fetched, now, recentDays, recentTTL, oldTTL):
+  '''
+  whether metadata fetched at time fetched is still valid: runs younger than recentDays
+  expire after recentTTL days, older runs after oldTTL days (a TTL of 0 never expires)
+  '''
+  #missing runs may still show up in the DB, treat them as recent
+  if run_time is None or now - run_time < recentDays*DAY:
+    ttl = recentTTL
+  else:
+    ttl = oldTTL
+  return ttl <= 0 or now - fetched < ttl*DAY
+
+
+class RunCache(object):
+
+  def __init__(self, path, recentDays=90, recentTTL=1, oldTTL=365, maxEntries=200000, key=''):
+    '''
+    recentDays: runs taken within this many days count as recent
+    recentTTL/oldTTL: days before a cached row of a recent/old run is refreshed (0 = never)
+    key: identifies the query layout (e.g. the NA/UA dates), rows cached under another key are misses
+    '''
+    self.path = os.path.expanduser(path)
+    self.recentDays = recentDays
+    self.recentTTL = recentTTL
+    self.oldTTL = oldTTL
+    self.maxEntries = maxEntries
+    self.key = key
+
+    self.hits = 0
+    self.misses = 0
+
+    self.conn = sqlite3.connect(self.path)
+    self.conn.text_factory = str
+    self.conn.execute('create table if not exists runs (run_id text primary key, key text, '
+                      'q_offline text, q_ver text, run_time real, fetched real, accessed real)')
+    self.conn.execute('create index if not exists idx_runs_accessed on runs (accessed)')
+    self.conn.commit()
+
+  def get_run_time(self, q_ver):
+    return get_run_time(q_ver)
+
+  def is_fresh(self, run_time, fetched, now):
+    '''checks a cached row against the TTL of its run'''
+    return is_fresh(run_time, fetched, now, self.recentDays, self.recentTTL, self.oldTTL)
+
+  def get_many(self, runIDs, allowStale=False):
+    '''returns {run_id: (q_offline, q_ver)} for the cached, fresh runs among runIDs'''
+    now = time.time()
+    found = {}
+    runIDs = list(set(runIDs))
+    for i in range(0, len(runIDs), 500):
+      chunk = runIDs[i:i+500]
+      rows = self.conn.execute('select run_id, q_offline, q_ver, run_time, fetched from runs '
+                               'where key=? and run_id in (%s)' %(','.join('?'*len(chunk))),
+                               [self.key] + chunk).fetchall()
+      for runID, q_offline, q_ver, run_time, fetched in rows:
+        if allowStale or self.is_fresh(run_time, fetched, now):
+          found[runID] = (q_offline, q_ver)
+
+    if found:
+      self.conn.executemany('update runs set accessed=? where run_id=?', [(now, r) for r in found])
+      self.conn.commit()
+    self.hits += len(found)
+    self.misses += len(runIDs) - len(found)
+    return found
+
+  def put_many(self, results):
+    '''stores {run_id: (q_offline, q_ver)} and evicts the least recently used runs beyond maxEntries'''
+    now = time.time()
+    self.conn.executemany('insert or replace into runs values (?,?,?,?,?,?,?)',
+                          [(runID, self.key, q_offline, q_ver, self.get_run_time(q_ver), now, now)
+                           for runID, (q_offline, q_ver) in results.iteritems()])
+    self.evict()
+    self.conn.commit()
+
+  def evict(self):
+    nruns = self.conn.execute('select count(*) from runs').fetchone()[0]
+    if self.maxEntries > 0 and nruns > self.maxEntries:
+      self.conn.execute('delete from runs where run_id in '
+                        '(select run_id from runs order by accessed limit ?)', (nruns - self.maxEntries,))
+
+  def close(self):
+    self.conn.close()
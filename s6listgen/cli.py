@@ -0,0 +1,582 @@
+'''
+Command line of s6RunlistGen.py: option parsing and the runlist modes (single list,
+--lists/--manifest, --stream, --incremental, --matrix, --shard/--mergeShards/--processes,
+--export, --splitOut, --serve) on top of a ListGen (core). main(argv) runs it in-process.
+'''
+
+import sys
+import os
+import time
+import itertools
+import copy
+
+try:
+  import argparse
+except ImportError:
+  sys.exit("Missing argparse module. See https://pypi.python.org/pypi/argparse for installation")
+
+from StringIO import StringIO
+from collections import OrderedDict
+
+from s6listgen import db
+from s6listgen import cache
+from s6listgen import atm
+from s6listgen import bdt
+from s6listgen import ea
+from s6listgen import journal
+from s6listgen import profiling
+from s6listgen import service
+from s6listgen import export
+from s6listgen import preflight
+from s6listgen import runlist
+from s6listgen import shard
+from s6listgen import writers
+from s6listgen.core import ListGen
+
+
+#user options that go into the EA names (user_configs), in order
+MATRIX_OPTIONS = ['cuts', 'SimModel', 'SimSource', 'Offset', 'TelMulti', 'LZA']
+
+
+def read_stage5_paths(infile):
+  '''yields the stage5 paths of a file (or stdin) one at a time, skipping blank lines'''
+  for line in infile:
+    line = line.rstrip()
+    if line:
+      yield line
+
+def report_progress(nruns, ngroups, t_start):
+  '''one line progress report on stderr'''
+  elapsed = time.time() - t_start
+  print >>sys.stderr, "%d runs classified into %d groups in %.1f s (%.0f runs/s)" %(
+    nruns, ngroups, elapsed, nruns/elapsed if elapsed > 0 else 0)
+
+def group_records(records):
+  '''groups dict (config -> runs) from classification records'''
+  groups = {}
+  for record in records:
+    groups.setdefault(record['fullConfig'], []).append(record['run'])
+  return groups
+
+def write_runlist(runsobj, groups, outfile, args, user_configs):
+  '''writes the runlist of the groups to outfile, or one runlist per group with --splitOut'''
+  if args.splitOut is not None:
+    paths = runsobj.print_split_runlists(groups, args.splitOut, user_configs, args.BDT, args.BDTCutsFile)
+    if args.progress:
+      print >>sys.stderr, "wrote %d runlists %s" %(len(paths), args.splitOut)
+  else:
+    runsobj.print_runlist(groups,outfile, user_configs,args.BDT,args.BDTCutsFile)
+
+def read_manifest(manifest):
+  '''(infile, outfile) pairs from a manifest, one "infile outfile" pair per line, # comments'''
+  pairs = []
+  for n, line in enumerate(open(manifest)):
+    fields = line.split('#')[0].split()
+    if not fields:
+      continue
+    if len(fields) != 2:
+      sys.exit("%s line %d: expected 'infile outfile', got '%s'" %(manifest, n+1, line.strip()))
+    pairs.append(tuple(fields))
+  return pairs
+
+def write_lists(runsobj, pairs, args, user_configs):
+  '''
+  generates the runlists of many infile/outfile pairs from one metadata fetch
+  and one classification of the unique runs across all lists
+  '''
+  lists = [list(read_stage5_paths(open(infile))) for infile, outfile in pairs]
+  if args.preflight:
+    #runs may be shared between lists, duplicates only count within a list
+    lists = [preflight.Preflight(args.statJobs).check(runs) for runs in lists]
+  else:
+    lists = [list(preflight.skip_unparsable(runs)) for runs in lists]
+  t_start = time.time()
+  all_groups = runsobj.group_lists(lists, args.batch, args.batchSize, args.vectorize)
+  if args.progress:
+    nunique = len(set(preflight.get_run_id(run) for runs in lists for run in runs))
+    print >>sys.stderr, "%d lists, %d entries, %d unique runs" %(len(lists), sum(len(runs) for runs in lists), nunique)
+    report_progress(nunique, sum(len(groups) for groups in all_groups), t_start)
+
+  for (infile, outfile), groups in zip(pairs, all_groups):
+    with open(outfile, 'w') as f:
+      runsobj.print_runlist(groups,f, user_configs,args.BDT,args.BDTCutsFile)
+
+def get_matrix(args):
+  '''
+  the option combinations of --matrix OPTION=V1,V2 ... as a list of dicts (option -> value),
+  with the output file name of each combination. Raises ValueError on bad entries
+  '''
+  choices = {'Offset' : ['Alloff','050off'], 'LZA' : ['LZA','']}
+  axes = []
+  for entry in args.matrix:
+    option, sep, values = entry.partition('=')
+    if not sep or option not in MATRIX_OPTIONS:
+      raise ValueError("--matrix expects OPTION=VALUE,VALUE,... with OPTION one of %s, got '%s'" %(', '.join(MATRIX_OPTIONS), entry))
+    values = values.split(',')
+    for value in values:
+      if option in choices and value not in choices[option]:
+        raise ValueError("--matrix %s: invalid choice '%s' (choose from %s)" %(option, value, ', '.join(repr(c) for c in choices[option])))
+    axes.append((option, values))
+
+  template = args.matrixOut
+  if template is None:
+    root, ext = os.path.splitext(args.outfile)
+    template = root + ''.join('_{%s}' %(option) for option, values in axes if len(values) > 1) + ext
+
+  variants = []
+  for combo in itertools.product(*[values for option, values in axes]):
+    variant = dict((option, getattr(args, option)) for option in MATRIX_OPTIONS)
+    variant.update(zip([option for option, values in axes], combo))
+    names = dict((option, value or 'no' + option) for option, value in variant.iteritems())
+    variant['outfile'] = template.format(**names)
+    variants.append(variant)
+  return variants
+
+def write_matrix(runsobj, lines, variants, args):
+  '''classifies the runs once and writes the runlist of every --matrix combination'''
+  t_start = time.time()
+  groups = runsobj.group_runs(lines, args.batch, args.batchSize, args.vectorize)
+  if args.progress:
+    report_progress(len(lines), len(groups), t_start)
+
+  for variant in variants:
+    user_configs = ["_" + variant[option] for option in MATRIX_OPTIONS]
+    if runsobj.matchEA:
+      try:
+        runsobj.get_EA_rules().check_cuts(variant['cuts'])
+      except ValueError as e:
+        sys.exit(str(e))
+    #the BDT cuts file name may depend on the combination too, e.g. BDT_cuts_{cuts}.txt
+    bdtCutsFile = args.BDTCutsFile.format(**variant)
+    with open(variant['outfile'], 'w') as outfile:
+      runsobj.print_runlist(groups,outfile, user_configs,args.BDT,bdtCutsFile)
+    if args.progress:
+      print >>sys.stderr, "wrote %s" %(variant['outfile'])
+
+def update_incremental(runsobj, lines, args, user_configs):
+  '''
+  classifies only the runs without a current journal record, journaling every finished
+  batch, then regroups all runs from the journal and replaces the output file
+  '''
+  runJournal = journal.Journal(args.outfile + '.journal', runsobj.get_classification_key())
+  now = time.time()
+  todo = []
+  todo_set = set()
+  for run in lines:
+    if run not in todo_set and not runJournal.is_current(run, now, args.cacheRecentDays, args.cacheRecentTTL, args.cacheTTL):
+      todo.append(run)
+      todo_set.add(run)
+  print >>sys.stderr, "%d of %d runs are new or stale, reusing the journal for the rest" %(len(todo), len(lines))
+
+  t_start = time.time()
+  for i in range(0, len(todo), args.streamBatch):
+    runJournal.append(runsobj.classify_records(todo[i:i+args.streamBatch], args.batch, args.batchSize, args.vectorize))
+
+  records = [runJournal.records[run] for run in lines]
+  groups = group_records(records)
+  if runsobj.max_group_hours:
+    #durations of the runs not queried this time, journals written before they were recorded have none
+    runsobj.durations.update((record['runID'], record.get('duration')) for record in records)
+  if args.progress:
+    report_progress(len(todo), len(groups), t_start)
+
+  tmpPath = args.outfile + '.tmp'
+  with open(tmpPath, 'w') as outfile:
+    runsobj.print_runlist(groups,outfile, user_configs,args.BDT,args.BDTCutsFile)
+  os.rename(tmpPath, args.outfile)
+  if args.export is not None:
+    export.write_export(runsobj.export_records(records, groups, user_configs), args.export, args.exportFormat)
+  runJournal.compact(lines)
+
+def get_parser():
+  parser = argparse.ArgumentParser(description='Takes an input file with paths to stage5 files and generates a runlist for stage6. Note: the runlist still needs to be manually edited to fill out the Config blocks with desired cuts/configs and plug in EA paths. Use options --EAmatch and --EAdir /path/to/EAfiles/ if you want to automatically generate and plug in EA paths/names based on standard naming convention.')
+  parser.add_argument('infile', nargs='?', type=argparse.FileType('r'), default=sys.stdin, help="Input file name with list of stage5 root files, containing paths to the files.")
+  parser.add_argument('outfile', nargs='?', default=None, help="Output file for writing formatted runlist. If skipped, will print to screen.")
+  parser.add_argument('--EAmatch', default=False,action='store_true', help="Set option to enable automatic EA filename generation.") 
+  parser.add_argument('--EAdir', nargs='?', default='./', help="Path to directory containing EA files") 
+  parser.add_argument('--cuts', nargs='?', default='med', help="Cuts used for the analysis, one of the cut sets in --EArules (soft, med, hard or loose by default).") 
+  parser.add_argument('--SimModel', nargs='?', default='Oct2012', help="'Oct2012' (GrISU) or 'MDL10UA' or 'MDL15NA' etc (KASCADE)") 
+  parser.add_argument('--SimSource', nargs='?', default='GrISU', help="Simulation type ('GrISU' or 'KASCADE' or 'CARE') used to generate EAs") 
+  parser.add_argument('--Offset', nargs='?', default='Alloff',choices=['Alloff','050off'], help="Specifies Offsets covered by EA ('Alloff' or '050off')") 
+  parser.add_argument('--TelMulti', nargs='?', default='t2', help="Telescope Multiplicity (t2, t3, or t4)") 
+  parser.add_argument('--LZA', nargs='?', default='LZA',choices=['LZA',''], help="'LZA' or '' if not LZA ") 
+  parser.add_argument('--BDT', default=False, action='store_true', help="Automatically writes BDT cuts in the config blocks.") 
+  parser.add_argument('--BDTCutsFile',nargs='?',default = 'BDT_cuts_516_V5.txt', help='File for pulling BDT cuts for the config block, with columns CutName| CutVal(config1) | CutVal(config2)| etc.')
+  parser.add_argument('--batch', default=False, action='store_true', help="Fetch metadata for all runs up front with chunked IN-list queries instead of two queries per run.")
+  parser.add_argument('--batchSize', type=int, default=500, help="Number of run IDs per IN-list query in --batch mode.")
+  parser.add_argument('--dbBackend', default='auto', choices=['auto','mysql','cli','sqlite'], help="Database backend: pooled connections ('mysql', needs MySQLdb or pymysql), the mysql command line client ('cli'), a local SQLite stand-in ('sqlite') or 'auto' (mysql if a driver is installed, else cli).")
+  parser.add_argument('--dbHost', default=None, help="Database host, or comma separated host[:port] mirrors; every query goes to the fastest mirror answering (default lucifer1.spa.umn.edu).")
+  parser.add_argument('--dbPort', default=None, help="Database port of hosts given without one (default 33060, an empty port leaves it to the mysql client/driver default).")
+  parser.add_argument('--dbTimeout', type=float, default=120, help="Seconds a query may take before its mirror counts as unreachable (0: wait forever).")
+  parser.add_argument('--dbRetries', type=int, default=2, help="Times a query is retried, with growing pauses, when no mirror answers.")
+  parser.add_argument('--dbBackoff', type=float, default=1., help="Pause in seconds before the first retry, doubled for every further one.")
+  parser.add_argument('--dbDir', default='./', help="Directory with VERITAS.sqlite and VOFFLINE.sqlite for --dbBackend sqlite.")
+  parser.add_argument('--dbRecord', default=None, help="Record every database response into this JSON file (for --dbReplay).")
+  parser.add_argument('--dbReplay', default=None, help="Answer queries from responses recorded with --dbRecord instead of a database.")
+  parser.add_argument('--poolSize', type=int, default=4, help="Number of pooled connections kept open per database.")
+  parser.add_argument('--cache', nargs='?', default=None, const='~/.s6RunlistGen_cache.sqlite', help="Keep run metadata in a local cache file (default ~/.s6RunlistGen_cache.sqlite) and only query runs that are missing or expired.")
+  parser.add_argument('--cacheRecentDays', type=float, default=90, help="Runs taken within this many days count as recent for the cache TTLs.")
+  parser.add_argument('--cacheRecentTTL', type=float, default=1, help="Days before cached metadata of recent runs is refreshed (DQM info may still change).")
+  parser.add_argument('--cacheTTL', type=float, default=365, help="Days before cached metadata of older runs is refreshed (0 = never).")
+  parser.add_argument('--cacheSize', type=int, default=200000, help="Maximum number of runs kept in the cache, least recently used runs are evicted.")
+  parser.add_argument('--snapshot', default=None, help="Look runs up in this run metadata snapshot (written by s6snapshot.py) before querying the database.")
+  parser.add_argument('--offline', default=False, action='store_true', help="Serve run metadata only from the cache, without any database queries.")
+  parser.add_argument('--jobs', type=int, default=1, help="Number of database queries to run concurrently (VOFFLINE and VERITAS lookups of many runs overlap). Output order is unchanged.")
+  parser.add_argument('--vectorize', default=False, action='store_true', help="Classify the whole list at once with vectorized numpy operations (faster for very long lists).")
+  parser.add_argument('--atmCalendar', default=atm.DEFAULT_CALENDAR, help="CSV file with the start,end dates of the winter (ATM21) periods.")
+  parser.add_argument('--reportTelMismatch', default=False, action='store_true', help="Report runs where DQM (tel_cut_mask) and the observer (config_mask) disagree on telescope participation, and which telescopes.")
+  parser.add_argument('--vegas', default=writers.DEFAULT_VERSION, choices=sorted(writers.WRITERS), help="VEGAS version whose stage6 runlist format to write: 2.5.1 (v2.5.1+, default) or 2.5.4 (format of the former s6RunlistGen_2.5.4.py: groups not split by data category, no CONFIG block for the first group).")
+  parser.add_argument('--EArules', default=None, help="JSON file with the EA naming rules (size & shape cuts per cut set, fix suffixes, vegas version, filename layout). Default: s6listgen/ea_rules.json, ea_rules_2.5.4.json with --vegas 2.5.4.")
+  parser.add_argument('--EAcache', nargs='?', default=None, const='~/.s6RunlistGen_EAcache.json', help="Cache the --EAdir listing in this JSON file (default ~/.s6RunlistGen_EAcache.json), reused until the directory changes.")
+  parser.add_argument('--stream', default=False, action='store_true', help="Read the stage5 list lazily and write the groups of every --streamBatch runs as soon as they are classified (runs of one config may then span several groups).")
+  parser.add_argument('--streamBatch', type=int, default=1000, help="Number of runs classified and written at a time in --stream mode.")
+  parser.add_argument('--progress', default=False, action='store_true', help="Report progress on stderr instead of printing a line per queried run.")
+  parser.add_argument('--incremental', default=False, action='store_true', help="Keep a journal of each run's classification next to the output (<outfile>.journal) and only query runs that are new or stale (see the --cache TTL options), then rewrite the output. Resumes where an interrupted run stopped.")
+  parser.add_argument('--profile', default=False, action='store_true', help="Time every phase (queries, classification, EA naming, BDT parsing, writing) and count DB round trips, mysql spawns, cache hits/misses, file stats & bytes written. Prints a summary to stderr.")
+  parser.add_argument('--profileFile', default=None, help="Also write the --profile report as JSON into this file.")
+  parser.add_argument('--lists', nargs='+', default=None, metavar='INFILE:OUTFILE', help="Generate several runlists in one go (infile:outfile pairs). Runs shared between lists are queried and classified once.")
+  parser.add_argument('--manifest', default=None, help="File with one 'infile outfile' pair per line, generated like --lists.")
+  parser.add_argument('--export', default=None, help="Also write one record per run (run ID, path, epoch, ATM, DQM/observer/reconciled telescopes, data category, group ID, EA) to this file.")
+  parser.add_argument('--exportFormat', default=None, choices=export.FORMATS, help="Format of --export: JSON Lines or a numpy .npz with one array per field (default from the file extension, jsonl otherwise).")
+  parser.add_argument('--maxGroupRuns', type=int, default=None, help="Split groups of more than this many runs into balanced chunks (ceil(runs/maxGroupRuns) of nearly equal size), each written as a group of its own with the same EA & config.")
+  parser.add_argument('--maxGroupHours', type=float, default=None, help="Split groups of more than this many hours of data (data_end_time - data_start_time of the runs) into chunks of nearly equal duration, each written as a group of its own with the same EA & config.")
+  parser.add_argument('--splitOut', default=None, metavar='TEMPLATE', help="Write every group (or chunk of a split group) into a runlist file of its own, named by TEMPLATE with {id} replaced by the group ID (e.g. crab_{id}.txt), instead of one outfile.")
+  parser.add_argument('--preflight', default=False, action='store_true', help="Check the stage5 list before querying: drop (and report) entries without a recognizable run ID, missing or empty files and duplicate runs.")
+  parser.add_argument('--statJobs', type=int, default=16, help="Number of concurrent stat calls in --preflight (helps on slow shared filesystems).")
+  parser.add_argument('--matrix', nargs='+', default=None, metavar='OPTION=V1,V2', help="Write a runlist for every combination of these values of %s (e.g. cuts=soft,med,hard TelMulti=t2,t3), classifying the runs only once." %(', '.join(MATRIX_OPTIONS)))
+  parser.add_argument('--matrixOut', default=None, help="Output file names for --matrix with {option} placeholders, e.g. runlist_{cuts}_{TelMulti}.txt (default: outfile with the varied values appended). {option} also works in --BDTCutsFile.")
+  parser.add_argument('--shard', default=None, metavar='i/N', help="Classify only the i-th of N slices of the stage5 list (i from 0) and write its partial group map (JSON) to outfile, for --mergeShards.")
+  parser.add_argument('--mergeShards', nargs='+', default=None, metavar='PARTIAL', help="Write the runlist from the partial group maps of all N shards (any order), same as classifying the whole list at once. No stage5 list is read and no database queried, give - as infile: s6RunlistGen.py - outfile --mergeShards part_*.json")
+  parser.add_argument('--processes', type=int, default=1, help="Classify the list in this many shards with parallel processes on this machine, then merge them.")
+  parser.add_argument('--serve', nargs='?', default=None, const=service.DEFAULT_SOCKET, metavar='SOCKET', help="Run as a resident service on a Unix socket (default %s), keeping the database connections, cache, ATM calendar, BDT tables & EA catalogs loaded. Requests are sent with s6service.py, which takes the same arguments as this script; the database & cache options of the service apply to all requests." %(service.DEFAULT_SOCKET))
+  return parser
+
+def check_args(parser, args):
+  '''checks option combinations, returns the (infile, outfile) pairs of --lists/--manifest'''
+  if args.incremental and args.outfile is None:
+    parser.error("--incremental needs an output file")
+  pairs = []
+  if args.lists is not None:
+    for pair in args.lists:
+      if ':' not in pair:
+        parser.error("--lists expects infile:outfile pairs, got '%s'" %(pair))
+      pairs.append(tuple(pair.rsplit(':', 1)))
+  if args.manifest is not None:
+    pairs += read_manifest(args.manifest)
+  if pairs and (args.stream or args.incremental):
+    parser.error("--lists/--manifest can't be combined with --stream or --incremental")
+  if args.export is not None and (pairs or args.stream):
+    parser.error("--export can't be combined with --lists/--manifest or --stream")
+  modes = [args.shard is not None, args.mergeShards is not None, args.processes > 1].count(True)
+  if modes:
+    if modes > 1 or pairs or args.stream or args.incremental or args.export is not None or args.matrix is not None:
+      parser.error("--shard, --mergeShards and --processes can't be combined with each other, --lists/--manifest, --stream, --incremental, --export or --matrix")
+    if args.mergeShards is not None and args.preflight:
+      parser.error("--mergeShards doesn't read a stage5 list to --preflight")
+    if args.shard is not None:
+      if args.outfile is None:
+        parser.error("--shard needs an output file for the partial group map")
+      try:
+        shard.parse_shard(args.shard)
+      except ValueError as e:
+        parser.error(str(e))
+  if args.maxGroupRuns is not None and args.maxGroupHours is not None:
+    parser.error("give either --maxGroupRuns or --maxGroupHours")
+  if (args.maxGroupRuns is not None and args.maxGroupRuns < 1) or (args.maxGroupHours is not None and args.maxGroupHours <= 0):
+    parser.error("--maxGroupRuns/--maxGroupHours should be positive")
+  if args.splitOut is not None:
+    if pairs or args.stream or args.incremental or args.matrix is not None or args.shard is not None:
+      parser.error("--splitOut can't be combined with --lists/--manifest, --stream, --incremental, --matrix or --shard")
+    if args.outfile is not None:
+      parser.error("--splitOut replaces the outfile, give one or the other")
+    try:
+      runlist.check_template(args.splitOut)
+    except ValueError as e:
+      parser.error("--splitOut: %s" %(e))
+  if args.matrix is not None:
+    if pairs or args.stream or args.incremental or args.export is not None:
+      parser.error("--matrix can't be combined with --lists/--manifest, --stream, --incremental or --export")
+    if args.outfile is None and args.matrixOut is None:
+      parser.error("--matrix needs an output file or --matrixOut")
+    try:
+      get_matrix(args)
+    except (KeyError, ValueError) as e:
+      parser.error(str(e))
+  return pairs
+
+def open_listgen(args):
+  '''ListGen with the database backend & run metadata cache given by the options'''
+  runsobj = ListGen() 
+  if args.dbHost is not None:
+    runsobj.mirrors = db.parse_hosts(args.dbHost, args.dbPort if args.dbPort is not None else runsobj.portNum)
+  elif args.dbPort is not None:
+    runsobj.mirrors = [(host, args.dbPort) for host, port in runsobj.mirrors]
+  runsobj.hostName, runsobj.portNum = runsobj.mirrors[0]
+  if args.dbReplay is not None:
+    runsobj.backend = db.ReplayBackend(args.dbReplay)
+  elif args.dbBackend == 'sqlite':
+    runsobj.backend = db.get_backend(args.dbBackend, runsobj.hostName, runsobj.portNum, args.dbDir)
+  else:
+    runsobj.backend = db.get_failover_backend(args.dbBackend, runsobj.mirrors, max(args.poolSize, args.jobs),
+                                              args.dbTimeout, args.dbRetries, args.dbBackoff)
+  if args.dbRecord is not None:
+    runsobj.backend = db.RecordingBackend(runsobj.backend, args.dbRecord)
+  if args.snapshot is not None:
+    #numpy is only loaded for snapshots
+    from s6listgen import snapshot
+    try:
+      runsobj.snapshot = snapshot.Snapshot(args.snapshot)
+    except IOError as e:
+      sys.exit(str(e))
+  if args.cache is not None:
+    runsobj.cache = cache.RunCache(args.cache, args.cacheRecentDays, args.cacheRecentTTL, args.cacheTTL,
+                                   args.cacheSize, key=runsobj.get_query_key())
+  return runsobj
+
+def close_listgen(runsobj):
+  runsobj.backend.close()
+  if runsobj.cache is not None:
+    runsobj.cache.close()
+
+def configure_classification(runsobj, args):
+  '''applies the options that affect querying & classifying runs'''
+  runsobj.jobs = args.jobs
+  #the format decides the epoch dates & telescope participation the runs are classified with
+  runsobj.set_vegas(args.vegas)
+  runsobj.report_mismatch = args.reportTelMismatch
+  #a resident service picks up edits to the calendar file, as the journal key does
+  runsobj.set_atm_calendar(args.atmCalendar)
+  if args.offline and runsobj.cache is None and runsobj.snapshot is None:
+    sys.exit("--offline needs a run metadata cache (--cache) or snapshot (--snapshot)")
+  runsobj.offline = args.offline
+  runsobj.verbose = not args.progress
+  runsobj.max_group_runs = args.maxGroupRuns
+  runsobj.max_group_hours = args.maxGroupHours
+  #partial group maps carry durations, whatever the merge splits by
+  runsobj.keep_durations = bool(args.maxGroupHours) or args.shard is not None or args.processes > 1
+  #a new dict, service requests share the ListGen of the service
+  runsobj.durations = {}
+
+def classify_shard(runsobj, lines, args):
+  '''groups of a slice of the stage5 list as (config, runs) pairs in order of first appearance'''
+  return runsobj.group_runs(lines, args.batch, args.batchSize, args.vectorize, groups=OrderedDict()).items()
+
+def make_shard_partial(runsobj, lines, i, N, args):
+  '''partial group map of shard i of N, with the run durations for --maxGroupHours'''
+  return shard.make_partial(i, N, classify_shard(runsobj, lines, args), len(lines), runsobj.durations)
+
+def merge_shards(runsobj, partials):
+  '''groups of a complete set of partial group maps, their run durations go to runsobj'''
+  for partial in partials:
+    runsobj.durations.update(partial.get('durations', {}))
+  return shard.merge(partials)
+
+def run_shard_process(task):
+  '''
+  --processes worker: classifies one shard with its own ListGen & database connections.
+  Returns the partial group map and the start times of runs outside the ATM calendar
+  '''
+  args, lines, i, N = task
+  runsobj = open_listgen(args)
+  try:
+    configure_classification(runsobj, args)
+    return make_shard_partial(runsobj, lines, i, N, args), runsobj.atm_uncovered
+  finally:
+    close_listgen(runsobj)
+
+def run_local_shards(runsobj, args, lines):
+  '''classifies the list in --processes shards on this machine and merges them'''
+  shard_args = copy.copy(args)
+  shard_args.infile = None
+  tasks = [(shard_args, shard.get_slice(lines, i, args.processes), i, args.processes) for i in range(args.processes)]
+  import multiprocessing
+  pool = multiprocessing.Pool(args.processes)
+  try:
+    #map_async + get keeps Ctrl-C working
+    results = pool.map_async(run_shard_process, tasks).get(1e9)
+  finally:
+    pool.terminate()
+  #reported once for the whole list by run_request
+  for partial, uncovered in results:
+    runsobj.atm_uncovered += uncovered
+  return merge_shards(runsobj, [partial for partial, uncovered in results])
+
+def run_request(runsobj, args, pairs):
+  '''generates the runlist(s) asked for by the options with a ListGen set up by open_listgen'''
+  configure_classification(runsobj, args)
+
+  #Timers & counters hooked into this ListGen only when asked for
+  profiler = None
+  if args.profile or args.profileFile is not None:
+    profiler = profiling.Profiler()
+    profiler.instrument(runsobj)
+  try:
+    write_request(runsobj, args, pairs)
+  finally:
+    runsobj.report_atm_coverage()
+    #instrument patches process-wide functions, a resident service must get them back on errors too
+    if profiler is not None:
+      profiler.finish()
+
+  if profiler is not None:
+    profiler.report()
+    if args.profileFile is not None:
+      profiler.write_json(args.profileFile)
+
+def write_request(runsobj, args, pairs):
+  '''the runlist writing part of run_request'''
+  #Switching auto EA filename generation on if requested
+  runsobj.matchEA = args.EAmatch
+  
+  #Setting EA file location specified by user. Default is ./
+  runsobj.EA_file_dir = args.EAdir 
+  runsobj.EA_catalog = None
+  EArules = args.EArules or runsobj.get_writer().EA_rules
+  if runsobj.EA_rules_file != EArules:
+    runsobj.EA_rules_file = EArules
+    runsobj.EA_rules = None
+  if runsobj.matchEA:
+    try:
+      runsobj.get_EA_rules().check_cuts(args.cuts)
+    except (IOError, ValueError) as e:
+      sys.exit(str(e))
+    runsobj.load_EA_catalog(args.EAcache)
+
+  #passing arguments specifiable by users for producing correct EA filenames
+  user_configs=[args.cuts, args.SimModel, args.SimSource, args.Offset, args.TelMulti, args.LZA]
+  user_configs=["_" + user_config for user_config in user_configs]
+
+  #run configurations: array config, ATM, participating telescopes, run category (for reducedhv/filter)
+  #run_configs=[runsobj.array_config, runsobj.atm, runsobj.tel_combo, runsobj.data_cat]
+  #run_configs=["_" + run_config for run_config in run_configs]
+  #print run_configs
+
+  #Open the output (not for --incremental, which replaces it once done, or several lists/--matrix)
+  outfile = None
+  if not pairs and args.matrix is None and args.shard is None and args.splitOut is None:
+    if args.outfile is None:
+      outfile = sys.stdout
+    elif hasattr(args.outfile, 'write'):
+      #open file handed in through the python API (generate)
+      outfile = args.outfile
+    elif not args.incremental:
+      outfile = open(args.outfile, 'w')
+
+  #Read stage5 file paths lazily, dropping bad entries before querying if asked to
+  lines = read_stage5_paths(args.infile)
+  checker = preflight.Preflight(args.statJobs) if args.preflight else None
+  if checker is None:
+    #never classify a run under a made-up ID
+    lines = preflight.skip_unparsable(lines)
+  elif not args.stream:
+    lines = iter(checker.check(list(lines)))
+  nruns = 0
+  t_start = time.time()
+
+  if pairs:
+    write_lists(runsobj, pairs, args, user_configs)
+  elif args.matrix is not None:
+    write_matrix(runsobj, list(lines), get_matrix(args), args)
+  elif args.incremental:
+    update_incremental(runsobj, list(lines), args, user_configs)
+  elif args.shard is not None:
+    #partial group map of this shard, runlist written by --mergeShards
+    i, N = shard.parse_shard(args.shard)
+    chunk = shard.get_slice(list(lines), i, N)
+    partial = make_shard_partial(runsobj, chunk, i, N, args)
+    shard.write_partial(args.outfile, partial)
+    if args.progress:
+      report_progress(len(chunk), len(partial['groups']), t_start)
+  elif args.mergeShards is not None or args.processes > 1:
+    if args.mergeShards is not None:
+      try:
+        groups = merge_shards(runsobj, [shard.read_partial(path) for path in args.mergeShards])
+      except ValueError as e:
+        sys.exit(str(e))
+    else:
+      lines = list(lines)
+      groups = run_local_shards(runsobj, args, lines)
+      if args.progress:
+        report_progress(len(lines), len(groups), t_start)
+    write_runlist(runsobj, groups, outfile, args, user_configs)
+  elif args.stream:
+    #classify & write bounded batches as they come in, groups of a config can repeat across batches
+    GROUPID = 0
+    for chunk in iter(lambda: list(itertools.islice(lines, args.streamBatch)), []):
+      if checker is not None:
+        chunk = checker.check(chunk)
+      groups = runsobj.group_runs(chunk, args.batch, args.batchSize, args.vectorize)
+      GROUPID = runsobj.print_runlist(groups,outfile, user_configs,args.BDT,args.BDTCutsFile, GROUPID)
+      outfile.flush()
+      nruns += len(chunk)
+      if args.progress:
+        report_progress(nruns, GROUPID, t_start)
+  elif args.export is not None:
+    #per-run records are kept for the export
+    records = runsobj.classify_records(list(lines), args.batch, args.batchSize, args.vectorize)
+    groups = group_records(records)
+    if args.progress:
+      report_progress(len(records), len(groups), t_start)
+    write_runlist(runsobj, groups, outfile, args, user_configs)
+    export.write_export(runsobj.export_records(records, groups, user_configs), args.export, args.exportFormat)
+  else:
+    lines = list(lines)
+    groups = runsobj.group_runs(lines, args.batch, args.batchSize, args.vectorize)
+    nruns = len(lines)
+    if args.progress:
+      report_progress(nruns, len(groups), t_start)
+    #print args.outfile
+    write_runlist(runsobj, groups, outfile, args, user_configs)
+  if outfile is not None and outfile is not sys.stdout and outfile is not args.outfile:
+    outfile.close()
+
+def serve(parser, args):
+  '''keeps a ListGen loaded and runs the requests sent to the socket with it'''
+  runsobj = open_listgen(args)
+  #warm up what the requests will need
+  runsobj.set_atm_calendar(args.atmCalendar)
+  runsobj.get_atm_calendar()
+  if args.BDT and os.path.isfile(args.BDTCutsFile):
+    bdt.load_table(args.BDTCutsFile)
+  if args.EAmatch and os.path.isdir(args.EAdir):
+    ea.load_catalog(args.EAdir, args.EAcache)
+
+  def handle(argv, read_stdin):
+    request_args = parser.parse_args(argv)
+    if request_args.serve is not None:
+      parser.error("--serve can't be requested from a running service")
+    pairs = check_args(parser, request_args)
+    if not pairs and request_args.mergeShards is None and request_args.infile is sys.stdin:
+      request_args.infile = StringIO(read_stdin())
+    #a shallow copy shares the connections, cache & tables but not the per-request settings
+    try:
+      run_request(copy.copy(runsobj), request_args, pairs)
+    except db.DatabaseError as e:
+      sys.exit("ERROR: %s" %(e))
+
+  try:
+    service.ListGenServer(args.serve, handle).serve()
+  finally:
+    close_listgen(runsobj)
+
+def main(argv=None):
+  '''runs s6RunlistGen.py with the given arguments (sys.argv by default)'''
+  parser = get_parser()
+  args = parser.parse_args(argv)
+  pairs = check_args(parser, args)
+  if args.serve is not None:
+    serve(parser, args)
+    return
+
+  #Define a ListGen object
+  runsobj = open_listgen(args)
+  try:
+    run_request(runsobj, args, pairs)
+  except db.DatabaseError as e:
+    #never fall back to default configs for runs the database couldn't tell us about
+    sys.exit("ERROR: %s" %(e))
+  finally:
+    close_listgen(runsobj)
+  
+if __name__ == '__main__':
+  main()
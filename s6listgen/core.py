@@ -0,0 +1,704 @@
+'''
+Shared core of the runlist generator: ListGen queries the run metadata (database, cache or
+snapshot), classifies runs into groups by array epoch, atmosphere season, telescope
+participation and data category, and names their EAs. Writing the groups out is left to
+the writer of the VEGAS version asked for (writers).
+
+numpy is only imported by the vectorized classification (classify_runs), so using ListGen
+for per-run classification doesn't pay for it.
+'''
+
+import sys
+import os
+import time
+
+from datetime import datetime
+
+from s6listgen import db
+from s6listgen import cache
+from s6listgen import atm
+from s6listgen import tels
+from s6listgen import bdt
+from s6listgen import ea
+from s6listgen import preflight
+from s6listgen import split
+from s6listgen import writers
+
+
+class ListGen(object):
+
+  def __init__(self, backend=None, ntels=4):
+    '''Initializing some default values for parameters.'''
+    self.hostName = 'lucifer1.spa.umn.edu'
+    self.portNum = 33060
+    #database mirrors as (host, port), the fastest one answering is used (--dbHost host[:port],...)
+    self.mirrors = [(self.hostName, self.portNum)]
+    #self.mirrors.append(("romulus.ucsc.edu", ""))
+
+    #some globals for database, dates, etc
+    #Dates for array configs
+    self.NA_date = '2009-08-01'
+    self.UA_date = '2012-09-01'
+    #defaults for formats that don't date the epochs themselves (set_vegas)
+    self.epoch_dates = (self.NA_date, self.UA_date)
+
+    self.matchEA = False
+    self.EA_file_dir = './'
+    self.EA_catalog = None
+    self.EA_rules_file = ea.DEFAULT_RULES
+    self.EA_rules = None
+
+    #runlist format of the VEGAS version the list is written for (writers)
+    self.vegas = writers.DEFAULT_VERSION
+    self.writer = None
+
+    #telescope participation lookup tables, printing DQM/observer mismatches if requested
+    self.tel_table = tels.TelMaskTable(ntels)
+    self.report_mismatch = False
+    #telescopes from DQM alone (mismatches always reported), as the 2.5.4 format did
+    self.dqm_tels = False
+
+    #winter/summer atmosphere calendar, loaded on first use
+    self.atm_calendar_file = atm.DEFAULT_CALENDAR
+    self.atm_calendar = None
+    #modification time of the file when atm_calendar was read (set_atm_calendar)
+    self.atm_calendar_mtime = None
+    #start times of runs outside the calendar, warned about once by report_atm_coverage
+    self.atm_uncovered = []
+
+    #database backend (pooled connections if a mysql driver is installed, mysql client otherwise)
+    if backend is None:
+      backend = db.get_backend('auto', self.hostName, self.portNum)
+    self.backend = backend
+
+    #optional on-disk run metadata cache (cache.RunCache), offline serves only from it
+    self.cache = None
+    self.offline = False
+    #optional memory-mapped bulk export of the run tables (snapshot.Snapshot)
+    self.snapshot = None
+
+    #number of queries allowed in flight at once
+    self.jobs = 1
+
+    #groups beyond this many runs / hours of data are written in balanced chunks (split)
+    self.max_group_runs = None
+    self.max_group_hours = None
+    #run durations (seconds, None if unknown) by run ID, kept when splitting by hours or sharding
+    self.keep_durations = False
+    self.durations = {}
+
+    #per-run "Querying" messages
+    self.verbose = True
+
+  def runSQL(self, execCMD, database, params=()):
+    '''
+    runs the mysql command provided and returns the first result row, "FAILED" if nothing
+    is found. A database that can't be reached raises db.DatabaseUnavailable instead
+    '''
+
+    rows = self.runSQL_rows(execCMD, database, params)
+    if not rows:
+      if self.verbose:
+        print >>sys.stderr, "nothing found in database..."
+      return "FAILED"
+    else:
+      return rows[0]
+
+  def runSQL_rows(self, execCMD, database, params=()):
+    '''runs the statement through the database backend and returns every result row'''
+    return self.backend.query(execCMD, database, params)
+
+  def get_query_key(self):
+    '''identifies the layout of the query rows, for the cache (the NA/UA dates go into them)'''
+    return '%s|%s|end' %(self.NA_date, self.UA_date)
+
+  def get_classification_key(self):
+    '''
+    identifies the settings runs are classified with: epoch dates, ATM calendar (file &
+    modification time) and telescope participation convention (journal records)
+    '''
+    calendar = os.path.abspath(self.atm_calendar_file)
+    return '%s|%s|%s|%s|%s|%d' %(self.NA_date, self.UA_date, calendar, self.get_atm_calendar_mtime(),
+                                 'dqm' if self.dqm_tels else 'dqm&observer', self.tel_table.ntels)
+
+  def get_offline_query(self, runIDs):
+    '''VOFFLINE statement & parameters for tel_cut_mask & data_category of a run (or list of runs)'''
+    if isinstance(runIDs, basestring):
+      return "select tel_cut_mask,data_category from tblRun_Analysis_Comments where run_id=%s", (runIDs,)
+    return ("select run_id,tel_cut_mask,data_category from tblRun_Analysis_Comments where run_id IN (%s)"
+            %(','.join(['%s']*len(runIDs))), tuple(runIDs))
+
+  def get_veritas_query(self, runIDs):
+    '''VERITAS statement & parameters for start time, date diffs, config_mask, run_type & end time of a run (or list of runs)'''
+    cols = "data_start_time,DATEDIFF(data_start_time,%s),DATEDIFF(data_start_time,%s),config_mask,run_type,data_end_time"
+    if isinstance(runIDs, basestring):
+      return "select %s from tblRun_Info where run_id=%%s" %(cols), (self.NA_date,self.UA_date,runIDs)
+    return ("select run_id,%s from tblRun_Info where run_id IN (%s)" %(cols,','.join(['%s']*len(runIDs))),
+            (self.NA_date,self.UA_date) + tuple(runIDs))
+
+  def run_queries(self, queries):
+    '''
+    runs a list of (execCMD, params, database) statements with up to self.jobs
+    of them in flight at once and returns their row lists in the same order
+    '''
+    if self.jobs <= 1 or len(queries) <= 1:
+      return [self.runSQL_rows(execCMD, database, params) for execCMD, params, database in queries]
+
+    from multiprocessing.pool import ThreadPool
+    pool = ThreadPool(min(self.jobs, len(queries)))
+    try:
+      #map_async + get keeps Ctrl-C working while the threads are busy
+      return pool.map_async(lambda q: self.runSQL_rows(q[0], q[2], q[1]), queries).get(1e9)
+    finally:
+      pool.terminate()
+
+  def query_runs(self, runIDs, chunkSize=500):
+    '''
+    fetches VOFFLINE and VERITAS rows for many runs with chunked IN-list queries
+    and joins them back to runs by ID. Returns two dicts keyed by run ID with rows
+    laid out like the single-run queries; runs not found are set to "FAILED"
+    '''
+    q_offline = {}
+    q_ver = {}
+    uniqueIDs = sorted(set(runIDs))
+    queries = []
+    targets = []
+    for i in range(0, len(uniqueIDs), chunkSize):
+      chunk = uniqueIDs[i:i+chunkSize]
+      queries.append(self.get_offline_query(chunk) + ('VOFFLINE',))
+      targets.append(q_offline)
+      queries.append(self.get_veritas_query(chunk) + ('VERITAS',))
+      targets.append(q_ver)
+
+    for results, rows in zip(targets, self.run_queries(queries)):
+      for row in rows:
+        rid, sep, rest = row.partition('\t')
+        #keep the first row per run, same as the single-run queries
+        if rid not in results:
+          results[rid] = rest
+
+    for runID in uniqueIDs:
+      q_offline.setdefault(runID, 'FAILED')
+      q_ver.setdefault(runID, 'FAILED')
+
+    return q_offline, q_ver
+
+  def fetch_runs(self, runIDs, batch=False, batchSize=500):
+    '''
+    returns the VOFFLINE and VERITAS rows of the given runs as two dicts keyed by run ID,
+    serving from the cache where possible and querying the database for the rest
+    '''
+    q_offline = {}
+    q_ver = {}
+    if self.cache is not None:
+      for runID, (q_off, q_v) in self.cache.get_many(runIDs, allowStale=self.offline).iteritems():
+        q_offline[runID] = q_off
+        q_ver[runID] = q_v
+
+    if self.snapshot is not None:
+      for runID, (q_off, q_v) in self.snapshot.get_many([r for r in runIDs if r not in q_ver], self.NA_date, self.UA_date).iteritems():
+        q_offline[runID] = q_off
+        q_ver[runID] = q_v
+
+    missing_set = set()
+    missing = []
+    for runID in runIDs:
+      if runID not in q_ver and runID not in missing_set:
+        missing.append(runID)
+        missing_set.add(runID)
+    if self.offline:
+      if missing:
+        print >>sys.stderr, "WARNING: %d runs are not in the cache or snapshot, treating them as not found:" %(len(missing)), ' '.join(missing)
+      for runID in missing:
+        q_offline[runID] = q_ver[runID] = 'FAILED'
+      return q_offline, q_ver
+
+    fetched = {}
+    if batch and missing:
+      if self.verbose:
+        print >>sys.stderr, "Querying",len(missing),"runs in batches of",batchSize,"..."
+      new_off, new_ver = self.query_runs(missing, batchSize)
+      for runID in missing:
+        fetched[runID] = (new_off[runID], new_ver[runID])
+    elif self.jobs > 1 and missing:
+      if self.verbose:
+        print >>sys.stderr, "Querying",len(missing),"runs with",self.jobs,"parallel jobs ..."
+      queries = []
+      for runID in missing:
+        queries.append(self.get_offline_query(runID) + ('VOFFLINE',))
+        queries.append(self.get_veritas_query(runID) + ('VERITAS',))
+      rows = self.run_queries(queries)
+      for n, runID in enumerate(missing):
+        fetched[runID] = tuple(r[0] if r else 'FAILED' for r in rows[2*n:2*n+2])
+    else:
+      for runID in missing:
+        if self.verbose:
+          print >>sys.stderr, "Querying",runID, "..."
+        execCMD_off, params_off = self.get_offline_query(runID)
+        execCMD_ver, params_ver = self.get_veritas_query(runID)
+        fetched[runID] = (self.runSQL(execCMD_off,'VOFFLINE',params_off),
+                          self.runSQL(execCMD_ver,'VERITAS',params_ver))
+
+    for runID, (q_off, q_v) in fetched.iteritems():
+      q_offline[runID] = q_off
+      q_ver[runID] = q_v
+    if self.cache is not None and fetched:
+      self.cache.put_many(fetched)
+
+    return q_offline, q_ver
+
+  def classify_paths(self, runs, batch=False, batchSize=500, vectorize=False):
+    '''
+    fetches metadata for a list of stage5 paths and classifies the runs.
+    Returns the run IDs, their fullConfigs and the VOFFLINE/VERITAS rows by run ID
+    '''
+    #Fetch metadata for all runs (cache first, then the database)
+    runIDs = [preflight.get_run_id(run) for run in runs]
+    q_offline, q_ver = self.fetch_runs(runIDs, batch, batchSize)
+    if self.keep_durations:
+      for runID in runIDs:
+        self.durations[runID] = split.get_duration(q_ver[runID])
+
+    #Classify all runs at once with numpy, or loop through file and classify each run
+    if vectorize:
+      fullConfigs = self.classify_runs(runIDs, q_offline, q_ver)
+    else:
+      fullConfigs = [self.classify_run(runID, q_offline[runID], q_ver[runID]) for runID in runIDs]
+    return runIDs, fullConfigs, q_offline, q_ver
+
+  def group_runs(self, runs, batch=False, batchSize=500, vectorize=False, groups=None):
+    '''
+    classifies a list of stage5 paths and adds each run to the group of its config
+    (groups dict of config -> runs, a new one if not given)
+    '''
+    if groups is None:
+      groups = {}
+
+    runIDs, fullConfigs, q_offline, q_ver = self.classify_paths(runs, batch, batchSize, vectorize)
+    for run, fullConfig in zip(runs, fullConfigs):
+      #check to see if a group already exists for a given config and add run to group
+      #otherwise, create a new group and add run to group
+      if fullConfig in groups:
+        groups[fullConfig].append(run)
+      else:
+        groups[fullConfig] = [run]
+    return groups
+
+  def group_lists(self, lists, batch=False, batchSize=500, vectorize=False):
+    '''
+    groups several lists of stage5 paths at once: runs appearing in more than one list are
+    fetched & classified only once. Returns a groups dict (config -> runs) per list
+    '''
+    unique = []
+    seen = set()
+    for runs in lists:
+      for run in runs:
+        runID = preflight.get_run_id(run)
+        if runID not in seen:
+          seen.add(runID)
+          unique.append(run)
+
+    runIDs, fullConfigs, q_offline, q_ver = self.classify_paths(unique, batch, batchSize, vectorize)
+    configs = dict(zip(runIDs, fullConfigs))
+
+    all_groups = []
+    for runs in lists:
+      groups = {}
+      for run in runs:
+        groups.setdefault(configs[preflight.get_run_id(run)], []).append(run)
+      all_groups.append(groups)
+    return all_groups
+
+  def classify_records(self, runs, batch=False, batchSize=500, vectorize=False):
+    '''classifies a list of stage5 paths and returns a journal record (dict) per run'''
+    runIDs, fullConfigs, q_offline, q_ver = self.classify_paths(runs, batch, batchSize, vectorize)
+    now = time.time()
+    records = []
+    for run, runID, fullConfig in zip(runs, runIDs, fullConfigs):
+      q_off, q_v = q_offline[runID], q_ver[runID]
+      records.append({'run' : run, 'runID' : runID, 'fullConfig' : fullConfig,
+                      'tel_cut_mask' : 'NULL' if q_off == 'FAILED' else self.get_tel_cut_mask(q_off),
+                      'config_mask' : 0 if q_v == 'FAILED' else self.get_tel_config_mask(q_v),
+                      'run_time' : cache.get_run_time(q_v), 'duration' : split.get_duration(q_v),
+                      'queried' : now})
+    return records
+
+  def export_records(self, records, groups, user_configs, firstGroupID=0):
+    '''
+    turns classification records (classify_records) of the runs in groups into export
+    records (export), with the group IDs & EAs print_runlist writes for them
+    '''
+    writer = self.get_writer()
+    group_ids = writer.run_group_ids(groups, firstGroupID)
+    EAs = dict((config, writer.get_EA(config, user_configs, check=False)) for config in groups)
+
+    exported = []
+    for record in records:
+      Ver, Array, SeasonID, TelConfig, DataCat = record['fullConfig'].split('_', 4)
+      exported.append({'run_id' : int(record['runID']) if record['runID'].isdigit() else -1,
+                       'path' : record['run'], 'epoch' : Ver + '_' + Array, 'atm' : SeasonID,
+                       'dqm_tels' : self.tel_table.get_dqm_combo(record['tel_cut_mask'])[1:],
+                       'observer_tels' : self.get_tel_combo(record['config_mask'])[1:],
+                       'tels' : TelConfig, 'data_category' : DataCat,
+                       'group_id' : group_ids[record['run']], 'ea' : EAs[record['fullConfig']]})
+    return exported
+
+  def classify_run(self, runID, q_offline, q_ver):
+    '''uses the query results of a run to build the combined config code used for grouping'''
+
+    #these fails only seem to happen for oldest runs maybe before existence of DB.
+
+    #OFFLINE
+    if q_offline == 'FAILED':
+      print >>sys.stderr, "Failed retrieving OFFLINE DB info, assigning default configs to run",runID
+      tcutmask = 'NULL'
+      data_cat = '_science'
+    else:
+      #use query results to determine parameters required for grouping runs
+      tcutmask = self.get_tel_cut_mask(q_offline) #Telescope participation indicator (dqm)
+      data_cat = self.get_data_category(q_offline,q_ver) #data category: science/filter/rhv/etc.
+    #VERITAS
+    if q_ver == 'FAILED':
+      print >>sys.stderr, "Failed retrieving VERITAS DB info, assigning default configs to run",runID
+      tconfigmask = 0
+      array_config = 'V4_OldArray'
+      atm = '_ATM22'
+    else:
+      #use query results to determine parameters required for grouping runs
+      tconfigmask = self.get_tel_config_mask(q_ver) #Telescope participation indicator (observer)
+      array_config = self.get_array_config(q_ver) #array configuration (oa/na/ua)
+      atm = self.get_atm(q_ver) # ATM21/22
+
+    #Choose telescope combination
+    if tcutmask == 'NULL':
+      #print >>sys.stderr, "No DQM info exists, using observer reported tel-config"
+      tel_combo = self.get_tel_combo(tconfigmask)
+    #if TEL_CUT_MASK does exist, crosschecking with CONFIG_MASK
+    else:
+      #print >>sys.stderr, "DQM info available, cross-checking with observer-reported tel config"
+      tel_combo = self.reconcile_tel_masks(tcutmask, tconfigmask)
+      if self.report_mismatch or self.dqm_tels:
+        self.report_tel_mismatch(runID, tcutmask, tconfigmask)
+
+    #combined configuration code for identifying runs with groups
+    return array_config + atm + tel_combo + data_cat
+
+ 
+  def classify_runs(self, runIDs, q_offline, q_ver):
+    '''
+    vectorized counterpart of classify_run: parses the query rows of a whole list of runs
+    and returns their combined config codes (in order) using classify_batch
+    '''
+    import numpy as np
+    nruns = len(runIDs)
+    start_times = []
+    diff_NA = np.zeros(nruns, dtype=np.int64)
+    diff_UA = np.zeros(nruns, dtype=np.int64)
+    config_masks = np.zeros(nruns, dtype=np.int64)
+    cut_masks = []
+    cat_off = []
+    cat_ver = []
+    failed_off = np.zeros(nruns, dtype=bool)
+    failed_ver = np.zeros(nruns, dtype=bool)
+
+    for n, runID in enumerate(runIDs):
+      if q_offline[runID] == 'FAILED':
+        print >>sys.stderr, "Failed retrieving OFFLINE DB info, assigning default configs to run",runID
+        failed_off[n] = True
+        cut_masks.append('NULL')
+        cat_off.append('science')
+      else:
+        fields = q_offline[runID].split('\t')
+        cut_masks.append(fields[0])
+        cat_off.append(fields[1])
+
+      if q_ver[runID] == 'FAILED':
+        print >>sys.stderr, "Failed retrieving VERITAS DB info, assigning default configs to run",runID
+        failed_ver[n] = True
+        start_times.append('NaT')
+        cat_ver.append('observing')
+      else:
+        fields = q_ver[runID].split('\t')
+        start_times.append(fields[0].replace(' ','T'))
+        diff_NA[n] = int(fields[1])
+        diff_UA[n] = int(fields[2])
+        config_masks[n] = int(fields[3])
+        cat_ver.append(fields[4])
+
+    if self.report_mismatch or self.dqm_tels:
+      for n, runID in enumerate(runIDs):
+        if cut_masks[n] != 'NULL':
+          self.report_tel_mismatch(runID, cut_masks[n], config_masks[n])
+
+    classes = self.classify_batch(np.array(start_times, dtype='datetime64[s]'), diff_NA, diff_UA,
+                                  config_masks, np.array(cut_masks), np.array(cat_off), np.array(cat_ver))
+
+    #reported together by report_atm_coverage, as for classify_run
+    self.atm_uncovered += [start_times[n].replace('T',' ') for n in np.flatnonzero(~classes['atm_covered'] & ~failed_ver)]
+
+    #default configs for runs missing from VOFFLINE/VERITAS
+    classes['data_cat'][failed_off] = '_science'
+    classes['array_config'][failed_ver] = 'V4_OldArray'
+    classes['atm'][failed_ver] = '_ATM22'
+
+    fullConfigs = classes['array_config']
+    for key in ['atm','tel_combo','data_cat']:
+      fullConfigs = np.char.add(fullConfigs, classes[key])
+    return fullConfigs.tolist()
+
+  def classify_batch(self, start_times, diff_NA, diff_UA, config_masks, cut_masks, cat_off, cat_ver):
+    '''
+    classifies whole arrays of runs at once. Takes run start times (datetime64), day differences
+    to the NA & UA dates, config masks (ints), tel_cut_masks (strings, NULL if missing) and the
+    VOFFLINE/VERITAS data categories. Returns a dict of string arrays keyed by
+    array_config, atm, tel_combo & data_cat, matching the scalar get_* methods,
+    plus a boolean array atm_covered flagging runs within the ATM calendar
+    '''
+    import numpy as np
+    #array epoch
+    array_config = np.where(diff_UA >= 0, 'V6_PMTUpgrade',
+                            np.where(diff_NA >= 0, 'V5_T1Move', 'V4_OldArray')).astype('|S13')
+
+    #ATM: winter if strictly between the start & end of a winter, i.e. an odd number
+    #of boundaries lie before the run and the run doesn't fall on a boundary
+    calendar = self.get_atm_calendar()
+    bounds = calendar.bounds64()
+    n_before = np.searchsorted(bounds, start_times, side='left')
+    n_upto = np.searchsorted(bounds, start_times, side='right')
+    is_winter = (n_before % 2 == 1) & (n_before == n_upto)
+    atm = np.where(is_winter, '_ATM21', '_ATM22')
+    atm_covered = (start_times >= bounds[0]) & (start_times <= bounds[-1])
+
+    #telescope combination: DQM & observer telescope bits ANDed together, one table lookup per run
+    if self.dqm_tels:
+      tel_combo = self.tel_table.dqm_many(cut_masks, config_masks)
+    else:
+      tel_combo = self.tel_table.reconcile_many(cut_masks, config_masks)
+
+    #data category, same precedence as get_data_category
+    data_cat = np.char.add('_', cat_off)
+    data_cat = np.where((cat_off == 'reducedhv') | (cat_ver == 'obsLowHV'), '_reducedhv', data_cat)
+    data_cat = np.where((cat_off == 'filter') | (cat_off == 'moonfilter') | (cat_ver == 'obsFilter'),
+                        '_moonfilter', data_cat)
+    data_cat = np.where(((cat_off == 'science') | (cat_off == 'NULL')) & (cat_ver == 'observing'),
+                        '_science', data_cat)
+
+    return {'array_config' : array_config, 'atm' : atm, 'atm_covered' : atm_covered,
+            'tel_combo' : tel_combo, 'data_cat' : data_cat}
+
+  def get_tel_cut_mask(self, query):
+    '''parses query results for tel_cut_mask'''
+    return query.split("\t")[0]
+
+  def get_data_category(self, query_off,query_ver):
+    '''parses query output for data category(science/reducedhv/moonfilter)'''
+    cat_off = query_off.split('\t')[1]
+    #runs missing from VERITAS get the default run_type
+    if query_ver == 'FAILED':
+      cat_ver = 'observing'
+    else:
+      cat_ver = query_ver.split('\t')[4]
+
+    if (cat_off =='science' or cat_off == 'NULL') and cat_ver == 'observing':
+      return '_science'
+    elif cat_off == 'filter' or cat_off == 'moonfilter' or cat_ver == 'obsFilter':
+      return '_moonfilter'
+    elif cat_off == 'reducedhv' or cat_ver == 'obsLowHV':
+      return '_reducedhv'
+    else:
+      return '_'+cat_off
+
+  
+  def get_tel_config_mask(self, query):
+    '''parses query output for config_mask'''
+    return int(query.split('\t')[3])
+
+  def get_tel_combo(self, tel_config_mask):
+    '''uses config mask to determine telescope participation'''
+    return self.tel_table.get_combo(tel_config_mask)
+
+  def reconcile_tel_masks(self, tel_cut_mask, tel_config_mask):
+    '''
+    when tel_cut_mask is present, checks it against tel_config_mask
+    and returns the best configuration for analysis (most Tels cut), or the DQM one with dqm_tels
+    '''
+    if self.dqm_tels:
+      return self.tel_table.get_dqm_combo(tel_cut_mask)
+    return self.tel_table.reconcile(tel_cut_mask, tel_config_mask)
+
+  def report_tel_mismatch(self, runID, tel_cut_mask, tel_config_mask):
+    '''prints the telescopes DQM and the observer disagree on for a run, if any'''
+    tels = self.tel_table.disagreement(tel_cut_mask, tel_config_mask)
+    if tels:
+      print >>sys.stderr, "DQM and observer reported telescope participation do not match for run %s on %s (tel_cut_mask %s, config_mask %s)%s" %(
+        runID, ','.join('T%d' %(t) for t in tels), tel_cut_mask, tel_config_mask, ", using DQM-reported info" if self.dqm_tels else "")
+
+  def get_atm(self, query):
+    '''parses query result for month (day) and returns appropriate ATM (21 or 22)'''
+    
+    obs_date = datetime.strptime(query.split('\t')[0],"%Y-%m-%d %H:%M:%S")
+    calendar = self.get_atm_calendar()
+    if not calendar.is_covered(obs_date):
+      self.atm_uncovered.append(str(obs_date))
+
+    #checks the date ranges for winter atm for each run to pick atm21/22
+    if calendar.is_winter(obs_date):
+      return '_ATM21'
+    else:
+      return '_ATM22'
+
+  def report_atm_coverage(self):
+    '''one warning for all runs classified outside the ATM calendar since the last report'''
+    if self.atm_uncovered:
+      print >>sys.stderr, "WARNING: %d run(s) from %s to %s are outside the ATM calendar %s, assigning ATM22" %(
+        len(self.atm_uncovered), min(self.atm_uncovered), max(self.atm_uncovered), self.get_atm_calendar().source)
+    self.atm_uncovered = []
+
+  def get_atm_calendar(self):
+    '''winter/summer season calendar (atm.AtmCalendar), read from atm_calendar_file once'''
+    if self.atm_calendar is None:
+      self.atm_calendar_mtime = self.get_atm_calendar_mtime()
+      self.atm_calendar = atm.load_calendar(self.atm_calendar_file)
+    return self.atm_calendar
+
+  def get_atm_calendar_mtime(self):
+    '''modification time of the calendar file, None if it doesn't exist'''
+    calendar = os.path.abspath(self.atm_calendar_file)
+    return os.path.getmtime(calendar) if os.path.exists(calendar) else None
+
+  def set_atm_calendar(self, path):
+    '''uses the calendar file at path, reading it again if it was edited since it was loaded'''
+    if path != self.atm_calendar_file or (self.atm_calendar is not None and self.get_atm_calendar_mtime() != self.atm_calendar_mtime):
+      self.atm_calendar_file = path
+      self.atm_calendar = None
+
+  def reload_atm_calendar(self):
+    '''picks up edits to the calendar file'''
+    self.atm_calendar = None
+    return self.get_atm_calendar()
+
+  def get_array_config(self, query):
+    '''
+    parses query result for difference between run date & NA
+    and run date & UA and returns array config (OA, NA, or UA)
+    '''
+    date_diff_NA = int(query.split('\t')[1])
+    date_diff_UA = int(query.split('\t')[2])
+    
+    #Choose upgrade, new, or old array
+    if date_diff_UA >= 0:
+      return 'V6_PMTUpgrade'
+    elif date_diff_NA >= 0:
+      return 'V5_T1Move'
+    elif date_diff_NA < 0:
+      return 'V4_OldArray'
+
+  def check_EA_file(self, EApath):
+    '''checks the existence of the specified EA file, against the EA catalog if one is loaded'''
+    if self.EA_catalog is None:
+      if not os.path.isfile(EApath):
+        print >>sys.stderr, 'WARNING: EA file %s does not exist!' %(EApath)
+    elif not self.EA_catalog.exists(EApath):
+      print >>sys.stderr, 'WARNING: EA file %s does not exist!' %(EApath)
+      suggestions = self.EA_catalog.suggest(EApath)
+      if suggestions:
+        print >>sys.stderr, '  closest EA files available in %s:' %(self.EA_catalog.directory)
+        for name in suggestions:
+          print >>sys.stderr, '    %s' %(name)
+
+  def load_EA_catalog(self, cacheFile=None):
+    '''indexes the EA directory once so EA checks don't stat every file'''
+    if os.path.isdir(self.EA_file_dir):
+      self.EA_catalog = ea.load_catalog(self.EA_file_dir, cacheFile)
+    else:
+      print >>sys.stderr, 'WARNING: EA directory %s does not exist!' %(self.EA_file_dir)
+    return self.EA_catalog
+
+  def get_EA_file(self, EA_config, user_configs):
+    '''EA filename generator based on standard naming conventions (rules in EA_rules_file)'''
+    return self.get_EA_rules().resolve(EA_config, user_configs)
+
+  def get_group_EA(self, EA_config, user_configs, check=True):
+    '''EA of a group: the EA file with matchEA (checked to exist), the group config otherwise'''
+    if not self.matchEA:
+      return EA_config
+    EApath = self.EA_file_dir + self.get_EA_file(EA_config, user_configs)
+    if check:
+      self.check_EA_file(EApath)
+    return EApath
+
+  def get_EA_rules(self):
+    '''EA naming rules (ea.EANamingRules), read from EA_rules_file once'''
+    if self.EA_rules is None:
+      self.EA_rules = ea.load_rules(self.EA_rules_file)
+    return self.EA_rules
+
+  def print_runlist(self,groups,outfile, user_configs, BDT = False, bdtCutsFile= "", firstGroupID = 0):
+    '''
+    takes dictionary of run groups and output file and
+    prints them in the runlist format of self.vegas (see writers).
+    Group IDs start at firstGroupID (to append to a runlist), returns the next free ID
+    '''
+    #BDT cuts are loaded & checked against the groups before anything is written
+    bdtTable = None
+    if BDT:
+      bdtTable = self.get_bdt_table(bdtCutsFile, groups.keys())
+    return self.get_writer().write(groups, outfile, user_configs, bdtTable, firstGroupID)
+
+  def print_split_runlists(self, groups, template, user_configs, BDT = False, bdtCutsFile = ""):
+    '''
+    like print_runlist, but writes every group (or chunk of a split group) into a runlist
+    file of its own, named by template with {id} replaced by the group ID. Returns the names
+    '''
+    bdtTable = None
+    if BDT:
+      bdtTable = self.get_bdt_table(bdtCutsFile, groups.keys())
+    return self.get_writer().write_files(groups, template, user_configs, bdtTable)
+
+  def split_groups(self, groups):
+    '''
+    (EA_config, runs) pairs of groups (pairs as well) with every group beyond max_group_runs
+    runs or max_group_hours of data split into balanced chunks, one pair per chunk
+    '''
+    chunks = []
+    for EA_config, group_runs in groups:
+      if self.max_group_runs:
+        parts = split.split_runs(group_runs, self.max_group_runs)
+      elif self.max_group_hours:
+        durations = [self.durations.get(preflight.get_run_id(run)) for run in group_runs]
+        parts = split.split_durations(group_runs, durations, self.max_group_hours*3600.)
+      else:
+        parts = [group_runs]
+      chunks.extend((EA_config, part) for part in parts)
+    return chunks
+
+  def set_vegas(self, version):
+    '''
+    switches to the runlist format of a VEGAS version, with its epoch dates & telescope
+    participation convention. Raises ValueError for unknown versions
+    '''
+    self.vegas = version
+    writer = self.get_writer()
+    self.NA_date, self.UA_date = writer.epoch_dates or self.epoch_dates
+    self.dqm_tels = writer.dqm_tels
+    #cached rows hold the date differences of the dates they were queried with
+    if self.cache is not None:
+      self.cache.key = self.get_query_key()
+    return writer
+
+  def get_writer(self):
+    '''runlist writer of the VEGAS version asked for (self.vegas)'''
+    #shallow copies (s6listgen.service requests) get a writer of their own
+    if self.writer is None or self.writer.version != self.vegas or self.writer.listgen is not self:
+      self.writer = writers.get_writer(self.vegas)(self, self.vegas)
+    return self.writer
+
+  def get_bdt_table(self, bdtCutsFile, configs):
+    '''loads the BDT cuts table and exits if it lacks a column needed by the group configs'''
+    if not os.path.isfile(bdtCutsFile):
+      sys.exit('BDT cuts file %s does not exist!' %(bdtCutsFile))
+    bdtTable = bdt.load_table(bdtCutsFile)
+    missing = bdtTable.missing_columns(configs)
+    if missing:
+      sys.exit('BDT cuts file %s has no column(s) %s needed for this runlist!' %(bdtCutsFile, ', '.join(missing)))
+    return bdtTable
@@ -0,0 +1,439 @@
+'''
+Database backends used by s6RunlistGen.py for the VERITAS/VOFFLINE lookups.
+
+Every backend exposes query(execCMD, database, params) which runs a statement with
+%s placeholders and returns the result rows as tab-separated strings, laid out the
+same way the mysql command line client prints them (NULL for missing values), so
+the parsing in ListGen works unchanged whichever backend is used.
+
+  MySQLBackend  - persistent pooled connections through MySQLdb or pymysql
+  CLIBackend    - spawns the mysql client for every query (the original behaviour)
+  SQLiteBackend - local stand-in with one <database>.sqlite file per database
+  RecordingBackend/ReplayBackend - capture real responses and serve them offline later
+  FailoverBackend - routes statements over several mirrors with retries & circuit breakers
+
+A statement that finds nothing returns no rows; a database that can't be reached (refused,
+timed out, dropped connection) raises DatabaseUnavailable instead, so a dead mirror is
+never mistaken for runs missing from the database.
+'''
+
+import os
+import re
+import sys
+import json
+import time
+import subprocess
+import sqlite3
+import threading
+import Queue
+
+from datetime import date
+
+
+def _load_mysql_driver():
+  '''returns whichever DB-API mysql driver is installed, or None'''
+  try:
+    import MySQLdb
+    return MySQLdb
+  except ImportError:
+    pass
+  try:
+    import pymysql
+    return pymysql
+  except ImportError:
+    return None
+
+
+class DatabaseError(Exception):
+  '''a statement failed on the server'''
+
+
+class DatabaseUnavailable(DatabaseError):
+  '''the database couldn't be reached or didn't answer in time'''
+
+
+#mysql client error codes (2000 and up) are connection problems, server errors are below
+_mysql_error = re.compile(r'ERROR (\d+)')
+
+
+def is_connection_error(code):
+  return code is None or int(code) >= 2000
+
+
+def format_value(value):
+  '''formats a column value the way the mysql client prints it'''
+  if value is None:
+    return 'NULL'
+  if isinstance(value, unicode):
+    return value.encode('utf-8')
+  return str(value)
+
+
+def format_row(row):
+  return '\t'.join(format_value(v) for v in row)
+
+
+def quote_literal(value):
+  '''renders a parameter as an SQL literal for backends without placeholder support'''
+  if value is None:
+    return 'NULL'
+  if isinstance(value, (int, long, float)):
+    return str(value)
+  return "'%s'" %(str(value).replace('\\','\\\\').replace("'","\\'"))
+
+
+def _kill(process, killed):
+  '''kills a process still running, noting it in killed'''
+  try:
+    process.kill()
+    killed.append(True)
+  except OSError:
+    pass
+
+
+class CLIBackend(object):
+  '''spawns the mysql command line client for every query, killing it after timeout seconds'''
+
+  def __init__(self, hostName, portNum, user='readonly', timeout=None):
+    self.hostName = hostName
+    self.portNum = portNum
+    self.user = user
+    self.timeout = timeout
+
+  def query(self, execCMD, database, params=()):
+    '''interpolates the parameters, runs the mysql client and returns the rows (header stripped)'''
+    if params:
+      execCMD = execCMD %tuple(quote_literal(p) for p in params)
+
+    command = ['mysql','-h','%s' %(self.hostName),'-u', self.user,'-D','%s' %(database), '--execute=%s' %(execCMD)]
+    if self.portNum:
+      command[3:3] = ['-P','%s' %(self.portNum)]
+    if self.timeout:
+      command.insert(1, '--connect-timeout=%d' %(max(1, int(self.timeout))))
+    try:
+      sqlOut = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError as e:
+      raise DatabaseUnavailable("can't run the mysql client: %s" %(e))
+
+    #communicate() has no timeout in python 2, a timer kills a hung client instead
+    killed = []
+    timer = None
+    if self.timeout:
+      timer = threading.Timer(self.timeout, _kill, (sqlOut, killed))
+      timer.start()
+    try:
+      query, err = sqlOut.communicate()
+    finally:
+      if timer is not None:
+        timer.cancel()
+
+    if killed:
+      raise DatabaseUnavailable("%s: no answer within %g s" %(self.hostName, self.timeout))
+    if sqlOut.returncode != 0:
+      match = _mysql_error.search(err)
+      message = "%s: %s" %(self.hostName, err.strip() or 'mysql exited with status %d' %(sqlOut.returncode))
+      if is_connection_error(match.group(1) if match else None):
+        raise DatabaseUnavailable(message)
+      raise DatabaseError(message)
+    if query == '':
+      return []
+    else:
+      return query.rstrip().split('\n')[1:]
+
+  def close(self):
+    pass
+
+
+class MySQLBackend(object):
+  '''keeps a pool of open connections per database and runs parameterized statements'''
+
+  def __init__(self, hostName, portNum, user='readonly', poolSize=4, timeout=None):
+    self.driver = _load_mysql_driver()
+    if self.driver is None:
+      raise ImportError("MySQLBackend needs MySQLdb or pymysql")
+    self.hostName = hostName
+    self.portNum = portNum
+    self.user = user
+    self.poolSize = poolSize
+    self.timeout = timeout
+    self.pools = {}
+    self.lock = threading.Lock()
+
+  def connect(self, database):
+    kwargs = {'host' : self.hostName, 'user' : self.user, 'db' : database}
+    if self.portNum:
+      kwargs['port'] = int(self.portNum)
+    if self.timeout:
+      kwargs['connect_timeout'] = max(1, int(self.timeout))
+      kwargs['read_timeout'] = max(1, int(self.timeout))
+    try:
+      return self.driver.connect(**kwargs)
+    except self.driver.Error as e:
+      raise self.translate_error(e)
+
+  def translate_error(self, e):
+    '''DatabaseUnavailable for connection problems & timeouts, DatabaseError otherwise'''
+    code = e.args[0] if e.args and isinstance(e.args[0], (int, long)) else None
+    if isinstance(e, (self.driver.OperationalError, self.driver.InterfaceError)) and is_connection_error(code):
+      return DatabaseUnavailable("%s: %s" %(self.hostName, e))
+    return DatabaseError("%s: %s" %(self.hostName, e))
+
+  def get_pool(self, database):
+    with self.lock:
+      if database not in self.pools:
+        self.pools[database] = Queue.Queue(self.poolSize)
+      return self.pools[database]
+
+  def query(self, execCMD, database, params=()):
+    '''borrows a pooled connection, executes the statement and returns the rows'''
+    pool = self.get_pool(database)
+    try:
+      conn = pool.get_nowait()
+    except Queue.Empty:
+      conn = self.connect(database)
+
+    try:
+      cursor = conn.cursor()
+      cursor.execute(execCMD, tuple(params))
+      rows = [format_row(r) for r in cursor.fetchall()]
+      cursor.close()
+    except Exception as e:
+      #don't hand a broken connection back to the pool
+      conn.close()
+      if isinstance(e, self.driver.Error):
+        raise self.translate_error(e)
+      raise
+
+    try:
+      pool.put_nowait(conn)
+    except Queue.Full:
+      conn.close()
+    return rows
+
+  def close(self):
+    for pool in self.pools.values():
+      while not pool.empty():
+        pool.get_nowait().close()
+
+
+def datediff(date1, date2):
+  '''DATEDIFF() as in MySQL: difference in days between the date parts'''
+  if date1 is None or date2 is None:
+    return None
+  #sliced by hand, strptime isn't thread-safe on first use in python 2
+  d1, d2 = str(date1), str(date2)
+  return (date(int(d1[:4]),int(d1[5:7]),int(d1[8:10])) - date(int(d2[:4]),int(d2[5:7]),int(d2[8:10]))).days
+
+
+class SQLiteBackend(object):
+  '''
+  stand-in for the VERITAS/VOFFLINE databases, reading <dbDir>/<database>.sqlite.
+  Provides DATEDIFF so the production queries run unchanged.
+  '''
+
+  schema = {'VERITAS' : ['create table if not exists tblRun_Info (run_id integer primary key, '
+                         'data_start_time text, data_end_time text, config_mask integer, run_type text)'],
+            'VOFFLINE' : ['create table if not exists tblRun_Analysis_Comments (run_id integer, '
+                          'tel_cut_mask text, data_category text)',
+                          'create index if not exists idx_comments_run on tblRun_Analysis_Comments (run_id)']}
+
+  def __init__(self, dbDir='./'):
+    self.dbDir = dbDir
+    self.local = threading.local()
+
+  def connect(self, database):
+    '''returns this thread's connection to a database (sqlite connections can't be shared)'''
+    conns = getattr(self.local, 'conns', None)
+    if conns is None:
+      conns = self.local.conns = {}
+    if database not in conns:
+      conn = sqlite3.connect(os.path.join(self.dbDir, '%s.sqlite' %(database)))
+      conn.text_factory = str
+      conn.create_function('DATEDIFF', 2, datediff)
+      conns[database] = conn
+    return conns[database]
+
+  def create_tables(self):
+    '''creates the tables the generator queries, if they don't exist yet'''
+    for database, statements in self.schema.iteritems():
+      conn = self.connect(database)
+      for statement in statements:
+        conn.execute(statement)
+      conn.commit()
+
+  def query(self, execCMD, database, params=()):
+    '''runs the statement (with %s placeholders) and returns the rows'''
+    cursor = self.connect(database).execute(execCMD.replace('%s','?'), tuple(params))
+    return [format_row(r) for r in cursor.fetchall()]
+
+  def close(self):
+    for conn in getattr(self.local, 'conns', {}).values():
+      conn.close()
+    self.local.conns = {}
+
+
+class RecordingBackend(object):
+  '''passes statements on to another backend and records the responses for ReplayBackend'''
+
+  def __init__(self, backend, path):
+    self.backend = backend
+    self.path = path
+    self.responses = {}
+    self.lock = threading.Lock()
+
+  def query(self, execCMD, database, params=()):
+    rows = self.backend.query(execCMD, database, params)
+    with self.lock:
+      self.responses[_response_key(execCMD, database, params)] = rows
+    return rows
+
+  def close(self):
+    '''writes the recorded responses and closes the wrapped backend'''
+    with open(self.path, 'w') as f:
+      json.dump([[key, rows] for key, rows in sorted(self.responses.iteritems())], f)
+    self.backend.close()
+
+
+class ReplayBackend(object):
+  '''answers statements from responses captured by RecordingBackend, without any database'''
+
+  def __init__(self, path):
+    self.path = path
+    self.responses = dict((key, [str(r) for r in rows]) for key, rows in json.load(open(path)))
+
+  def query(self, execCMD, database, params=()):
+    '''recorded rows, statements that were never recorded find nothing'''
+    return self.responses.get(_response_key(execCMD, database, params), [])
+
+  def close(self):
+    pass
+
+
+class Mirror(object):
+  '''one database host of a FailoverBackend with its latency estimate & circuit breaker state'''
+
+  def __init__(self, name, backend):
+    self.name = name
+    self.backend = backend
+    #exponentially weighted mean query time, None until the first answer
+    self.latency = None
+    self.failures = 0
+    self.open_until = 0.
+
+  def available(self, now):
+    '''closed circuit, or open but cooled down (half-open: one more try decides)'''
+    return now >= self.open_until
+
+
+class FailoverBackend(object):
+  '''
+  runs every statement on the fastest available mirror, moving on to the next one when a
+  mirror is unreachable. After failures consecutive failures a mirror's circuit opens and
+  it is skipped for cooldown seconds. When no mirror answers, the statement is retried
+  after backoff, 2*backoff, ... seconds, retries times, before DatabaseUnavailable is raised.
+  Statements that fail on the server (DatabaseError) aren't retried elsewhere
+  '''
+
+  def __init__(self, mirrors, retries=2, backoff=1., failures=3, cooldown=30., smoothing=0.3):
+    '''mirrors: (name, backend) pairs, in order of preference until latencies are known'''
+    self.mirrors = [Mirror(name, backend) for name, backend in mirrors]
+    self.retries = retries
+    self.backoff = backoff
+    self.failures = failures
+    self.cooldown = cooldown
+    self.smoothing = smoothing
+    self.lock = threading.Lock()
+
+  def route(self):
+    '''available mirrors, fastest first. Mirrors without an answer yet are tried first so every mirror gets timed'''
+    now = time.time()
+    with self.lock:
+      available = [m for m in self.mirrors if m.available(now)]
+      return sorted(available, key=lambda m: -1 if m.latency is None else m.latency)
+
+  def succeeded(self, mirror, elapsed):
+    with self.lock:
+      if mirror.latency is None:
+        mirror.latency = elapsed
+      else:
+        mirror.latency += self.smoothing*(elapsed - mirror.latency)
+      mirror.failures = 0
+      mirror.open_until = 0.
+
+  def failed(self, mirror, e):
+    now = time.time()
+    with self.lock:
+      #failures only reset on success, so a half-open mirror that fails again is skipped right away
+      mirror.failures += 1
+      if mirror.failures >= self.failures:
+        if mirror.available(now):
+          print >>sys.stderr, "WARNING: database mirror %s is down (%s), skipping it for %g s" %(mirror.name, e, self.cooldown)
+        mirror.open_until = now + self.cooldown
+
+  def query(self, execCMD, database, params=()):
+    errors = []
+    for attempt in range(self.retries + 1):
+      if attempt:
+        time.sleep(self.backoff*2**(attempt - 1))
+      for mirror in self.route():
+        start = time.time()
+        try:
+          rows = mirror.backend.query(execCMD, database, params)
+        except DatabaseUnavailable as e:
+          self.failed(mirror, e)
+          errors.append(str(e))
+          continue
+        self.succeeded(mirror, time.time() - start)
+        return rows
+    if not errors:
+      errors.append("every mirror is skipped after repeated failures")
+    raise DatabaseUnavailable("no database mirror answered after %d attempts: %s" %(self.retries + 1, errors[-1]))
+
+  def status(self):
+    '''(name, latency, failures, open) of every mirror'''
+    now = time.time()
+    with self.lock:
+      return [(m.name, m.latency, m.failures, not m.available(now)) for m in self.mirrors]
+
+  def close(self):
+    for mirror in self.mirrors:
+      mirror.backend.close()
+
+
+def parse_hosts(value, defaultPort=''):
+  '''(host, port) pairs from a comma separated host[:port] list'''
+  hosts = []
+  for entry in value.split(','):
+    entry = entry.strip()
+    if entry:
+      host, sep, port = entry.partition(':')
+      hosts.append((host, port if sep else defaultPort))
+  return hosts
+
+
+def _response_key(execCMD, database, params):
+  return json.dumps([database, execCMD, [str(p) for p in params]])
+
+
+def get_backend(name, hostName, portNum, dbDir='./', poolSize=4, timeout=None):
+  '''
+  backend factory. "auto" uses pooled connections when a mysql driver is installed
+  and falls back to spawning the mysql client otherwise
+  '''
+  if name == 'sqlite':
+    return SQLiteBackend(dbDir)
+  if name == 'cli':
+    return CLIBackend(hostName, portNum, timeout=timeout)
+  if name == 'mysql':
+    return MySQLBackend(hostName, portNum, poolSize=poolSize, timeout=timeout)
+  if name == 'auto':
+    if _load_mysql_driver() is not None:
+      return MySQLBackend(hostName, portNum, poolSize=poolSize, timeout=timeout)
+    return CLIBackend(hostName, portNum, timeout=timeout)
+  raise ValueError("unknown database backend '%s'" %(name))
+
+
+def get_failover_backend(name, hosts, poolSize=4, timeout=None, retries=2, backoff=1., failures=3, cooldown=30.):
+  '''FailoverBackend over one mysql/cli/auto backend per (host, port) mirror'''
+  return FailoverBackend([('%s:%s' %(host, port) if port else host, get_backend(name, host, port, poolSize=poolSize, timeout=timeout))
+                          for host, port in hosts], retries, backoff, failures, cooldown)
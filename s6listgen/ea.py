@@ -0,0 +1,210 @@
+'''
+EA directory catalog for s6RunlistGen.py --EAmatch.
+
+The EA directory is listed once (os.scandir where available) and the filenames are
+indexed in memory together with the components parsed from them (simulation model,
+epoch, season, simulation source, cuts, offset, telescope config, LZA), so checking
+whether an EA exists costs no filesystem access and a missing EA can be answered
+with the closest files that do exist. The listing can be cached in a JSON file and is
+reused as long as the directory's modification time hasn't changed.
+
+The naming conventions themselves (size cuts per epoch, shape cuts per cut set, fix
+suffixes, vegas version, filename layout) are read from a rules file (ea_rules.json)
+by EANamingRules, which resolves each (group config, user options) once.
+'''
+
+import os
+import re
+import json
+import difflib
+
+try:
+  from os import scandir
+except ImportError:
+  try:
+    from scandir import scandir
+  except ImportError:
+    scandir = None
+
+
+DEFAULT_RULES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ea_rules.json')
+
+_catalogs = {}
+_rules = {}
+
+#components of an EA name and how much a match on each counts towards a suggestion
+COMPONENT_WEIGHTS = [('epoch', 8), ('season', 8), ('telconfig', 6), ('cuts', 5), ('multiplicity', 4),
+                     ('offset', 3), ('lza', 3), ('model', 2), ('source', 2)]
+
+_patterns = {'model' : re.compile(r'^ea_?([^_]+?)(?=_?V[4-6]|_|$)'),
+             'epoch' : re.compile(r'(V[4-6])_?(OldArray|T1Move|PMTUpgrade)?'),
+             'season' : re.compile(r'(ATM2[12])'),
+             'source' : re.compile(r'_(GrISU[A-Za-z]*|KASCADE|CARE)(?=_|$)'),
+             'offset' : re.compile(r'_(Alloff|\d+off)(?=_|$)'),
+             'multiplicity' : re.compile(r'_s\d+(t\d)'),
+             'cuts' : re.compile(r'_(s\d+)t\d.*?(_MSW[\d.p]+)?(_MSL[\d.p]+)?(_MH[\d.p]+)?(_ThetaSq[\d.p]+?)(?=[1-4-]{4}(?:_|$)|_|$)'),
+             'telconfig' : re.compile(r'([1-4-]{4})(?=_LZA|_fixed|_v\d|$)'),
+             'lza' : re.compile(r'_(LZA)(?=_|$)')}
+
+
+def parse_EA_name(name):
+  '''splits an EA filename into its components (None where a component isn't found)'''
+  stem = name[:-len('.root')] if name.endswith('.root') else name
+  components = {}
+  for key, pattern in _patterns.iteritems():
+    match = pattern.search(stem)
+    if match is None:
+      components[key] = None
+    else:
+      components[key] = ''.join(g for g in match.groups() if g)
+  if components['telconfig'] is None:
+    components['telconfig'] = '1234'
+  return components
+
+
+def list_EA_files(directory):
+  '''names of the .root files in a directory, one pass over the directory'''
+  if scandir is not None:
+    return sorted(entry.name for entry in scandir(directory) if entry.name.endswith('.root') and entry.is_file())
+  return sorted(name for name in os.listdir(directory) if name.endswith('.root'))
+
+
+class EACatalog(object):
+
+  def __init__(self, directory, names):
+    self.directory = directory
+    self.names = set(names)
+    self.components = dict((name, parse_EA_name(name)) for name in self.names)
+
+    #index of names by (component, value), narrows down candidates for suggestions
+    self.index = {}
+    for name, components in self.components.iteritems():
+      for key, value in components.iteritems():
+        self.index.setdefault((key, value), set()).add(name)
+
+  @classmethod
+  def scan(cls, directory):
+    return cls(directory, list_EA_files(directory))
+
+  def exists(self, name):
+    return os.path.basename(name) in self.names
+
+  def find(self, **components):
+    '''names matching all the given components, e.g. find(epoch='V6PMTUpgrade', season='ATM21')'''
+    matches = None
+    for key, value in components.iteritems():
+      names = self.index.get((key, value), set())
+      matches = names if matches is None else matches & names
+    return sorted(matches or [])
+
+  def suggest(self, name, n=3):
+    '''closest existing EA names: most matching components first, then the most similar string'''
+    name = os.path.basename(name)
+    wanted = parse_EA_name(name)
+    scores = {}
+    for key, weight in COMPONENT_WEIGHTS:
+      for candidate in self.index.get((key, wanted[key]), ()):
+        scores[candidate] = scores.get(candidate, 0) + weight
+    if not scores:
+      return []
+    #string similarity only for the best scoring few, ties included
+    threshold = sorted(scores.values(), reverse=True)[:max(20, n)][-1]
+    candidates = [c for c in scores if scores[c] >= threshold]
+    candidates.sort(key=lambda c: (-scores[c], -difflib.SequenceMatcher(None, name, c).ratio(), c))
+    return candidates[:n]
+
+
+def load_catalog(directory, cacheFile=None):
+  '''
+  scans the EA directory, or reuses the catalog already loaded by this process or the
+  listing stored in cacheFile when the directory hasn't been modified since
+  '''
+  directory = os.path.abspath(directory)
+  mtime = os.path.getmtime(directory)
+  if directory in _catalogs and _catalogs[directory][0] == mtime:
+    return _catalogs[directory][1]
+
+  cache = {}
+  if cacheFile is not None:
+    cacheFile = os.path.expanduser(cacheFile)
+    if os.path.isfile(cacheFile):
+      try:
+        cache = json.load(open(cacheFile))
+      except ValueError:
+        cache = {}
+    entry = cache.get(directory)
+    if entry is not None and entry['mtime'] == mtime:
+      _catalogs[directory] = (mtime, EACatalog(directory, entry['names']))
+      return _catalogs[directory][1]
+
+  catalog = EACatalog.scan(directory)
+  _catalogs[directory] = (mtime, catalog)
+  if cacheFile is not None:
+    cache[directory] = {'mtime' : mtime, 'names' : sorted(catalog.names)}
+    tmpFile = cacheFile + '.tmp'
+    with open(tmpFile, 'w') as f:
+      json.dump(cache, f)
+    os.rename(tmpFile, cacheFile)
+  return catalog
+
+
+class EANamingRules(object):
+
+  def __init__(self, rules, source=''):
+    '''rules: dict laid out like ea_rules.json'''
+    self.source = source
+    self.template = rules['template']
+    self.fields = dict((key, rules[key]) for key in ['vegas', 'samples', 'method'])
+    self.full_array = rules['full_array']
+    self.cuts = rules['cuts']
+    self.fixes = rules['fix']
+    self.names = {}
+
+  @classmethod
+  def from_file(cls, path):
+    return cls(json.load(open(path)), path)
+
+  def check_cuts(self, cuts):
+    '''raises ValueError for a cut set the rules don't know'''
+    if cuts not in self.cuts:
+      raise ValueError("no EA naming rules for cuts '%s' in %s (known: %s)" %(cuts, self.source, ', '.join(sorted(self.cuts))))
+
+  def get_fix(self, epoch, season, offset):
+    for rule in self.fixes:
+      if (rule.get('epoch', epoch) == epoch and rule.get('season', season) == season
+          and rule.get('Offset', offset) == offset):
+        return rule['suffix']
+    return ''
+
+  def resolve(self, EA_config, user_configs):
+    '''EA filename for a group config (e.g. V6_PMTUpgrade_ATM21_12-4_science) & the user options'''
+    key = (EA_config, tuple(user_configs))
+    if key not in self.names:
+      self.names[key] = self.build(EA_config, user_configs)
+    return self.names[key]
+
+  def build(self, EA_config, user_configs):
+    Ver, Array, SeasonID, TelConfig, DataCat = EA_config.split('_', 4)
+    epoch = Ver + '_' + Array
+    cuts, SimModel, SimSource, Offset, TelMulti, LZA = user_configs
+    self.check_cuts(cuts[1:])
+    cut = self.cuts[cuts[1:]]
+
+    fields = dict(self.fields)
+    fields.update({'SimModel' : SimModel, 'SimSource' : SimSource, 'Offset' : Offset,
+                   'TelMulti' : TelMulti[1:], 'LZA' : '' if LZA == '_' else LZA,
+                   'epoch' : '_' + epoch, 'season' : '_' + SeasonID,
+                   'tels' : '' if TelConfig == self.full_array else '_' + TelConfig,
+                   'size' : cut['size'].get(epoch, cut['size']['default']),
+                   'MSW' : cut['MSW'], 'MSL' : cut['MSL'], 'MH' : cut['MH'], 'ThetaSq' : cut['ThetaSq'],
+                   'fix' : self.get_fix(epoch, SeasonID, Offset[1:])})
+    return str(self.template.format(**fields))
+
+
+def load_rules(path=DEFAULT_RULES):
+  '''returns the naming rules of a file, reparsing it only when it has changed'''
+  key = os.path.abspath(path)
+  mtime = os.path.getmtime(key)
+  if key not in _rules or _rules[key][0] != mtime:
+    _rules[key] = (mtime, EANamingRules.from_file(key))
+  return _rules[key][1]
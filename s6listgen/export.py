@@ -0,0 +1,48 @@
+'''
+Machine-readable export of run classifications (s6RunlistGen.py --export).
+
+One record per run of the runlist: run ID, stage5 path, array epoch, ATM season, the DQM,
+observer & reconciled telescope combinations, data category, group ID and the EA written
+for its group. Written either as JSON Lines (one object per line) or as a compressed
+numpy .npz file with one array per field, which loads with a single np.load.
+'''
+
+import json
+
+
+#export fields and their numpy dtype in the npz layout
+FIELDS = [('run_id', 'int64'), ('path', str), ('epoch', str), ('atm', str), ('dqm_tels', str),
+          ('observer_tels', str), ('tels', str), ('data_category', str), ('group_id', 'int64'), ('ea', str)]
+
+FORMATS = ['jsonl', 'npz']
+
+
+def get_format(path, fmt=None):
+  '''export format given explicitly or by the file extension (JSON Lines by default)'''
+  if fmt is not None:
+    return fmt
+  if path.endswith('.npz'):
+    return 'npz'
+  return 'jsonl'
+
+
+def write_jsonl(records, path):
+  with open(path, 'w') as f:
+    for record in records:
+      f.write(json.dumps(dict((name, record[name]) for name, dtype in FIELDS), sort_keys=True) + '\n')
+
+
+def write_npz(records, path):
+  import numpy as np
+  columns = {}
+  for name, dtype in FIELDS:
+    columns[name] = np.array([record[name] for record in records], dtype=dtype)
+  np.savez_compressed(path, **columns)
+
+
+def write_export(records, path, fmt=None):
+  '''writes the records in the format asked for (or guessed from the extension)'''
+  if get_format(path, fmt) == 'npz':
+    write_npz(records, path)
+  else:
+    write_jsonl(records, path)
@@ -0,0 +1,80 @@
+'''
+Checkpoint journal for incremental runlist regeneration (s6RunlistGen.py --incremental).
+
+One JSON record per line with a run's stage5 path, run ID, fullConfig, the tel_cut_mask
+and config_mask it was classified with, its start time & duration and when it was queried. Records
+are appended and flushed after every batch, so an interrupted regeneration resumes from
+the last finished batch; a partially written last line is ignored.
+
+The first line is a header with the key of the classification settings (epoch dates, ATM
+calendar file & its modification time, telescope participation convention) the records
+were made with. A journal with another key (or none) is started over, so changed settings
+never reuse stale groupings.
+'''
+
+import os
+import json
+
+from s6listgen import cache
+
+
+class Journal(object):
+
+  def __init__(self, path, key=''):
+    self.path = path
+    self.key = key
+    self.records = {}
+    if os.path.isfile(path):
+      self.load()
+    if not self.records:
+      self.start()
+
+  def load(self):
+    lines = open(self.path)
+    try:
+      header = json.loads(next(lines, ''))
+    except ValueError:
+      return
+    if not isinstance(header, dict) or header.get('key') != self.key or 'run' in header:
+      #classified with other settings, or a journal from before the header
+      return
+    for line in lines:
+      try:
+        record = json.loads(line)
+      except ValueError:
+        #interrupted while writing this line
+        continue
+      self.records[record['run']] = record
+
+  def start(self):
+    '''empties the journal, leaving just the header'''
+    with open(self.path, 'w') as f:
+      f.write(json.dumps({'key' : self.key}) + '\n')
+
+  def is_current(self, run, now, recentDays, recentTTL, oldTTL):
+    '''whether a run has a journal record that hasn't expired'''
+    record = self.records.get(run)
+    if record is None:
+      return False
+    return cache.is_fresh(record['run_time'], record['queried'], now, recentDays, recentTTL, oldTTL)
+
+  def append(self, records):
+    '''adds records and makes sure they are on disk before returning'''
+    with open(self.path, 'a') as f:
+      for record in records:
+        f.write(json.dumps(record, sort_keys=True) + '\n')
+        self.records[record['run']] = record
+      f.flush()
+      os.fsync(f.fileno())
+
+  def compact(self, runs):
+    '''rewrites the journal with only the latest record of each of the given runs'''
+    tmpPath = self.path + '.tmp'
+    written = set()
+    with open(tmpPath, 'w') as f:
+      f.write(json.dumps({'key' : self.key}) + '\n')
+      for run in runs:
+        if run in self.records and run not in written:
+          f.write(json.dumps(self.records[run], sort_keys=True) + '\n')
+          written.add(run)
+    os.rename(tmpPath, self.path)
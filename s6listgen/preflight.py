@@ -0,0 +1,101 @@
+'''
+Run ID parsing and stage5 path checks for s6RunlistGen.py (--preflight).
+
+Run IDs are taken from the file name with a compiled pattern covering our stage5 naming
+(<run>.stage5.root, <run>_stage5.root, <run>.s5.root, prefixes/suffixes around them,
+five or six digit runs) instead of a fixed slice of the path; entries without one are
+skipped with a warning even without --preflight. The preflight stats every
+stage5 file concurrently and drops unparsable, missing, empty and duplicate entries
+(reported on stderr) before any database query is spent on them.
+'''
+
+import os
+import re
+import sys
+
+
+_run_id = re.compile(r'(?:^|\D)(\d{5,6})(?:[._-](?:stage5|st5|s5))?(?:[._-][A-Za-z0-9]+)?\.root$')
+
+
+def parse_run_id(path):
+  '''run ID (string) of a stage5 path, None if the name doesn't follow the conventions'''
+  match = _run_id.search(os.path.basename(path.strip()))
+  if match is None:
+    return None
+  return match.group(1)
+
+
+def get_run_id(path):
+  '''run ID of a stage5 path. Raises ValueError if there is none, rather than guessing one'''
+  runID = parse_run_id(path)
+  if runID is None:
+    raise ValueError("no run ID in stage5 path '%s'" %(path.strip()))
+  return runID
+
+
+def skip_unparsable(paths):
+  '''yields the paths with a run ID, warning about (and skipping) the others'''
+  for path in paths:
+    if parse_run_id(path) is None:
+      print >>sys.stderr, "WARNING: skipping stage5 entry without a recognizable run ID: %s" %(path.strip())
+    else:
+      yield path
+
+
+def stat_size(path):
+  '''file size, None if the file doesn't exist'''
+  try:
+    return os.stat(path).st_size
+  except OSError:
+    return None
+
+
+class Preflight(object):
+
+  def __init__(self, jobs=16, stat=True):
+    '''
+    jobs: number of stat calls in flight at once (slow shared filesystems)
+    stat: check that the files exist and aren't empty
+    '''
+    self.jobs = jobs
+    self.stat = stat
+    #run IDs seen so far, duplicates are dropped across calls (--stream batches) too
+    self.seen = {}
+    self.dropped = {'unparsable' : [], 'missing' : [], 'empty' : [], 'duplicate' : []}
+
+  def check(self, paths):
+    '''returns the paths that pass, in order, reporting the others on stderr'''
+    paths = [path.strip() for path in paths]
+    if self.stat and paths:
+      from multiprocessing.pool import ThreadPool
+      pool = ThreadPool(max(1, min(self.jobs, len(paths))))
+      try:
+        sizes = pool.map_async(stat_size, paths).get(1e9)
+      finally:
+        pool.terminate()
+    else:
+      sizes = [1]*len(paths)
+
+    dropped = dict((problem, []) for problem in self.dropped)
+    good = []
+    for path, size in zip(paths, sizes):
+      runID = parse_run_id(path)
+      if runID is None:
+        dropped['unparsable'].append(path)
+      elif size is None:
+        dropped['missing'].append(path)
+      elif size == 0:
+        dropped['empty'].append(path)
+      elif runID in self.seen:
+        dropped['duplicate'].append('%s (run %s already in %s)' %(path, runID, self.seen[runID]))
+      else:
+        self.seen[runID] = path
+        good.append(path)
+
+    for problem, entries in sorted(dropped.iteritems()):
+      if entries:
+        print >>sys.stderr, "WARNING: dropping %d %s stage5 entries:" %(len(entries), problem)
+        for entry in entries:
+          print >>sys.stderr, "  %s" %(entry)
+      self.dropped[problem] += entries
+    return good
@@ -0,0 +1,175 @@
+'''
+Timing and counters for s6RunlistGen.py --profile.
+
+Profiler.instrument(runsobj) wraps the ListGen methods of one instance (database round
+trips, classification, EA naming & checks, BDT parsing, writing) with timers, and counts
+mysql client spawns, file stats and bytes written while the profile is running. Nothing
+is wrapped unless --profile is given, so a normal run pays nothing for it.
+'''
+
+import os
+import sys
+import json
+import time
+import threading
+import subprocess
+
+from functools import wraps
+
+
+#ListGen methods timed by instrument(), with the phase they belong to
+TIMED_METHODS = [('fetch_runs', 'query'),
+                 ('classify_run', 'classify'), ('classify_runs', 'classify'),
+                 ('get_atm', 'classify'), ('get_array_config', 'classify'),
+                 ('reconcile_tel_masks', 'classify'), ('get_tel_combo', 'classify'),
+                 ('get_data_category', 'classify'),
+                 ('load_EA_catalog', 'ea'), ('get_EA_file', 'ea'), ('check_EA_file', 'ea'),
+                 ('get_bdt_table', 'bdt'),
+                 ('print_runlist', 'write'), ('print_split_runlists', 'write')]
+
+
+class CountingWriter(object):
+  '''file wrapper counting the bytes written through it'''
+
+  def __init__(self, outfile, profiler):
+    self.outfile = outfile
+    self.profiler = profiler
+
+  def write(self, s):
+    self.profiler.count('bytes written', len(s))
+    self.outfile.write(s)
+
+  def __getattr__(self, name):
+    return getattr(self.outfile, name)
+
+
+class Profiler(object):
+
+  def __init__(self):
+    self.t_start = time.time()
+    self.timers = {}
+    self.counters = {}
+    self.queries = {}
+    self.slowest = []
+    self.cache = None
+    self.snapshot = None
+    self.lock = threading.Lock()
+    self.patched = []
+
+  def add_time(self, name, phase, seconds):
+    with self.lock:
+      timer = self.timers.setdefault(name, {'phase' : phase, 'calls' : 0, 'seconds' : 0., 'max' : 0.})
+      timer['calls'] += 1
+      timer['seconds'] += seconds
+      timer['max'] = max(timer['max'], seconds)
+
+  def count(self, name, n=1):
+    with self.lock:
+      self.counters[name] = self.counters.get(name, 0) + n
+
+  def add_query(self, execCMD, database, params, nrows, seconds):
+    '''one database round trip, aggregated per database and per statement kind (single run or IN-list)'''
+    kind = '%s %s' %(database, 'batch' if ' IN (' in execCMD else 'run')
+    with self.lock:
+      entry = self.queries.setdefault(kind, {'calls' : 0, 'seconds' : 0., 'max' : 0., 'rows' : 0})
+      entry['calls'] += 1
+      entry['seconds'] += seconds
+      entry['max'] = max(entry['max'], seconds)
+      entry['rows'] += nrows
+      self.slowest.append((seconds, database, execCMD, [str(p) for p in params]))
+      if len(self.slowest) > 100:
+        self.slowest.sort(reverse=True)
+        del self.slowest[10:]
+
+  def timed(self, func, name, phase):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+      t0 = time.time()
+      try:
+        return func(*args, **kwargs)
+      finally:
+        self.add_time(name, phase, time.time() - t0)
+    return wrapper
+
+  def instrument(self, runsobj):
+    '''wraps the methods of one ListGen instance and starts counting spawns & stats'''
+    for name, phase in TIMED_METHODS:
+      setattr(runsobj, name, self.timed(getattr(runsobj, name), name, phase))
+
+    runSQL_rows = runsobj.runSQL_rows
+    def profiled_runSQL_rows(execCMD, database, params=()):
+      t0 = time.time()
+      rows = runSQL_rows(execCMD, database, params)
+      self.add_query(execCMD, database, params, len(rows), time.time() - t0)
+      return rows
+    runsobj.runSQL_rows = profiled_runSQL_rows
+
+    print_runlist = runsobj.print_runlist
+    def profiled_print_runlist(groups, outfile, *args, **kwargs):
+      return print_runlist(groups, CountingWriter(outfile, self), *args, **kwargs)
+    runsobj.print_runlist = profiled_print_runlist
+
+    #the cache may be shared with earlier requests (s6service), only count from here on
+    self.cache = runsobj.cache
+    if self.cache is not None:
+      self.cache_start = (self.cache.hits, self.cache.misses)
+    self.snapshot = runsobj.snapshot
+    if self.snapshot is not None:
+      self.snapshot_start = (self.snapshot.hits, self.snapshot.misses)
+    self.patch(subprocess, 'Popen', 'subprocess spawns')
+    self.patch(os, 'stat', 'file stats')
+    self.patch(os, 'lstat', 'file stats')
+    self.patch(os, 'listdir', 'directory listings')
+    return runsobj
+
+  def patch(self, module, name, counter):
+    '''counts calls of a module function (restored by finish)'''
+    func = getattr(module, name)
+    def counted(*args, **kwargs):
+      self.count(counter)
+      return func(*args, **kwargs)
+    setattr(module, name, counted)
+    self.patched.append((module, name, func))
+
+  def finish(self):
+    '''stops counting & restores the patched functions'''
+    for module, name, func in reversed(self.patched):
+      setattr(module, name, func)
+    self.patched = []
+    if self.cache is not None:
+      self.counters['cache hits'] = self.cache.hits - self.cache_start[0]
+      self.counters['cache misses'] = self.cache.misses - self.cache_start[1]
+    if self.snapshot is not None:
+      self.counters['snapshot hits'] = self.snapshot.hits - self.snapshot_start[0]
+      self.counters['snapshot misses'] = self.snapshot.misses - self.snapshot_start[1]
+    self.counters['DB round trips'] = sum(q['calls'] for q in self.queries.values())
+    self.wall = time.time() - self.t_start
+
+  def report(self, stream=None):
+    '''summary table of timers, queries & counters (on stderr by default)'''
+    if stream is None:
+      stream = sys.stderr
+    print >>stream, "-"*72
+    print >>stream, "%-32s %10s %11s %11s" %('profile (wall %.2f s)' %(self.wall), 'calls', 'total s', 'mean ms')
+    phases = sorted(set(t['phase'] for t in self.timers.values()), key=lambda p: [m[1] for m in TIMED_METHODS].index(p))
+    for phase in phases:
+      for name, timer in sorted(self.timers.iteritems()):
+        if timer['phase'] == phase:
+          print >>stream, "%-32s %10d %11.3f %11.3f" %('%s: %s' %(phase, name), timer['calls'], timer['seconds'],
+                                                       1e3*timer['seconds']/timer['calls'])
+    for kind, entry in sorted(self.queries.iteritems()):
+      print >>stream, "%-32s %10d %11.3f %11.3f  (max %.1f ms, %d rows)" %('db: %s' %(kind), entry['calls'], entry['seconds'],
+                                                                          1e3*entry['seconds']/entry['calls'], 1e3*entry['max'], entry['rows'])
+    for name, n in sorted(self.counters.iteritems()):
+      print >>stream, "%-32s %10d" %(name, n)
+    print >>stream, "-"*72
+
+  def to_dict(self):
+    self.slowest.sort(reverse=True)
+    return {'wall' : self.wall, 'timers' : self.timers, 'queries' : self.queries, 'counters' : self.counters,
+            'slowest_queries' : [{'seconds' : s, 'database' : d, 'statement' : q, 'params' : p}
+                                 for s, d, q, p in self.slowest[:10]]}
+
+  def write_json(self, path):
+    with open(path, 'w') as f:
+      json.dump(self.to_dict(), f, indent=1, sort_keys=True)
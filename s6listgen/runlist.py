@@ -0,0 +1,246 @@
+'''
+Reader & offline tools for the stage6 runlists print_runlist writes (VEGAS v2.5.1+ format).
+
+The runs of the first group are listed untagged, every other group is wrapped in
+[RUNLIST ID: n] tags, and each group has an [EA ID: n] and a [CONFIG ID: n] block.
+read_runlist recovers the groups with their EA and config block in one pass over the file,
+write_runlist writes groups back with IDs renumbered from 0. On top of these:
+
+  python s6runlist.py merge out.txt a.txt b.txt ...   groups with the same EA & config are joined
+  python s6runlist.py split in.txt out_{id}.txt        one runlist per group
+  python s6runlist.py filter in.txt out.txt --runs 64080,64081 --exclude --match REGEX --ea REGEX
+
+None of them touch the database.
+'''
+
+import re
+import sys
+
+from s6listgen import preflight
+
+try:
+  import argparse
+except ImportError:
+  sys.exit("Missing argparse module. See https://pypi.python.org/pypi/argparse for installation")
+
+
+_tag = re.compile(r'^\[(/?)(RUNLIST|EA|CONFIG) ID:\s*(\d+)\s*\]\s*$')
+
+
+class RunlistGroup(object):
+
+  def __init__(self, runs=None, ea=None, config=None):
+    self.runs = runs if runs is not None else []
+    self.ea = ea if ea is not None else []
+    self.config = config if config is not None else []
+
+  @property
+  def key(self):
+    '''groups with the same EA & config block can be joined'''
+    return (tuple(self.ea), tuple(self.config))
+
+  def run_ids(self):
+    return [preflight.get_run_id(run) for run in self.runs]
+
+
+def read_runlist(infile):
+  '''
+  returns the groups of a runlist (file name or open file) in the order they appear.
+  Raises ValueError on misplaced or unbalanced tags and untagged lines after the first block
+  '''
+  if isinstance(infile, basestring):
+    name = infile
+    infile = open(infile)
+  else:
+    name = getattr(infile, 'name', '<runlist>')
+
+  groups = {}
+  order = []
+  block = None
+  tagged = False
+  for n, line in enumerate(infile):
+    line = line.rstrip('\r\n')
+    match = _tag.match(line)
+    if match is None:
+      if block is None:
+        #only the first group's runs are untagged
+        if line.strip():
+          if tagged:
+            raise ValueError("%s line %d: untagged line after the first group's runs" %(name, n+1))
+          if 0 not in groups:
+            groups[0] = RunlistGroup()
+            order.append(0)
+          groups[0].runs.append(line.strip())
+      elif block[0] == 'RUNLIST':
+        if line.strip():
+          groups[block[1]].runs.append(line.strip())
+      elif block[0] == 'EA':
+        if line.strip():
+          groups[block[1]].ea.append(line.strip())
+      else:
+        groups[block[1]].config.append(line)
+      continue
+
+    tagged = True
+    closing, kind, GROUPID = match.group(1) == '/', match.group(2), int(match.group(3))
+    if closing:
+      if block != (kind, GROUPID):
+        raise ValueError("%s line %d: [/%s ID: %d] doesn't close an open block" %(name, n+1, kind, GROUPID))
+      block = None
+    else:
+      if block is not None:
+        raise ValueError("%s line %d: [%s ID: %d] inside [%s ID: %d]" %(name, n+1, kind, GROUPID, block[0], block[1]))
+      block = (kind, GROUPID)
+      if GROUPID not in groups:
+        groups[GROUPID] = RunlistGroup()
+        order.append(GROUPID)
+  if block is not None:
+    raise ValueError("%s: [%s ID: %d] is never closed" %(name, block[0], block[1]))
+
+  return [groups[GROUPID] for GROUPID in order]
+
+
+def write_group(outfile, GROUPID, group):
+  '''writes one group, the first one (ID 0) without RUNLIST tags'''
+  if GROUPID == 0:
+    for run in group.runs:
+      outfile.write(run + '\n')
+  else:
+    outfile.write('[RUNLIST ID: %s]\n' %(GROUPID))
+    for run in group.runs:
+      outfile.write(run + '\n')
+    outfile.write('[/RUNLIST ID: %s]\n' %(GROUPID))
+  outfile.write('[EA ID: %s]\n' %(GROUPID))
+  for line in group.ea:
+    outfile.write(line + '\n')
+  outfile.write('[/EA ID: %s]\n' %(GROUPID))
+  outfile.write('[CONFIG ID: %s]\n' %(GROUPID))
+  for line in group.config:
+    outfile.write(line + '\n')
+  outfile.write('[/CONFIG ID: %s]\n' %(GROUPID))
+
+
+def write_runlist(groups, outfile):
+  '''writes groups with IDs renumbered from 0, skipping empty groups'''
+  if isinstance(outfile, basestring):
+    with open(outfile, 'w') as f:
+      return write_runlist(groups, f)
+  GROUPID = 0
+  for group in groups:
+    if group.runs:
+      write_group(outfile, GROUPID, group)
+      GROUPID += 1
+  return GROUPID
+
+
+def merge(runlists, join=True):
+  '''
+  groups of several runlists in order. With join, groups sharing EA & config become one
+  group. A run (by run ID) is kept only where it first appears, whichever group that is
+  '''
+  merged = []
+  byKey = {}
+  seen = set()
+  for groups in runlists:
+    for group in groups:
+      runs = []
+      for run in group.runs:
+        runID = preflight.get_run_id(run)
+        if runID not in seen:
+          seen.add(runID)
+          runs.append(run)
+      if not join:
+        merged.append(RunlistGroup(runs, group.ea, group.config))
+        continue
+      if group.key not in byKey:
+        byKey[group.key] = RunlistGroup([], group.ea, group.config)
+        merged.append(byKey[group.key])
+      byKey[group.key].runs.extend(runs)
+  return merged
+
+
+def filter_groups(groups, runIDs=None, exclude=False, match=None, ea=None):
+  '''
+  keeps runs whose ID is (or with exclude, isn't) in runIDs and whose path matches the
+  regex match, in groups whose EA matches the regex ea. Groups left empty are dropped
+  '''
+  match = re.compile(match) if match is not None else None
+  ea = re.compile(ea) if ea is not None else None
+  filtered = []
+  for group in groups:
+    if ea is not None and not any(ea.search(line) for line in group.ea):
+      continue
+    runs = group.runs
+    if runIDs is not None:
+      runs = [run for run in runs if (preflight.get_run_id(run) in runIDs) != exclude]
+    if match is not None:
+      runs = [run for run in runs if match.search(run)]
+    if runs:
+      filtered.append(RunlistGroup(runs, group.ea, group.config))
+  return filtered
+
+
+def check_template(template):
+  '''
+  raises ValueError unless template names one file per group with str.format, {id} being
+  the group ID (as s6RunlistGen.py --splitOut does)
+  '''
+  try:
+    names = set(template.format(id=n) for n in (0, 1))
+  except (KeyError, IndexError, ValueError) as e:
+    raise ValueError("can't fill in file name template '%s' (%s), only {id} is replaced" %(template, e))
+  if len(names) < 2:
+    raise ValueError("file name template '%s' needs an {id} placeholder for the group ID, e.g. runlist_{id}.txt" %(template))
+
+
+def read_run_ids(value):
+  '''run IDs given as a comma separated list or a file with one ID (or stage5 path) per line'''
+  if ',' in value or value.isdigit():
+    return set(v.strip() for v in value.split(',') if v.strip())
+  ids = set()
+  for line in open(value):
+    line = line.strip()
+    if line:
+      ids.add(line if line.isdigit() else preflight.get_run_id(line))
+  return ids
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Merges, splits and filters stage6 runlists written by s6RunlistGen.py, without querying the database. Group IDs are renumbered from 0.')
+  subparsers = parser.add_subparsers(dest='command')
+
+  merge_parser = subparsers.add_parser('merge', help="Combine runlists into one.")
+  merge_parser.add_argument('outfile', help="Merged runlist.")
+  merge_parser.add_argument('infiles', nargs='+', help="Runlists to merge.")
+  merge_parser.add_argument('--keepGroups', default=False, action='store_true', help="Keep every group as it is instead of joining groups with the same EA & config.")
+
+  split_parser = subparsers.add_parser('split', help="Write every group into its own runlist.")
+  split_parser.add_argument('infile', help="Runlist to split.")
+  split_parser.add_argument('template', help="Output file names, {id} is replaced by the group's position as in s6RunlistGen.py --splitOut (e.g. runlist_{id}.txt).")
+
+  filter_parser = subparsers.add_parser('filter', help="Keep a subset of the runs.")
+  filter_parser.add_argument('infile', help="Runlist to filter.")
+  filter_parser.add_argument('outfile', help="Filtered runlist.")
+  filter_parser.add_argument('--runs', default=None, help="Comma separated run IDs, or a file with one run ID or stage5 path per line, to keep.")
+  filter_parser.add_argument('--exclude', default=False, action='store_true', help="Drop the --runs instead of keeping them.")
+  filter_parser.add_argument('--match', default=None, help="Keep only runs whose stage5 path matches this regular expression.")
+  filter_parser.add_argument('--ea', default=None, help="Keep only groups whose EA matches this regular expression.")
+  args = parser.parse_args()
+
+  try:
+    if args.command == 'merge':
+      groups = merge([read_runlist(infile) for infile in args.infiles], join=not args.keepGroups)
+      write_runlist(groups, args.outfile)
+    elif args.command == 'split':
+      check_template(args.template)
+      for n, group in enumerate(g for g in read_runlist(args.infile) if g.runs):
+        write_runlist([group], args.template.format(id=n))
+    else:
+      runIDs = read_run_ids(args.runs) if args.runs is not None else None
+      groups = filter_groups(read_runlist(args.infile), runIDs, args.exclude, args.match, args.ea)
+      write_runlist(groups, args.outfile)
+  except (IOError, ValueError) as e:
+    sys.exit(str(e))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,157 @@
+'''
+Resident runlist service for s6RunlistGen.py and its thin client.
+
+s6RunlistGen.py --serve [SOCKET] keeps one ListGen with its database connections, run
+metadata cache, ATM calendar, BDT cut tables and EA directory catalogs loaded and answers
+runlist requests on a Unix domain socket, one request at a time. The client takes the
+same arguments as s6RunlistGen.py and only needs the standard library, so a call costs a
+socket round trip instead of the interpreter, numpy & database start up:
+
+  python s6service.py [--socket SOCKET] infile outfile --EAmatch ...
+
+Requests are one JSON line {"argv", "cwd"}; the server may ask for the client's stdin with
+{"stdin": true} (when no infile is given) and finishes with {"status", "stdout", "stderr"}.
+'''
+
+import os
+import sys
+import json
+import signal
+import socket
+import traceback
+import SocketServer
+
+from StringIO import StringIO
+
+
+DEFAULT_SOCKET = '~/.s6RunlistGen.sock'
+
+
+def exit_status(e):
+  '''exit status of a SystemExit, printing its message like the interpreter would'''
+  if e.code is None:
+    return 0
+  if isinstance(e.code, int):
+    return e.code
+  print >>sys.stderr, e.code
+  return 1
+
+
+class RequestHandler(SocketServer.StreamRequestHandler):
+
+  def handle(self):
+    line = self.rfile.readline()
+    if not line:
+      return
+    response = self.server.run(json.loads(line), self.read_stdin)
+    self.wfile.write(json.dumps(response) + '\n')
+
+  def read_stdin(self):
+    '''asks the client for its stdin'''
+    self.wfile.write(json.dumps({'stdin' : True}) + '\n')
+    self.wfile.flush()
+    return json.loads(self.rfile.readline()).encode('utf-8')
+
+
+class ListGenServer(SocketServer.UnixStreamServer):
+  '''
+  serves requests one after the other, so the resident ListGen is never used by two
+  requests at once. handler(argv, read_stdin) runs one request in the client's directory
+  '''
+
+  def __init__(self, path, handler):
+    self.path = os.path.expanduser(path)
+    self.handler = handler
+    if os.path.exists(self.path):
+      if is_running(self.path):
+        sys.exit("a runlist service is already listening on %s" %(self.path))
+      os.remove(self.path)
+    SocketServer.UnixStreamServer.__init__(self, self.path, RequestHandler)
+
+  def run(self, request, read_stdin):
+    '''runs a request with stdout & stderr captured for the client'''
+    cwd = os.getcwd()
+    stdout, stderr = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = StringIO(), StringIO()
+    status = 0
+    try:
+      os.chdir(request['cwd'])
+      self.handler(request['argv'], read_stdin)
+    except SystemExit as e:
+      status = exit_status(e)
+    except Exception:
+      traceback.print_exc()
+      status = 1
+    finally:
+      response = {'status' : status, 'stdout' : sys.stdout.getvalue(), 'stderr' : sys.stderr.getvalue()}
+      sys.stdout, sys.stderr = stdout, stderr
+      os.chdir(cwd)
+    print >>sys.stderr, "request %s -> %d" %(' '.join(request['argv']), status)
+    return response
+
+  def serve(self):
+    print >>sys.stderr, "serving runlist requests on %s" %(self.path)
+    #clean up the socket on kill as well
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+      self.serve_forever()
+    except KeyboardInterrupt:
+      pass
+    finally:
+      self.server_close()
+      os.remove(self.path)
+
+
+def is_running(path):
+  '''whether a service answers on the socket'''
+  sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  try:
+    sock.connect(path)
+    return True
+  except socket.error:
+    return False
+  finally:
+    sock.close()
+
+
+def request(path, argv, stdin=sys.stdin):
+  '''sends one request to the service and returns its response dict'''
+  sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  sock.connect(os.path.expanduser(path))
+  conn = sock.makefile('rw')
+  try:
+    conn.write(json.dumps({'argv' : argv, 'cwd' : os.getcwd()}) + '\n')
+    conn.flush()
+    while True:
+      line = conn.readline()
+      if not line:
+        raise IOError("runlist service on %s closed the connection" %(path))
+      message = json.loads(line)
+      if 'stdin' in message:
+        conn.write(json.dumps(stdin.read().decode('utf-8')) + '\n')
+        conn.flush()
+      else:
+        return message
+  finally:
+    conn.close()
+    sock.close()
+
+
+def main():
+  argv = sys.argv[1:]
+  path = os.environ.get('S6_LISTGEN_SOCKET', DEFAULT_SOCKET)
+  if '--socket' in argv:
+    i = argv.index('--socket')
+    path = argv[i+1]
+    del argv[i:i+2]
+
+  try:
+    response = request(path, argv)
+  except socket.error as e:
+    sys.exit("can't reach the runlist service on %s (%s), start it with s6RunlistGen.py --serve" %(path, e))
+  sys.stdout.write(response['stdout'].encode('utf-8'))
+  sys.stderr.write(response['stderr'].encode('utf-8'))
+  sys.exit(response['status'])
+
+if __name__ == '__main__':
+  main()
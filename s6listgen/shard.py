@@ -0,0 +1,69 @@
+'''
+Partial group maps for sharded runlist generation (s6RunlistGen.py --shard, --mergeShards
+and --processes).
+
+Shard i of N classifies the i-th contiguous slice of the stage5 list and stores its groups
+as [config, runs] pairs in order of first appearance. Merging the shards in order rebuilds
+the groups exactly as a single process fills them (same configs inserted in the same
+order, runs in input order), so the merged runlist has the same group IDs and content.
+Run durations (for --maxGroupHours) travel with the partial maps as a run ID -> seconds dict.
+'''
+
+import json
+
+
+def parse_shard(value):
+  '''(i, N) from "i/N", 0 <= i < N. Raises ValueError otherwise'''
+  try:
+    i, N = [int(v) for v in value.split('/')]
+  except ValueError:
+    raise ValueError("shard should be given as i/N, got '%s'" %(value))
+  if not 0 <= i < N:
+    raise ValueError("shard %d/%d out of range, shards are numbered 0 to N-1" %(i, N))
+  return i, N
+
+
+def get_slice(lines, i, N):
+  '''the i-th of N contiguous, nearly equal slices of a list'''
+  return lines[len(lines)*i//N:len(lines)*(i+1)//N]
+
+
+def make_partial(i, N, groups, nruns, durations=None):
+  '''groups: [config, runs] pairs in order of first appearance within the shard'''
+  return {'shard' : i, 'nshards' : N, 'nruns' : nruns, 'groups' : [[config, runs] for config, runs in groups],
+          'durations' : durations or {}}
+
+
+def write_partial(path, partial):
+  with open(path, 'w') as f:
+    json.dump(partial, f)
+
+
+def read_partial(path):
+  partial = json.load(open(path))
+  partial['groups'] = [[str(config), [str(run) for run in runs]] for config, runs in partial['groups']]
+  partial['durations'] = dict((str(runID), duration) for runID, duration in partial.get('durations', {}).iteritems())
+  return partial
+
+
+def merge(partials):
+  '''
+  groups dict (config -> runs) of a complete set of shards, filled in shard order.
+  Raises ValueError if shards are missing, repeated or from different splits
+  '''
+  partials = sorted(partials, key=lambda p: p['shard'])
+  nshards = set(p['nshards'] for p in partials)
+  if len(nshards) != 1:
+    raise ValueError("shards from different splits (N = %s)" %(', '.join(str(n) for n in sorted(nshards))))
+  N = nshards.pop()
+  shards = [p['shard'] for p in partials]
+  if shards != range(N):
+    missing = sorted(set(range(N)) - set(shards))
+    raise ValueError("incomplete shard set of %d: missing %s, repeated %s" %(N, missing or 'none',
+                     sorted(set(s for s in shards if shards.count(s) > 1)) or 'none'))
+
+  groups = {}
+  for partial in partials:
+    for config, runs in partial['groups']:
+      groups.setdefault(config, []).extend(runs)
+  return groups
@@ -0,0 +1,209 @@
+'''
+Run metadata snapshot for s6RunlistGen.py (--snapshot DIR).
+
+Bulk-exports tblRun_Info (VERITAS) and tblRun_Analysis_Comments (VOFFLINE) once into a
+directory of numpy columns sorted by run_id:
+
+  run_id, data_start_time, data_end_time, config_mask, run_type, tel_cut_mask, data_category
+  in_veritas, in_offline   whether the run has a row in each table
+
+Snapshot memory-maps the columns (np.load mmap_mode='r') and finds runs by binary search
+on run_id, so lookups need no database and every generator process on a node shares the
+same page-cached copy. The VERITAS/VOFFLINE rows are rebuilt laid out like the queries,
+with the DATEDIFF columns computed in python for the NA/UA dates asked for.
+
+  python s6snapshot.py SNAPSHOT_DIR [--dbBackend ... --dbHost ...]       from the database
+  python s6snapshot.py SNAPSHOT_DIR --runInfo info.tsv --comments comments.csv   from dumps
+
+Dumps need a header line with the column names; .csv files are comma separated, anything
+else tab separated. Empty, NULL and \\N values are NULL.
+'''
+
+import os
+import csv
+import sys
+import json
+import time
+
+import numpy as np
+
+from s6listgen import db
+
+try:
+  import argparse
+except ImportError:
+  sys.exit("Missing argparse module. See https://pypi.python.org/pypi/argparse for installation")
+
+
+DEFAULT_HOST = 'lucifer1.spa.umn.edu:33060'
+
+INFO_COLUMNS = ['run_id', 'data_start_time', 'config_mask', 'run_type', 'data_end_time']
+COMMENT_COLUMNS = ['run_id', 'tel_cut_mask', 'data_category']
+STRING_COLUMNS = ['data_start_time', 'data_end_time', 'run_type', 'tel_cut_mask', 'data_category']
+
+
+def read_dump(path, columns):
+  '''rows (lists of strings, NULL for missing values) of the given columns of a CSV/TSV dump'''
+  with open(path) as f:
+    reader = csv.DictReader(f, delimiter=',' if path.endswith('.csv') else '\t')
+    missing = [c for c in columns if c not in (reader.fieldnames or [])]
+    if missing:
+      raise ValueError("%s: no %s column" %(path, ', '.join(missing)))
+    rows = []
+    for record in reader:
+      rows.append([record[c] if record[c] not in ('', '\\N', None) else 'NULL' for c in columns])
+    return rows
+
+
+def query_tables(backend):
+  '''rows of both tables from a database backend, as lists of strings'''
+  info = backend.query("select %s from tblRun_Info" %(','.join(INFO_COLUMNS)), 'VERITAS')
+  comments = backend.query("select %s from tblRun_Analysis_Comments" %(','.join(COMMENT_COLUMNS)), 'VOFFLINE')
+  return [row.split('\t') for row in info], [row.split('\t') for row in comments]
+
+
+def build_columns(info, comments):
+  '''
+  column arrays sorted by run_id from tblRun_Info & tblRun_Analysis_Comments rows.
+  The first row of a run is kept, like the single-run queries do
+  '''
+  runs = {}
+  for run_id, start, config_mask, run_type, end in info:
+    if run_id.isdigit():
+      runs.setdefault(int(run_id), {}).setdefault('info', (start, config_mask, run_type, end))
+  for run_id, tel_cut_mask, data_category in comments:
+    if run_id.isdigit():
+      runs.setdefault(int(run_id), {}).setdefault('comments', (tel_cut_mask, data_category))
+
+  run_ids = sorted(runs)
+  values = dict((name, []) for name in STRING_COLUMNS)
+  config_masks = np.zeros(len(run_ids), dtype=np.int64)
+  in_veritas = np.zeros(len(run_ids), dtype=bool)
+  in_offline = np.zeros(len(run_ids), dtype=bool)
+  for n, run_id in enumerate(run_ids):
+    start, config_mask, run_type, end = runs[run_id].get('info', ('NULL', 'NULL', 'NULL', 'NULL'))
+    tel_cut_mask, data_category = runs[run_id].get('comments', ('NULL', 'NULL'))
+    in_veritas[n] = 'info' in runs[run_id]
+    in_offline[n] = 'comments' in runs[run_id]
+    #config_mask is never NULL in tblRun_Info, -1 keeps the column integer if it is
+    config_masks[n] = int(config_mask) if config_mask.lstrip('-').isdigit() else -1
+    values['data_start_time'].append(start)
+    values['data_end_time'].append(end)
+    values['run_type'].append(run_type)
+    values['tel_cut_mask'].append(tel_cut_mask)
+    values['data_category'].append(data_category)
+
+  columns = {'run_id' : np.array(run_ids, dtype=np.int64), 'config_mask' : config_masks,
+             'in_veritas' : in_veritas, 'in_offline' : in_offline}
+  for name in STRING_COLUMNS:
+    columns[name] = np.array(values[name], dtype=str) if values[name] else np.zeros(0, dtype='S1')
+  return columns
+
+
+def write_snapshot(path, columns, source):
+  '''writes one .npy file per column and a meta.json describing the snapshot'''
+  path = os.path.expanduser(path)
+  if not os.path.isdir(path):
+    os.makedirs(path)
+  for name, column in columns.iteritems():
+    np.save(os.path.join(path, name + '.npy'), column)
+  with open(os.path.join(path, 'meta.json'), 'w') as f:
+    json.dump({'created' : time.strftime('%Y-%m-%d %H:%M:%S'), 'source' : source,
+               'nruns' : len(columns['run_id'])}, f, indent=1, sort_keys=True)
+
+
+class Snapshot(object):
+
+  def __init__(self, path):
+    '''memory-maps the columns of a snapshot directory written by write_snapshot'''
+    self.path = os.path.expanduser(path)
+    if not os.path.exists(os.path.join(self.path, 'meta.json')):
+      raise IOError("%s is not a run metadata snapshot (no meta.json)" %(path))
+    self.meta = json.load(open(os.path.join(self.path, 'meta.json')))
+    self.columns = {}
+    for name in ['run_id', 'config_mask', 'in_veritas', 'in_offline'] + STRING_COLUMNS:
+      columnPath = os.path.join(self.path, name + '.npy')
+      #snapshots written before data_end_time was exported don't have it
+      if name == 'data_end_time' and not os.path.exists(columnPath):
+        continue
+      self.columns[name] = np.load(columnPath, mmap_mode='r')
+    self.hits = 0
+    self.misses = 0
+
+  def __len__(self):
+    return len(self.columns['run_id'])
+
+  def find(self, runIDs):
+    '''positions of the runs in the snapshot (binary search), -1 for runs it doesn't hold'''
+    ids = np.array([int(r) if r.isdigit() else -1 for r in runIDs], dtype=np.int64)
+    run_id = self.columns['run_id']
+    pos = np.searchsorted(run_id, ids)
+    found = pos < len(run_id)
+    found[found] = run_id[pos[found]] == ids[found]
+    return np.where(found, pos, -1)
+
+  def get_many(self, runIDs, NA_date, UA_date):
+    '''
+    returns {run_id: (q_offline, q_ver)} for the runs among runIDs the snapshot holds, laid
+    out like the VOFFLINE/VERITAS query rows ("FAILED" for runs missing from one table)
+    '''
+    runIDs = list(set(runIDs))
+    c = self.columns
+    found = {}
+    for runID, n in zip(runIDs, self.find(runIDs)):
+      if n < 0:
+        continue
+      q_offline = q_ver = 'FAILED'
+      if c['in_offline'][n]:
+        q_offline = '%s\t%s' %(c['tel_cut_mask'][n], c['data_category'][n])
+      if c['in_veritas'][n]:
+        start = str(c['data_start_time'][n])
+        start_date = None if start == 'NULL' else start
+        q_ver = '\t'.join([start, db.format_value(db.datediff(start_date, NA_date)),
+                           db.format_value(db.datediff(start_date, UA_date)),
+                           str(c['config_mask'][n]), str(c['run_type'][n]),
+                           str(c['data_end_time'][n]) if 'data_end_time' in c else 'NULL'])
+      found[runID] = (q_offline, q_ver)
+    self.hits += len(found)
+    self.misses += len(runIDs) - len(found)
+    return found
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Writes a memory-mapped run metadata snapshot of tblRun_Info & tblRun_Analysis_Comments for s6RunlistGen.py --snapshot, from the database or from CSV/TSV dumps.')
+  parser.add_argument('snapshot', help="Snapshot directory to write.")
+  parser.add_argument('--runInfo', default=None, help="tblRun_Info dump (CSV/TSV with a header) instead of the database.")
+  parser.add_argument('--comments', default=None, help="tblRun_Analysis_Comments dump (CSV/TSV with a header) instead of the database.")
+  parser.add_argument('--dbBackend', default='auto', choices=['auto','mysql','cli','sqlite'], help="Database backend, as in s6RunlistGen.py.")
+  parser.add_argument('--dbHost', default=DEFAULT_HOST, help="Database host or comma separated host[:port] mirrors (default %s)." %(DEFAULT_HOST))
+  parser.add_argument('--dbDir', default='./', help="Directory of the sqlite stand-in databases.")
+  parser.add_argument('--dbTimeout', type=float, default=600, help="Seconds each table export may take (0: wait forever).")
+  args = parser.parse_args()
+
+  if (args.runInfo is None) != (args.comments is None):
+    parser.error("give both --runInfo and --comments dumps, or neither to query the database")
+
+  try:
+    if args.runInfo is not None:
+      info, comments = read_dump(args.runInfo, INFO_COLUMNS), read_dump(args.comments, COMMENT_COLUMNS)
+      source = '%s, %s' %(args.runInfo, args.comments)
+    else:
+      if args.dbBackend == 'sqlite':
+        backend = db.SQLiteBackend(args.dbDir)
+        source = 'sqlite %s' %(args.dbDir)
+      else:
+        backend = db.get_failover_backend(args.dbBackend, db.parse_hosts(args.dbHost), timeout=args.dbTimeout)
+        source = args.dbHost
+      try:
+        info, comments = query_tables(backend)
+      finally:
+        backend.close()
+  except (IOError, ValueError, db.DatabaseError) as e:
+    sys.exit(str(e))
+
+  columns = build_columns(info, comments)
+  write_snapshot(args.snapshot, columns, source)
+  print >>sys.stderr, "%d runs written to %s" %(len(columns['run_id']), args.snapshot)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,66 @@
+'''
+Splitting of oversized run groups into balanced chunks (s6RunlistGen.py --maxGroupRuns,
+--maxGroupHours), so stage6 jobs are bounded by the chunk size instead of the largest group.
+
+A group with more than maxRuns runs becomes ceil(n/maxRuns) contiguous chunks of nearly
+equal run count. By duration (data_end_time - data_start_time), a group longer than
+maxHours becomes ceil(total/maxHours) chunks filled longest run first into the chunk with
+the least time so far, keeping the input order of runs within each chunk. Runs of unknown
+duration count as a nominal RUN_DURATION.
+'''
+
+import math
+
+from datetime import datetime
+
+from s6listgen import shard
+
+
+#nominal length (seconds) of a VERITAS run whose end time isn't known
+RUN_DURATION = 1800.
+
+
+def get_duration(q_ver):
+  '''data_end_time - data_start_time (seconds) of a run from its VERITAS row, None if unknown'''
+  if q_ver == 'FAILED':
+    return None
+  fields = q_ver.split('\t')
+  #rows cached or recorded before data_end_time was queried end with run_type
+  if len(fields) < 6:
+    return None
+  try:
+    start = datetime.strptime(fields[0], "%Y-%m-%d %H:%M:%S")
+    end = datetime.strptime(fields[5], "%Y-%m-%d %H:%M:%S")
+  except ValueError:
+    return None
+  duration = (end - start).total_seconds()
+  return duration if duration >= 0 else None
+
+
+def split_runs(runs, maxRuns):
+  '''contiguous chunks of at most maxRuns runs, of nearly equal size'''
+  nchunks = int(math.ceil(len(runs)/float(maxRuns)))
+  if nchunks <= 1:
+    return [runs]
+  return [shard.get_slice(runs, i, nchunks) for i in range(nchunks)]
+
+
+def split_durations(runs, durations, maxSeconds):
+  '''
+  chunks of the runs balanced by duration (durations: seconds per run, None if unknown),
+  as many as needed for an even split to stay within maxSeconds
+  '''
+  durations = [RUN_DURATION if d is None else d for d in durations]
+  nchunks = min(len(runs), int(math.ceil(sum(durations)/maxSeconds)))
+  if nchunks <= 1:
+    return [runs]
+
+  #longest runs first, each into the chunk with the least time so far
+  totals = [0.]*nchunks
+  members = [[] for i in range(nchunks)]
+  for n in sorted(range(len(runs)), key=lambda n: -durations[n]):
+    i = totals.index(min(totals))
+    totals[i] += durations[n]
+    members[i].append(n)
+  #runs of zero duration can leave chunks empty, they'd be empty runlist groups
+  return [[runs[n] for n in sorted(chunk)] for chunk in members if chunk]
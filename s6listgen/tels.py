@@ -0,0 +1,102 @@
+'''
+Telescope participation lookup tables for s6RunlistGen.py.
+
+Participation is kept as an integer bitmask (bit 0 = T1, bit 1 = T2, ...). The observer
+config_mask uses that layout directly (0 meaning every telescope). The DQM tel_cut_mask
+flags cut telescopes in reverse order (the highest bit is T1), NULL means nothing was cut
+and values outside the mask range count as every telescope cut. All combinations of
+(tel_cut_mask, config_mask) are reconciled once when the table is built, so classifying
+a run is a single lookup. The numpy arrays the vectorized lookups need are only built
+(and numpy imported) on first use.
+'''
+
+
+class TelMaskTable(object):
+
+  def __init__(self, ntels=4):
+    self.ntels = ntels
+    self.nmasks = 1 << ntels
+    self.all_tels = self.nmasks - 1
+
+    #row of the table for each tel_cut_mask value, NULL and unknown values get the last two rows
+    self.null_index = self.nmasks
+    self.unknown_index = self.nmasks + 1
+    self.cut_rows = dict((str(m), m) for m in range(self.nmasks))
+    self.cut_rows['NULL'] = self.null_index
+
+    #telescope bits allowed by DQM for every row & telescope bits reported by the observer per config_mask
+    self.dqm_bits = [self.cut_mask_to_bits(m) for m in range(self.nmasks)] + [self.all_tels, 0]
+    self.config_bits = [m or self.all_tels for m in range(self.nmasks)]
+
+    #combo string for each set of telescope bits, e.g. 0b1011 -> '_12-4'
+    self.combos = ['_' + ''.join(str(t+1) if bits >> t & 1 else '-' for t in range(ntels))
+                   for bits in range(self.nmasks)]
+
+    #reconciled telescope bits & combos for every (tel_cut_mask row, config_mask)
+    self.reconciled = [[dqm & config for config in self.config_bits] for dqm in self.dqm_bits]
+    self.reconciled_combos = [[self.combos[bits] for bits in row] for row in self.reconciled]
+    self._arrays = None
+
+  def cut_mask_to_bits(self, cut_mask):
+    '''telescopes left in by a numeric tel_cut_mask (T1 is the highest bit of the cut mask)'''
+    return sum(1 << t for t in range(self.ntels) if not cut_mask >> (self.ntels-1-t) & 1)
+
+  def cut_row(self, tel_cut_mask):
+    return self.cut_rows.get(str(tel_cut_mask), self.unknown_index)
+
+  def config_col(self, tel_config_mask):
+    return int(tel_config_mask) & self.all_tels
+
+  def get_combo(self, tel_config_mask):
+    '''observer reported telescope combination'''
+    return self.combos[self.config_bits[self.config_col(tel_config_mask)]]
+
+  def get_dqm_combo(self, tel_cut_mask):
+    '''DQM reported telescope combination (every telescope if there's no DQM info)'''
+    return self.combos[self.dqm_bits[self.cut_row(tel_cut_mask)]]
+
+  def reconcile(self, tel_cut_mask, tel_config_mask):
+    '''telescopes both DQM and the observer report as participating'''
+    return self.reconciled_combos[self.cut_row(tel_cut_mask)][self.config_col(tel_config_mask)]
+
+  def disagreement(self, tel_cut_mask, tel_config_mask):
+    '''list of telescope numbers DQM and the observer disagree on'''
+    diff = self.dqm_bits[self.cut_row(tel_cut_mask)] ^ self.config_bits[self.config_col(tel_config_mask)]
+    return [t+1 for t in range(self.ntels) if diff >> t & 1]
+
+  def get_arrays(self):
+    '''numpy versions of the tables for the vectorized lookups'''
+    if self._arrays is None:
+      import numpy as np
+      keys = np.array(sorted(self.cut_rows))
+      self._arrays = {'keys' : keys, 'rows' : np.array([self.cut_rows[k] for k in keys]),
+                      'combos' : np.array(self.combos), 'reconciled' : np.array(self.reconciled),
+                      'dqm' : np.array(self.dqm_bits), 'config' : np.array(self.config_bits)}
+    return self._arrays
+
+  def cut_rows_of(self, tel_cut_masks):
+    '''table rows for an array of tel_cut_mask strings'''
+    import numpy as np
+    arrays = self.get_arrays()
+    keys, rows = arrays['keys'], arrays['rows']
+    pos = np.searchsorted(keys, tel_cut_masks).clip(0, len(keys)-1)
+    return np.where(keys[pos] == tel_cut_masks, rows[pos], self.unknown_index)
+
+  def reconcile_many(self, tel_cut_masks, tel_config_masks):
+    '''vectorized reconcile for arrays of tel_cut_mask strings & config_mask ints'''
+    import numpy as np
+    arrays = self.get_arrays()
+    cols = np.asarray(tel_config_masks) & self.all_tels
+    return arrays['combos'][arrays['reconciled'][self.cut_rows_of(tel_cut_masks), cols]]
+
+  def dqm_many(self, tel_cut_masks, tel_config_masks):
+    '''
+    DQM reported combinations for arrays of tel_cut_mask strings & config_mask ints,
+    the observer reported ones where there's no DQM info (NULL)
+    '''
+    import numpy as np
+    arrays = self.get_arrays()
+    cols = np.asarray(tel_config_masks) & self.all_tels
+    rows = self.cut_rows_of(tel_cut_masks)
+    bits = np.where(rows == self.null_index, arrays['config'][cols], arrays['dqm'][rows])
+    return arrays['combos'][bits]
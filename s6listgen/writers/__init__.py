@@ -0,0 +1,28 @@
+'''
+Runlist writers, one per stage6 runlist format (s6RunlistGen.py --vegas).
+
+A writer turns the groups of a ListGen (config -> runs, in group order) into a runlist.
+WRITERS maps every VEGAS version to the module of its writer, which is only imported when
+that version is asked for; a module provides a Writer class taking the ListGen. Other
+formats are added with register_writer without touching the core:
+
+  register_writer('2.6.0', 'mytools.vegas260')
+'''
+
+
+DEFAULT_VERSION = '2.5.1'
+
+WRITERS = {'2.5.1' : 's6listgen.writers.vegas251',
+           '2.5.4' : 's6listgen.writers.vegas254'}
+
+
+def register_writer(version, module):
+  '''makes the Writer of a module (import path) available as a --vegas version'''
+  WRITERS[version] = module
+
+
+def get_writer(version):
+  '''Writer class of a VEGAS version. Raises ValueError for unknown versions'''
+  if version not in WRITERS:
+    raise ValueError("no runlist writer for VEGAS %s (known: %s)" %(version, ', '.join(sorted(WRITERS))))
+  return __import__(WRITERS[version], fromlist=['Writer']).Writer
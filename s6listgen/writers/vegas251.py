@@ -0,0 +1,91 @@
+'''
+Runlist writer for the stage6 format of VEGAS v2.5.1+ (the default).
+
+The runs of the first group are listed untagged, every other group is wrapped in
+[RUNLIST ID: n] tags, and each group has an [EA ID: n] block and a [CONFIG ID: n] block
+(holding the BDT cuts with --BDT). Groups are written one per config, in group order,
+oversized ones in chunks (ListGen.split_groups), each chunk a group of its own.
+
+A format also carries the conventions runs are classified & EAs named with for it
+(epoch_dates, dqm_tels, EA_rules), applied by ListGen.set_vegas.
+'''
+
+from s6listgen import ea
+
+
+class Writer(object):
+
+  #(NA, UA) dates of the array epochs, None for the ListGen defaults
+  epoch_dates = None
+  #telescope participation from DQM alone instead of what DQM & the observer agree on
+  dqm_tels = False
+  #EA naming rules used unless --EArules is given
+  EA_rules = ea.DEFAULT_RULES
+
+  def __init__(self, listgen, version='2.5.1'):
+    self.listgen = listgen
+    self.version = version
+
+  def regroup(self, groups):
+    '''(EA_config, runs) pairs in the order they are written, one per written group'''
+    return groups.iteritems()
+
+  def get_groups(self, groups):
+    '''(EA_config, runs) pairs of the groups as written, oversized groups split into chunks'''
+    return self.listgen.split_groups(self.regroup(groups))
+
+  def run_group_ids(self, groups, firstGroupID=0):
+    '''group ID each run of groups ends up in'''
+    group_ids = {}
+    for GROUPID, (EA_config, group_runs) in enumerate(self.get_groups(groups), firstGroupID):
+      for run in group_runs:
+        group_ids[run] = GROUPID
+    return group_ids
+
+  def get_EA(self, EA_config, user_configs, check=True):
+    '''contents of a group's EA block'''
+    return self.listgen.get_group_EA(EA_config, user_configs, check)
+
+  def write(self, groups, outfile, user_configs, bdtTable=None, firstGroupID=0):
+    '''writes the groups with IDs from firstGroupID on, returns the next free ID'''
+    GROUPID = firstGroupID
+    for EA_config, group_runs in self.get_groups(groups):
+      self.write_group(outfile, GROUPID, EA_config, group_runs, user_configs, bdtTable)
+      GROUPID += 1
+    return GROUPID
+
+  def write_files(self, groups, template, user_configs, bdtTable=None):
+    '''
+    writes every group as a runlist of its own, to template with {id} replaced by the
+    group's ID. Returns the file names
+    '''
+    paths = []
+    for GROUPID, (EA_config, group_runs) in enumerate(self.get_groups(groups)):
+      path = template.format(id=GROUPID)
+      with open(path, 'w') as outfile:
+        self.write_group(outfile, 0, EA_config, group_runs, user_configs, bdtTable)
+      paths.append(path)
+    return paths
+
+  def write_group(self, outfile, GROUPID, EA_config, group_runs, user_configs, bdtTable=None):
+    '''writes one group of runs with its EA & CONFIG blocks'''
+    #handles first group that requires special formatting(no RUNLIST tags)
+    if GROUPID == 0:
+      for l in group_runs:
+        outfile.write( l+'\n' )
+    else:
+      outfile.write( '[RUNLIST ID: %s]\n' % (GROUPID) )
+      for l in group_runs:
+        outfile.write( l +'\n')
+      outfile.write( '[/RUNLIST ID: %s]\n' % (GROUPID) )
+    outfile.write( '[EA ID: %s]\n' % (GROUPID) )
+    outfile.write( self.get_EA(EA_config, user_configs) +'\n')
+    outfile.write( '[/EA ID: %s]\n' % (GROUPID) )
+    self.write_config(outfile, GROUPID, EA_config, bdtTable)
+
+  def write_config(self, outfile, GROUPID, EA_config, bdtTable=None):
+    outfile.write( '[CONFIG ID: %s]\n' % (GROUPID) )
+    #writing out cuts for BDTs, column picked from the group config
+    if bdtTable is not None:
+      outfile.write( bdtTable.get_block(EA_config) )
+    outfile.write( '[/CONFIG ID: %s]\n' % (GROUPID) )
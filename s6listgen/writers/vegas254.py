@@ -0,0 +1,53 @@
+'''
+Runlist writer for the older stage6 format of s6RunlistGen_2.5.4.py (--vegas 2.5.4).
+
+Runs are grouped by array epoch, atmosphere season and telescopes only: groups that
+differ just in data category are written as one, in order of first appearance, and the
+EA block names the config without the data category unless --EAmatch is used. The first
+group has no CONFIG block; the others have an empty one (or the BDT cuts).
+
+Runs are classified the way that script did: the NA epoch starts 2009-09-01, telescope
+participation is taken from DQM alone (with a warning where the observer disagrees) and
+EA names carry no fix suffixes (ea_rules_2.5.4.json).
+'''
+
+import os
+
+from collections import OrderedDict
+
+from s6listgen import ea
+from s6listgen.writers import vegas251
+
+
+class Writer(vegas251.Writer):
+
+  epoch_dates = ('2009-09-01', '2012-09-01')
+  dqm_tels = True
+  EA_rules = os.path.join(os.path.dirname(ea.DEFAULT_RULES), 'ea_rules_2.5.4.json')
+
+  def __init__(self, listgen, version='2.5.4'):
+    vegas251.Writer.__init__(self, listgen, version)
+
+  def get_key(self, EA_config):
+    '''group config without the data category, e.g. V6_PMTUpgrade_ATM21_12-4'''
+    return '_'.join(EA_config.split('_', 4)[:4])
+
+  def regroup(self, groups):
+    '''joins groups with the same key, each written under the config of its first group'''
+    merged = OrderedDict()
+    for EA_config, group_runs in groups.iteritems():
+      key = self.get_key(EA_config)
+      if key not in merged:
+        merged[key] = (EA_config, [])
+      merged[key][1].extend(group_runs)
+    return merged.values()
+
+  def get_EA(self, EA_config, user_configs, check=True):
+    if not self.listgen.matchEA:
+      return self.get_key(EA_config)
+    return vegas251.Writer.get_EA(self, EA_config, user_configs, check)
+
+  def write_config(self, outfile, GROUPID, EA_config, bdtTable=None):
+    #no CONFIG block for the first group in this format
+    if GROUPID != 0:
+      vegas251.Writer.write_config(self, outfile, GROUPID, EA_config, bdtTable)
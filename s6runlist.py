@@ -0,0 +1,8 @@
+'''
+Merges, splits and filters stage6 runlists without the database (s6listgen.runlist).
+'''
+
+from s6listgen.runlist import main
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,8 @@
+'''
+Thin client of the resident runlist service, s6RunlistGen.py --serve (s6listgen.service).
+'''
+
+from s6listgen.service import main
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,8 @@
+'''
+Writes run metadata snapshots for s6RunlistGen.py --snapshot (s6listgen.snapshot).
+'''
+
+from s6listgen.snapshot import main
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,118 @@
+'''
+EA naming rules (s6listgen.ea.EANamingRules, ea_rules.json & ea_rules_2.5.4.json) against the
+hard-coded get_EA_file chains of s6RunlistGen.py and s6RunlistGen_2.5.4.py they replaced.
+'''
+
+import os
+import sys
+import itertools
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from s6listgen import ea, writers
+
+
+EPOCHS = ['V4_OldArray', 'V5_T1Move', 'V6_PMTUpgrade']
+SEASONS = ['ATM21', 'ATM22']
+TELS = ['1234', '123-', '12-4', '1-34', '-234', '12--', '--34', '1--4']
+CUTS = ['soft', 'med', 'hard', 'loose']
+
+
+def ref_EA_file(EA_config, user_configs, fixes=True):
+  '''
+  the former if/elif chain, with the epoch written '_V6_PMTUpgrade' as its size cut
+  comparisons (and the 2.5.4 script's parsing) expect. fixes=False: the 2.5.4 script's names
+  '''
+  Ver, Array, SeasonID, TelConfig, DataCat = EA_config.split('_', 4)
+  Epoch, SeasonID, TelConfig = '_' + Ver + '_' + Array, '_' + SeasonID, '_' + TelConfig
+  if TelConfig == '_1234':
+    TelConfig = ''
+
+  cuts, SimModel, SimSource, Offset, TelMulti, LZA = user_configs
+  TelMulti = TelMulti[1:]
+  if LZA == '_':
+    LZA = ''
+
+  fix = ''
+  if fixes:
+    if Epoch == '_V6_PMTUpgrade' and SeasonID == '_ATM21':
+      fix = '_fixed150'
+    elif Epoch == '_V5_T1Move' and SeasonID == '_ATM21' and Offset == '_Alloff':
+      fix = '_v1'
+
+  if cuts == '_soft':
+    SizeCut = '_s400' if Epoch == '_V6_PMTUpgrade' else '_s200'
+    MSW, MSL, MH, ThetaSq = '_MSW1.1', '_MSL1.3', '_MH7', '_ThetaSq0.03'
+  elif cuts == '_med':
+    SizeCut = '_s700' if Epoch == '_V6_PMTUpgrade' else '_s400'
+    MSW, MSL, MH, ThetaSq = '_MSW1.1', '_MSL1.3', '_MH7', '_ThetaSq0.01'
+  elif cuts == '_hard':
+    SizeCut = '_s1200' if Epoch == '_V6_PMTUpgrade' else '_s1000'
+    MSW, MSL, MH, ThetaSq = '_MSW1.1', '_MSL1.4', '', '_ThetaSq0.01'
+  elif cuts == '_loose':
+    SizeCut = '_s400' if Epoch == '_V6_PMTUpgrade' else '_s200'
+    MSW, MSL, MH, ThetaSq = '_MSW1.3', '_MSL1.4', '', '_ThetaSq0.03'
+
+  return ('ea' + SimModel + Epoch + SeasonID + SimSource + '_vegasv250rc5' + '_7sam' + Offset + SizeCut +
+          TelMulti + '_std' + MSW + MSL + MH + ThetaSq + TelConfig + LZA + fix + '.root')
+
+
+def get_rules(version):
+  return ea.load_rules(writers.get_writer(version).EA_rules)
+
+
+#(EA_config, cuts, Offset, 2.5.1 name, 2.5.4 name) spelled out for every epoch & cut set
+NAMES = [
+  ('V4_OldArray_ATM21_1234_science', 'med', 'Alloff',
+   'ea_Oct2012_V4_OldArray_ATM21_GrISU_vegasv250rc5_7sam_Alloff_s400t2_std_MSW1.1_MSL1.3_MH7_ThetaSq0.01_LZA.root',
+   'ea_Oct2012_V4_OldArray_ATM21_GrISU_vegasv250rc5_7sam_Alloff_s400t2_std_MSW1.1_MSL1.3_MH7_ThetaSq0.01_LZA.root'),
+  ('V5_T1Move_ATM21_12-4_science', 'soft', 'Alloff',
+   'ea_Oct2012_V5_T1Move_ATM21_GrISU_vegasv250rc5_7sam_Alloff_s200t2_std_MSW1.1_MSL1.3_MH7_ThetaSq0.03_12-4_LZA_v1.root',
+   'ea_Oct2012_V5_T1Move_ATM21_GrISU_vegasv250rc5_7sam_Alloff_s200t2_std_MSW1.1_MSL1.3_MH7_ThetaSq0.03_12-4_LZA.root'),
+  ('V5_T1Move_ATM21_1234_science', 'med', '050off',
+   'ea_Oct2012_V5_T1Move_ATM21_GrISU_vegasv250rc5_7sam_050off_s400t2_std_MSW1.1_MSL1.3_MH7_ThetaSq0.01_LZA.root',
+   'ea_Oct2012_V5_T1Move_ATM21_GrISU_vegasv250rc5_7sam_050off_s400t2_std_MSW1.1_MSL1.3_MH7_ThetaSq0.01_LZA.root'),
+  ('V6_PMTUpgrade_ATM21_1-34_science', 'med', 'Alloff',
+   'ea_Oct2012_V6_PMTUpgrade_ATM21_GrISU_vegasv250rc5_7sam_Alloff_s700t2_std_MSW1.1_MSL1.3_MH7_ThetaSq0.01_1-34_LZA_fixed150.root',
+   'ea_Oct2012_V6_PMTUpgrade_ATM21_GrISU_vegasv250rc5_7sam_Alloff_s700t2_std_MSW1.1_MSL1.3_MH7_ThetaSq0.01_1-34_LZA.root'),
+  ('V6_PMTUpgrade_ATM22_1234_moonfilter', 'hard', 'Alloff',
+   'ea_Oct2012_V6_PMTUpgrade_ATM22_GrISU_vegasv250rc5_7sam_Alloff_s1200t2_std_MSW1.1_MSL1.4_ThetaSq0.01_LZA.root',
+   'ea_Oct2012_V6_PMTUpgrade_ATM22_GrISU_vegasv250rc5_7sam_Alloff_s1200t2_std_MSW1.1_MSL1.4_ThetaSq0.01_LZA.root'),
+  ('V4_OldArray_ATM22_123-_science', 'loose', 'Alloff',
+   'ea_Oct2012_V4_OldArray_ATM22_GrISU_vegasv250rc5_7sam_Alloff_s200t2_std_MSW1.3_MSL1.4_ThetaSq0.03_123-_LZA.root',
+   'ea_Oct2012_V4_OldArray_ATM22_GrISU_vegasv250rc5_7sam_Alloff_s200t2_std_MSW1.3_MSL1.4_ThetaSq0.03_123-_LZA.root'),
+]
+
+
+class TestEANamingRules(unittest.TestCase):
+
+  def test_names(self):
+    for EA_config, cuts, offset, name251, name254 in NAMES:
+      user_configs = ['_' + cuts, '_Oct2012', '_GrISU', '_' + offset, '_t2', '_LZA']
+      self.assertEqual(get_rules('2.5.1').resolve(EA_config, user_configs), name251)
+      self.assertEqual(get_rules('2.5.4').resolve(EA_config, user_configs), name254)
+
+  def test_every_config(self):
+    rules251, rules254 = get_rules('2.5.1'), get_rules('2.5.4')
+    options = itertools.product(CUTS, ['_Oct2012', '_MDL15NA'], ['_GrISU', '_KASCADE'], ['_Alloff', '_050off'], ['_t2', '_t3'], ['_LZA', '_'])
+    for (cuts, SimModel, SimSource, Offset, TelMulti, LZA), epoch, season, tels in itertools.product(options, EPOCHS, SEASONS, TELS):
+      EA_config = '%s_%s_%s_science' %(epoch, season, tels)
+      user_configs = ['_' + cuts, SimModel, SimSource, Offset, TelMulti, LZA]
+      self.assertEqual(rules251.resolve(EA_config, user_configs), ref_EA_file(EA_config, user_configs))
+      self.assertEqual(rules254.resolve(EA_config, user_configs), ref_EA_file(EA_config, user_configs, fixes=False))
+
+  def test_memoized(self):
+    rules = ea.EANamingRules.from_file(ea.DEFAULT_RULES)
+    user_configs = ['_med', '_Oct2012', '_GrISU', '_Alloff', '_t2', '_LZA']
+    name = rules.resolve('V6_PMTUpgrade_ATM21_1234_science', user_configs)
+    self.assertEqual(rules.names, {('V6_PMTUpgrade_ATM21_1234_science', tuple(user_configs)) : name})
+    self.assertTrue(rules.resolve('V6_PMTUpgrade_ATM21_1234_science', list(user_configs)) is name)
+
+  def test_unknown_cuts(self):
+    rules = get_rules('2.5.1')
+    self.assertRaises(ValueError, rules.resolve, 'V6_PMTUpgrade_ATM21_1234_science', ['_bogus', '_Oct2012', '_GrISU', '_Alloff', '_t2', '_LZA'])
+
+
+if __name__ == '__main__':
+  unittest.main()
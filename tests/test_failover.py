@@ -0,0 +1,159 @@
+'''
+FailoverBackend tests with bench/fakebin/mysql standing in for the mysql client: down
+(S6_FAKE_DOWN) and hung (S6_FAKE_HANG) mirrors, the circuit breaker, and how runs that
+aren't found differ from a database that can't be reached.
+'''
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'bench'))
+sys.path.insert(0, ROOT)
+
+import make_archive
+
+from s6listgen import db
+from s6listgen.core import ListGen
+
+
+STATEMENT = "select run_id,config_mask from tblRun_Info where run_id=%s"
+
+def setUpModule():
+  global archive, stage5
+  archive = tempfile.mkdtemp(prefix='s6listgen_test_')
+  stage5 = make_archive.make_archive(archive, 50, seed=2, missing=0.)
+
+def tearDownModule():
+  shutil.rmtree(archive)
+
+
+class FakeMySQLTest(unittest.TestCase):
+  '''runs with bench/fakebin first on PATH, serving the test archive'''
+
+  def setUp(self):
+    self.environ = dict(os.environ)
+    os.environ['PATH'] = os.path.join(ROOT, 'bench', 'fakebin') + os.pathsep + os.environ.get('PATH', '')
+    os.environ['S6_FAKE_DB_DIR'] = archive
+    for name in ['S6_FAKE_DOWN', 'S6_FAKE_HANG', 'S6_FAKE_DELAY']:
+      os.environ.pop(name, None)
+
+  def tearDown(self):
+    os.environ.clear()
+    os.environ.update(self.environ)
+
+
+class TestFailover(FakeMySQLTest):
+
+  def get_backend(self, hosts, timeout=5, **options):
+    return db.get_failover_backend('cli', [(host, '') for host in hosts], timeout=timeout, **options)
+
+  def test_down_mirror_skipped(self):
+    os.environ['S6_FAKE_DOWN'] = 'down'
+    backend = self.get_backend(['down', 'up'], retries=0)
+    expected = db.SQLiteBackend(archive).query(STATEMENT, 'VERITAS', ('10005',))
+    self.assertEqual(backend.query(STATEMENT, 'VERITAS', ('10005',)), expected)
+    status = dict((name, (latency, failures)) for name, latency, failures, isOpen in backend.status())
+    self.assertEqual(status['down'], (None, 1))
+    self.assertEqual(status['up'][1], 0)
+    self.assertTrue(status['up'][0] is not None)
+
+  def test_hung_mirror_times_out(self):
+    os.environ['S6_FAKE_HANG'] = 'hung'
+    backend = self.get_backend(['hung'], timeout=1, retries=0)
+    start = time.time()
+    self.assertRaises(db.DatabaseUnavailable, backend.query, STATEMENT, 'VERITAS', ('10005',))
+    elapsed = time.time() - start
+    self.assertTrue(1. <= elapsed < 3., elapsed)
+
+  def test_hung_mirror_fails_over(self):
+    os.environ['S6_FAKE_HANG'] = 'hung'
+    backend = self.get_backend(['hung', 'up'], timeout=1, retries=0)
+    start = time.time()
+    self.assertEqual(len(backend.query(STATEMENT, 'VERITAS', ('10005',))), 1)
+    self.assertTrue(time.time() - start < 3.)
+
+  def test_circuit_opens(self):
+    os.environ['S6_FAKE_DOWN'] = 'down'
+    backend = self.get_backend(['down', 'up'], retries=0, failures=2, cooldown=60.)
+    for n in range(2):
+      backend.query(STATEMENT, 'VERITAS', ('10005',))
+    self.assertEqual([m.name for m in backend.route()], ['up'])
+    self.assertEqual([isOpen for name, latency, failures, isOpen in backend.status()], [True, False])
+
+    #with every circuit open nothing is tried until the cooldown is over
+    backend = self.get_backend(['down'], retries=0, failures=1, cooldown=60.)
+    self.assertRaises(db.DatabaseUnavailable, backend.query, STATEMENT, 'VERITAS', ('10005',))
+    try:
+      backend.query(STATEMENT, 'VERITAS', ('10005',))
+    except db.DatabaseUnavailable as e:
+      self.assertTrue('skipped' in str(e), str(e))
+    else:
+      self.fail("query answered by an open circuit")
+
+  def test_server_error_not_failed_over(self):
+    backend = self.get_backend(['first', 'second'], retries=0)
+    try:
+      backend.query("select no_such_column from tblRun_Info", 'VERITAS')
+    except db.DatabaseUnavailable:
+      self.fail("server side error counted as an unreachable mirror")
+    except db.DatabaseError:
+      pass
+    else:
+      self.fail("no DatabaseError")
+    self.assertEqual([failures for name, latency, failures, isOpen in backend.status()], [0, 0])
+
+
+class TestNotFound(FakeMySQLTest):
+
+  def setUp(self):
+    FakeMySQLTest.setUp(self)
+    self.tmp = tempfile.mkdtemp(prefix='s6listgen_out_')
+    self.stage5 = os.path.join(self.tmp, 'stage5.txt')
+    with open(self.stage5, 'w') as f:
+      f.write(open(stage5).read())
+      #not in the archive
+      f.write('/data/unknown/98765.stage5.root\n')
+    self.outfile = os.path.join(self.tmp, 'runlist.txt')
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp)
+    FakeMySQLTest.tearDown(self)
+
+  def run_generator(self, *options):
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 's6RunlistGen.py'), self.stage5, self.outfile,
+                                '--dbBackend', 'cli'] + list(options), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = process.communicate()
+    return process.returncode, err
+
+  def test_not_found_is_failed(self):
+    runsobj = ListGen(db.get_failover_backend('cli', [('up', '')], timeout=5))
+    runsobj.verbose = False
+    execCMD, params = runsobj.get_veritas_query('98765')
+    self.assertEqual(runsobj.runSQL(execCMD, 'VERITAS', params), 'FAILED')
+    execCMD, params = runsobj.get_veritas_query('10005')
+    self.assertNotEqual(runsobj.runSQL(execCMD, 'VERITAS', params), 'FAILED')
+
+  def test_not_found_written(self):
+    for options in [[], ['--batch']]:
+      status, err = self.run_generator('--dbHost', 'up', *options)
+      self.assertEqual(status, 0, err)
+      self.assertTrue('/data/unknown/98765.stage5.root' in open(self.outfile).read())
+
+  def test_unreachable_exits(self):
+    os.environ['S6_FAKE_DOWN'] = 'down1,down2'
+    for options in [[], ['--batch']]:
+      status, err = self.run_generator('--dbHost', 'down1,down2', '--dbRetries', '1', '--dbBackoff', '0', *options)
+      self.assertEqual(status, 1, err)
+      self.assertTrue('ERROR: no database mirror answered' in err, err)
+      #nothing written with default configs for runs the database couldn't be asked about
+      self.assertFalse('.stage5.root' in open(self.outfile).read())
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,149 @@
+'''
+Incremental regeneration (--incremental, s6listgen.journal) against a synthetic sqlite
+archive: reuse on reruns, restarts when the classification settings change, resuming an
+interrupted run and compaction.
+'''
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+from StringIO import StringIO
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'bench'))
+sys.path.insert(0, ROOT)
+
+import make_archive
+
+from s6listgen import cli, journal
+
+
+NRUNS = 300
+
+def setUpModule():
+  global archive, stage5
+  archive = tempfile.mkdtemp(prefix='s6listgen_test_')
+  stage5 = make_archive.make_archive(archive, NRUNS, seed=3, missing=0.05)
+
+def tearDownModule():
+  shutil.rmtree(archive)
+
+
+class TestIncremental(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp = tempfile.mkdtemp(prefix='s6listgen_journal_')
+    self.outfile = os.path.join(self.tmp, 'runlist.txt')
+    self.journal = self.outfile + '.journal'
+    self.stage5 = stage5
+    #winters from the shipped calendar up to 2012 only
+    self.calendar = os.path.join(self.tmp, 'seasons.csv')
+    with open(self.calendar, 'w') as f:
+      for year in range(2007, 2012):
+        f.write('%d-11-01,%d-04-01\n' %(year, year + 1))
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp)
+
+  def generate(self, outfile, *options):
+    '''runs s6RunlistGen.py in-process, returns the output & stderr'''
+    stderr, sys.stderr = sys.stderr, StringIO()
+    try:
+      cli.main([self.stage5, outfile, '--dbBackend', 'sqlite', '--dbDir', archive, '--batch'] + list(options))
+      messages = sys.stderr.getvalue()
+    finally:
+      sys.stderr = stderr
+    return open(outfile).read(), messages
+
+  def incremental(self, *options):
+    return self.generate(self.outfile, '--incremental', '--streamBatch', '50', *options)
+
+  def reference(self, *options):
+    return self.generate(os.path.join(self.tmp, 'reference.txt'), *options)[0]
+
+  def read_journal(self):
+    return [json.loads(line) for line in open(self.journal)]
+
+  def test_rerun(self):
+    output, messages = self.incremental()
+    self.assertTrue('%d of %d runs are new or stale' %(NRUNS, NRUNS) in messages, messages)
+    self.assertEqual(output, self.reference())
+    output, messages = self.incremental()
+    self.assertTrue('0 of %d runs are new or stale' %(NRUNS) in messages, messages)
+    self.assertEqual(output, self.reference())
+
+  def test_calendar_change(self):
+    self.incremental()
+    key = self.read_journal()[0]['key']
+    output, messages = self.incremental('--atmCalendar', self.calendar)
+    #every run again, not the groupings of the shipped calendar
+    self.assertTrue('%d of %d runs are new or stale' %(NRUNS, NRUNS) in messages, messages)
+    self.assertEqual(output, self.reference('--atmCalendar', self.calendar))
+    self.assertNotEqual(output, self.reference())
+    self.assertNotEqual(self.read_journal()[0]['key'], key)
+
+    #editing the calendar in place counts as a change too
+    with open(self.calendar, 'a') as f:
+      f.write('2012-11-01,2013-04-01\n')
+    os.utime(self.calendar, (1e9, 1e9))
+    output, messages = self.incremental('--atmCalendar', self.calendar)
+    self.assertTrue('%d of %d runs are new or stale' %(NRUNS, NRUNS) in messages, messages)
+    self.assertEqual(output, self.reference('--atmCalendar', self.calendar))
+
+  def test_resume(self):
+    self.incremental()
+    #interrupted after 100 runs, in the middle of writing the next record
+    lines = open(self.journal).readlines()
+    with open(self.journal, 'w') as f:
+      f.writelines(lines[:101])
+      f.write(lines[101][:20])
+    os.remove(self.outfile)
+    output, messages = self.incremental()
+    self.assertTrue('%d of %d runs are new or stale' %(NRUNS - 100, NRUNS) in messages, messages)
+    self.assertEqual(output, self.reference())
+
+  def test_compact(self):
+    #repeated runs in the list and records appended by earlier runs are written once
+    self.stage5 = os.path.join(self.tmp, 'stage5.txt')
+    with open(self.stage5, 'w') as f:
+      f.write(open(stage5).read()*2)
+    self.incremental()
+    runJournal = journal.Journal(self.journal, self.read_journal()[0]['key'])
+    runJournal.append(runJournal.records.values())
+    self.assertEqual(len(self.read_journal()), 2*NRUNS + 1)
+    self.incremental()
+    records = self.read_journal()
+    self.assertEqual(len(records), NRUNS + 1)
+    self.assertEqual(len(set(record['run'] for record in records[1:])), NRUNS)
+
+
+class TestJournal(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp = tempfile.mkdtemp(prefix='s6listgen_journal_')
+    self.path = os.path.join(self.tmp, 'runlist.txt.journal')
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp)
+
+  def test_key(self):
+    runJournal = journal.Journal(self.path, 'settings A')
+    runJournal.append([{'run' : '/data/10001.stage5.root', 'fullConfig' : 'x'}])
+    self.assertEqual(journal.Journal(self.path, 'settings A').records.keys(), ['/data/10001.stage5.root'])
+    self.assertEqual(journal.Journal(self.path, 'settings B').records, {})
+    #started over with the new key
+    self.assertEqual(json.loads(open(self.path).readline()), {'key' : 'settings B'})
+
+  def test_no_header(self):
+    #journals from before the header are started over
+    with open(self.path, 'w') as f:
+      f.write(json.dumps({'run' : '/data/10001.stage5.root', 'fullConfig' : 'x'}) + '\n')
+    self.assertEqual(journal.Journal(self.path, '').records, {})
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,44 @@
+'''
+Run ID parsing of stage5 paths (s6listgen.preflight).
+'''
+
+import os
+import sys
+import unittest
+
+from StringIO import StringIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from s6listgen import preflight
+
+
+class TestRunID(unittest.TestCase):
+
+  def test_conventions(self):
+    for path, runID in [('/data/64080.stage5.root', '64080'),
+                        ('/data/64080_s5.root\n', '64080'),
+                        ('/data/64080.stage5_rerun.root', '64080'),
+                        ('/data/Crab_64080.st5.root', '64080'),
+                        ('/data/100123.stage5.root', '100123')]:
+      self.assertEqual(preflight.get_run_id(path), runID)
+
+  def test_no_guessing(self):
+    for path in ['/data/bad_name.root', '/data/abc.stage5.root', '/data/64080.stage5.txt']:
+      self.assertEqual(preflight.parse_run_id(path), None)
+      self.assertRaises(ValueError, preflight.get_run_id, path)
+
+  def test_skip_unparsable(self):
+    stderr, sys.stderr = sys.stderr, StringIO()
+    try:
+      paths = list(preflight.skip_unparsable(['/data/64080.stage5.root', '/data/abc.stage5.root', '/data/64081.stage5.root']))
+      warnings = sys.stderr.getvalue().splitlines()
+    finally:
+      sys.stderr = stderr
+    self.assertEqual(paths, ['/data/64080.stage5.root', '/data/64081.stage5.root'])
+    self.assertEqual(len(warnings), 1)
+    self.assertTrue('/data/abc.stage5.root' in warnings[0])
+
+
+if __name__ == '__main__':
+  unittest.main()
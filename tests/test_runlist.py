@@ -0,0 +1,160 @@
+'''
+Runlist reading & the offline merge/split/filter tools (s6listgen.runlist, s6runlist.py).
+'''
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+from StringIO import StringIO
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from s6listgen import runlist
+
+
+RUNLIST = '''/data/64080.stage5.root
+/data/64081.stage5.root
+[EA ID: 0]
+/ea/ea_V6_ATM21.root
+[/EA ID: 0]
+[CONFIG ID: 0]
+S6A_RingSize 0.17
+[/CONFIG ID: 0]
+[RUNLIST ID: 1]
+/data/70001.stage5.root
+[/RUNLIST ID: 1]
+[EA ID: 1]
+/ea/ea_V6_ATM22.root
+[/EA ID: 1]
+[CONFIG ID: 1]
+[/CONFIG ID: 1]
+'''
+
+def read(text, name='test.txt'):
+  infile = StringIO(text)
+  infile.name = name
+  return runlist.read_runlist(infile)
+
+def group(runs, ea):
+  return runlist.RunlistGroup(['/data/%s.stage5.root' %(run) for run in runs], ['/ea/%s.root' %(ea)])
+
+
+class TestReadRunlist(unittest.TestCase):
+
+  def test_groups(self):
+    groups = read(RUNLIST)
+    self.assertEqual([g.run_ids() for g in groups], [['64080', '64081'], ['70001']])
+    self.assertEqual(groups[0].ea, ['/ea/ea_V6_ATM21.root'])
+    self.assertEqual(groups[0].config, ['S6A_RingSize 0.17'])
+    self.assertEqual(groups[1].config, [])
+
+  def test_round_trip(self):
+    out = StringIO()
+    self.assertEqual(runlist.write_runlist(read(RUNLIST), out), 2)
+    self.assertEqual(out.getvalue(), RUNLIST)
+
+  def test_untagged_after_first_block(self):
+    self.assertRaises(ValueError, read, RUNLIST + '/data/70002.stage5.root\n')
+    text = RUNLIST.replace('[/EA ID: 0]\n', '[/EA ID: 0]\n/data/70002.stage5.root\n')
+    self.assertRaises(ValueError, read, text)
+
+  def test_misplaced_tags(self):
+    self.assertRaises(ValueError, read, RUNLIST.replace('[/EA ID: 1]\n', ''))
+    self.assertRaises(ValueError, read, RUNLIST.replace('[/RUNLIST ID: 1]', '[/RUNLIST ID: 2]'))
+    self.assertRaises(ValueError, read, RUNLIST + '[EA ID: 2]\n')
+
+
+class TestMerge(unittest.TestCase):
+
+  def test_join(self):
+    merged = runlist.merge([[group([10001, 10002], 'a'), group([10003], 'b')], [group([10004, 10002], 'a')]])
+    self.assertEqual([g.run_ids() for g in merged], [['10001', '10002', '10004'], ['10003']])
+
+  def test_repeats_across_groups(self):
+    #a run keeps its first group, even when a later list has it under another EA
+    merged = runlist.merge([[group([10001, 10002], 'a')], [group([10002, 10003], 'b')]])
+    self.assertEqual([g.run_ids() for g in merged], [['10001', '10002'], ['10003']])
+    #same run in another directory
+    merged = runlist.merge([[group([10001], 'a')], [runlist.RunlistGroup(['/other/10001.stage5.root'], ['/ea/b.root'])]])
+    self.assertEqual([g.run_ids() for g in merged], [['10001'], []])
+
+  def test_keep_groups(self):
+    merged = runlist.merge([[group([10001, 10002], 'a')], [group([10002, 10003], 'a')]], join=False)
+    self.assertEqual([g.run_ids() for g in merged], [['10001', '10002'], ['10003']])
+
+  def test_empty_groups_skipped(self):
+    out = StringIO()
+    self.assertEqual(runlist.write_runlist([group([], 'a'), group([10001], 'b')], out), 1)
+    self.assertEqual(read(out.getvalue())[0].ea, ['/ea/b.root'])
+
+
+class TestFilter(unittest.TestCase):
+
+  def setUp(self):
+    self.groups = [group([10001, 10002], 'ea_V5'), group([10003], 'ea_V6')]
+
+  def test_runs(self):
+    kept = runlist.filter_groups(self.groups, runIDs=set(['10002', '10003']))
+    self.assertEqual([g.run_ids() for g in kept], [['10002'], ['10003']])
+    kept = runlist.filter_groups(self.groups, runIDs=set(['10003']), exclude=True)
+    self.assertEqual([g.run_ids() for g in kept], [['10001', '10002']])
+
+  def test_match_ea(self):
+    self.assertEqual([g.run_ids() for g in runlist.filter_groups(self.groups, match='1000[13]')], [['10001'], ['10003']])
+    self.assertEqual([g.run_ids() for g in runlist.filter_groups(self.groups, ea='V6')], [['10003']])
+
+
+class TestTemplate(unittest.TestCase):
+
+  def test_check_template(self):
+    runlist.check_template('group_{id}.txt')
+    runlist.check_template('group_{id:03d}.txt')
+    for template in ['group.txt', 'group_{}.txt', 'group_{id}_{cuts}.txt', 'group_{id.txt']:
+      self.assertRaises(ValueError, runlist.check_template, template)
+
+
+class TestCommandLine(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp = tempfile.mkdtemp(prefix='s6runlist_')
+    self.infile = os.path.join(self.tmp, 'in.txt')
+    with open(self.infile, 'w') as f:
+      f.write(RUNLIST)
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp)
+
+  def s6runlist(self, *argv):
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 's6runlist.py')] + list(argv),
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = process.communicate()
+    return process.returncode, err
+
+  def test_split(self):
+    #the template is filled in like s6RunlistGen.py --splitOut
+    status, err = self.s6runlist('split', self.infile, os.path.join(self.tmp, 'group_{id:02d}.txt'))
+    self.assertEqual(status, 0, err)
+    self.assertEqual(sorted(f for f in os.listdir(self.tmp) if f.startswith('group_')), ['group_00.txt', 'group_01.txt'])
+    self.assertEqual(runlist.read_runlist(os.path.join(self.tmp, 'group_01.txt'))[0].run_ids(), ['70001'])
+
+  def test_merge(self):
+    outfile = os.path.join(self.tmp, 'out.txt')
+    status, err = self.s6runlist('merge', outfile, self.infile, self.infile)
+    self.assertEqual(status, 0, err)
+    self.assertEqual(open(outfile).read(), RUNLIST)
+
+  def test_malformed(self):
+    with open(self.infile, 'a') as f:
+      f.write('/data/70002.stage5.root\n')
+    status, err = self.s6runlist('merge', os.path.join(self.tmp, 'out.txt'), self.infile)
+    self.assertEqual(status, 1)
+    self.assertTrue('untagged' in err, err)
+
+
+if __name__ == '__main__':
+  unittest.main()
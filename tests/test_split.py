@@ -0,0 +1,59 @@
+'''
+Splitting of oversized groups (s6listgen.split) for --maxGroupRuns and --maxGroupHours.
+'''
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from s6listgen import split
+
+
+class TestSplitRuns(unittest.TestCase):
+
+  def test_small_group_kept(self):
+    self.assertEqual(split.split_runs(['a', 'b'], 5), [['a', 'b']])
+
+  def test_balanced(self):
+    chunks = split.split_runs([str(n) for n in range(10)], 4)
+    self.assertEqual(sorted(len(chunk) for chunk in chunks), [3, 3, 4])
+    self.assertEqual(sum(chunks, []), [str(n) for n in range(10)])
+
+
+class TestSplitDurations(unittest.TestCase):
+
+  def test_short_group_kept(self):
+    self.assertEqual(split.split_durations(['a', 'b'], [1000., 1000.], 3600.), [['a', 'b']])
+
+  def test_balanced_in_order(self):
+    runs = ['a', 'b', 'c', 'd']
+    chunks = split.split_durations(runs, [1800., 1800., 1800., 1800.], 3600.)
+    self.assertEqual(chunks, [['a', 'c'], ['b', 'd']])
+
+  def test_unknown_duration(self):
+    #counted as a nominal run
+    chunks = split.split_durations(['a', 'b', 'c'], [None, None, None], split.RUN_DURATION*2)
+    self.assertEqual(sorted(len(chunk) for chunk in chunks), [1, 2])
+
+  def test_no_empty_chunks(self):
+    self.assertEqual(split.split_durations(['a', 'b', 'c'], [10000., 0., 0.], 3600.), [['a'], ['b', 'c']])
+    for chunk in split.split_durations(['a', 'b', 'c', 'd'], [20000., 0., 0., 0.], 3600.):
+      self.assertTrue(chunk)
+
+
+class TestGetDuration(unittest.TestCase):
+
+  def test_duration(self):
+    q_ver = '2012-01-01 03:00:00\t1\t2\t15\tobserving\t2012-01-01 03:30:00'
+    self.assertEqual(split.get_duration(q_ver), 1800.)
+
+  def test_unknown(self):
+    self.assertEqual(split.get_duration('FAILED'), None)
+    self.assertEqual(split.get_duration('2012-01-01 03:00:00\t1\t2\t15\tobserving'), None)
+    self.assertEqual(split.get_duration('2012-01-01 03:00:00\t1\t2\t15\tobserving\tNULL'), None)
+
+
+if __name__ == '__main__':
+  unittest.main()
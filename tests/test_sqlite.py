@@ -0,0 +1,233 @@
+'''
+Regression tests against a synthetic archive (bench/make_archive.py) read through the
+sqlite backend: parameterized queries, DATEDIFF, and the same runlist from every way of
+fetching & classifying the runs.
+'''
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+from StringIO import StringIO
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'bench'))
+sys.path.insert(0, ROOT)
+
+import make_archive
+
+import s6listgen
+
+from s6listgen import db, cli, snapshot
+from s6listgen.core import ListGen
+
+
+NRUNS = 600
+
+def run_main(argv):
+  '''cli.main without its progress messages & EA file warnings'''
+  stderr, sys.stderr = sys.stderr, StringIO()
+  try:
+    cli.main(argv)
+  finally:
+    sys.stderr = stderr
+
+def setUpModule():
+  global archive, stage5
+  archive = tempfile.mkdtemp(prefix='s6listgen_test_')
+  #missing runs give FAILED rows & default groups too
+  stage5 = make_archive.make_archive(archive, NRUNS, seed=1, missing=0.05)
+
+def tearDownModule():
+  shutil.rmtree(archive)
+
+
+class TestSQLiteBackend(unittest.TestCase):
+
+  def setUp(self):
+    self.backend = db.SQLiteBackend(archive)
+
+  def tearDown(self):
+    self.backend.close()
+
+  def test_params(self):
+    rows = self.backend.query("select run_id,config_mask from tblRun_Info where run_id=%s", 'VERITAS', ('10005',))
+    self.assertEqual(len(rows), 1)
+    self.assertTrue(rows[0].startswith('10005\t'))
+
+  def test_params_are_not_spliced(self):
+    #a value with quotes & SQL stays one literal
+    rows = self.backend.query("select run_id from tblRun_Info where run_id=%s", 'VERITAS', ("10005' or '1'='1",))
+    self.assertEqual(rows, [])
+    rows = self.backend.query("select %s", 'VERITAS', ("it's",))
+    self.assertEqual(rows, ["it's"])
+
+  def test_in_list(self):
+    runsobj = ListGen(self.backend)
+    execCMD, params = runsobj.get_offline_query(['10001', '10002', '10003'])
+    rows = self.backend.query(execCMD, 'VOFFLINE', params)
+    self.assertTrue(set(row.split('\t')[0] for row in rows) <= set(['10001', '10002', '10003']))
+
+  def test_datediff(self):
+    self.assertEqual(self.backend.query("select DATEDIFF(%s,%s)", 'VERITAS', ('2012-09-01 03:00:00', '2009-09-01')), ['1096'])
+    self.assertEqual(self.backend.query("select DATEDIFF(%s,%s)", 'VERITAS', ('2009-08-31', '2009-09-01')), ['-1'])
+    self.assertEqual(db.datediff(None, '2009-09-01'), None)
+
+  def test_veritas_query(self):
+    runsobj = ListGen(self.backend)
+    execCMD, params = runsobj.get_veritas_query('10005')
+    fields = runsobj.runSQL(execCMD, 'VERITAS', params).split('\t')
+    start = fields[0][:10]
+    self.assertEqual(int(fields[1]), db.datediff(start, runsobj.NA_date))
+    self.assertEqual(int(fields[2]), db.datediff(start, runsobj.UA_date))
+
+  def test_batch_matches_single(self):
+    runsobj = ListGen(self.backend)
+    runsobj.verbose = False
+    runIDs = [str(10000 + n) for n in range(0, NRUNS, 7)]
+    q_offline, q_ver = runsobj.query_runs(runIDs, chunkSize=16)
+    for runID in runIDs:
+      execCMD, params = runsobj.get_offline_query(runID)
+      self.assertEqual(q_offline[runID], runsobj.runSQL(execCMD, 'VOFFLINE', params))
+      execCMD, params = runsobj.get_veritas_query(runID)
+      self.assertEqual(q_ver[runID], runsobj.runSQL(execCMD, 'VERITAS', params))
+
+
+class TestATMCoverage(unittest.TestCase):
+  '''runs outside the ATM calendar are warned about once, per run or vectorized'''
+
+  def setUp(self):
+    self.tmp = tempfile.mkdtemp(prefix='s6listgen_cal_')
+    self.calendar = os.path.join(self.tmp, 'seasons.csv')
+    with open(self.calendar, 'w') as f:
+      f.write('2008-11-01,2009-04-01\n2009-11-01,2010-04-01\n')
+    self.runs = [line.strip() for line in open(stage5)]
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp)
+
+  def get_uncovered(self, vectorize):
+    runsobj = ListGen(db.SQLiteBackend(archive))
+    runsobj.verbose = False
+    runsobj.atm_calendar_file = self.calendar
+    stderr, sys.stderr = sys.stderr, StringIO()
+    try:
+      runsobj.classify_paths(self.runs, True, 100, vectorize)
+      uncovered = sorted(runsobj.atm_uncovered)
+      runsobj.report_atm_coverage()
+      warnings = [line for line in sys.stderr.getvalue().splitlines() if 'ATM calendar' in line]
+    finally:
+      sys.stderr = stderr
+      runsobj.backend.close()
+    self.assertEqual(runsobj.atm_uncovered, [])
+    return uncovered, warnings
+
+  def test_one_warning(self):
+    uncovered, warnings = self.get_uncovered(False)
+    self.assertTrue(len(uncovered) > 1)
+    self.assertEqual(len(warnings), 1)
+    self.assertTrue(warnings[0].startswith('WARNING: %d run(s) from %s to %s ' %(len(uncovered), uncovered[0], uncovered[-1])), warnings[0])
+
+  def test_vectorized(self):
+    self.assertEqual(self.get_uncovered(True), self.get_uncovered(False))
+
+
+class TestCalendarReload(unittest.TestCase):
+  '''a ListGen kept between requests (--serve) picks up edits to the ATM calendar'''
+
+  def setUp(self):
+    self.tmp = tempfile.mkdtemp(prefix='s6listgen_cal_')
+    self.calendar = os.path.join(self.tmp, 'seasons.csv')
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp)
+
+  def write_calendar(self, lines, mtime):
+    with open(self.calendar, 'w') as f:
+      f.write(lines)
+    os.utime(self.calendar, (mtime, mtime))
+
+  def test_edited_calendar(self):
+    parser, args = s6listgen.get_args({'dbBackend' : 'sqlite', 'dbDir' : archive, 'atmCalendar' : self.calendar})
+    runsobj = ListGen(db.SQLiteBackend(archive))
+    try:
+      self.write_calendar('2009-11-01,2010-04-01\n', 1e9)
+      cli.configure_classification(runsobj, args)
+      self.assertTrue(runsobj.get_atm_calendar().is_winter(datetime(2010, 1, 1)))
+
+      #same path, so only the modification time tells
+      self.write_calendar('2009-11-01,2009-12-01\n', 1e9 + 10)
+      cli.configure_classification(runsobj, args)
+      self.assertFalse(runsobj.get_atm_calendar().is_winter(datetime(2010, 1, 1)))
+
+      calendar = runsobj.get_atm_calendar()
+      cli.configure_classification(runsobj, args)
+      self.assertTrue(runsobj.get_atm_calendar() is calendar)
+    finally:
+      runsobj.backend.close()
+
+
+class TestSameRunlist(unittest.TestCase):
+  '''every fetch & classification mode writes the runlist of the plain per-run one'''
+
+  options = ['--dbBackend', 'sqlite', '--EAmatch']
+
+  def setUp(self):
+    self.tmp = tempfile.mkdtemp(prefix='s6listgen_out_')
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp)
+
+  def generate(self, name, *options):
+    outfile = os.path.join(self.tmp, name)
+    run_main([stage5, outfile, '--dbDir', archive] + self.options + list(options))
+    return open(outfile).read()
+
+  @classmethod
+  def setUpClass(cls):
+    tmp = tempfile.mkdtemp(prefix='s6listgen_ref_')
+    try:
+      outfile = os.path.join(tmp, 'reference.txt')
+      run_main([stage5, outfile, '--dbDir', archive] + cls.options)
+      cls.reference = open(outfile).read()
+    finally:
+      shutil.rmtree(tmp)
+
+  def test_reference(self):
+    self.assertTrue('[RUNLIST ID: 1]' in self.reference)
+    self.assertEqual(self.reference.count('.stage5.root'), NRUNS)
+
+  def test_batch(self):
+    self.assertEqual(self.generate('batch.txt', '--batch', '--batchSize', '50'), self.reference)
+
+  def test_vectorize(self):
+    self.assertEqual(self.generate('vectorize.txt', '--batch', '--vectorize'), self.reference)
+
+  def test_jobs(self):
+    self.assertEqual(self.generate('jobs.txt', '--batch', '--batchSize', '50', '--jobs', '4'), self.reference)
+
+  def test_shards(self):
+    partials = []
+    for i in range(3):
+      partials.append(os.path.join(self.tmp, 'part_%d.json' %(i)))
+      run_main([stage5, partials[-1], '--dbDir', archive, '--shard', '%d/3' %(i), '--batch'] + self.options)
+    outfile = os.path.join(self.tmp, 'merged.txt')
+    run_main(['-', outfile, '--mergeShards'] + partials[::-1] + self.options)
+    self.assertEqual(open(outfile).read(), self.reference)
+
+  def test_snapshot(self):
+    backend = db.SQLiteBackend(archive)
+    try:
+      info, comments = snapshot.query_tables(backend)
+    finally:
+      backend.close()
+    path = os.path.join(self.tmp, 'snapshot')
+    snapshot.write_snapshot(path, snapshot.build_columns(info, comments), 'sqlite %s' %(archive))
+    self.assertEqual(self.generate('snapshot.txt', '--snapshot', path, '--batch'), self.reference)
+
+
+if __name__ == '__main__':
+  unittest.main()
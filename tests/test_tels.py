@@ -0,0 +1,139 @@
+'''
+Telescope participation tables (s6listgen.tels) against the per-run string logic they
+replaced, and the vectorized classification against the per-run one on the edge masks.
+'''
+
+import os
+import sys
+import itertools
+import unittest
+
+from StringIO import StringIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from s6listgen import tels
+from s6listgen.core import ListGen
+
+
+#tel_cut_masks: no DQM info, every 4 bit value and values outside the mask range
+CUT_MASKS = ['NULL'] + [str(m) for m in range(16)] + ['16', '31', '-1']
+CONFIG_MASKS = range(16)
+
+
+#the original per-run string logic, kept as the reference
+def ref_combo(tel_config_mask):
+  if tel_config_mask == 0:
+    return '_1234'
+  return '_' + ''.join(str(t+1) if tel_config_mask >> t & 1 else '-' for t in range(4))
+
+def ref_dqm_combo(tel_cut_mask):
+  tel_cut_refs = [['1','2','3','4','5','6','7','NULL','0'],
+                  ['1','2','3','8','9','10','11','NULL','0'],
+                  ['1','4','5','8','9','12','13','NULL','0'],
+                  ['2','4','6','8','10','12','14','NULL','0']]
+  return '_' + ''.join(str(t+1) if str(tel_cut_mask) in ref else '-' for t, ref in enumerate(tel_cut_refs))
+
+def ref_reconcile(tel_cut_mask, tel_config_mask):
+  return ''.join(d if d == o else '-' for d, o in zip(ref_dqm_combo(tel_cut_mask), ref_combo(tel_config_mask)))
+
+
+class TestTelMaskTable(unittest.TestCase):
+
+  def setUp(self):
+    self.table = tels.TelMaskTable(4)
+
+  def test_observer(self):
+    for config in CONFIG_MASKS:
+      self.assertEqual(self.table.get_combo(config), ref_combo(config))
+
+  def test_dqm(self):
+    for cut in CUT_MASKS:
+      self.assertEqual(self.table.get_dqm_combo(cut), ref_dqm_combo(cut), cut)
+
+  def test_reconcile(self):
+    for cut, config in itertools.product(CUT_MASKS, CONFIG_MASKS):
+      self.assertEqual(self.table.reconcile(cut, config), ref_reconcile(cut, config), (cut, config))
+
+  def test_disagreement(self):
+    for cut, config in itertools.product(CUT_MASKS, CONFIG_MASKS):
+      dqm, obs = ref_dqm_combo(cut), ref_combo(config)
+      self.assertEqual(self.table.disagreement(cut, config), [t for t in range(1, 5) if dqm[t] != obs[t]], (cut, config))
+
+  def test_every_combination(self):
+    #each 2, 3 and 4 telescope combination, agreed on or left over after a disagreement
+    for ntels in [2, 3, 4]:
+      for members in itertools.combinations(range(4), ntels):
+        bits = sum(1 << t for t in members)
+        combo = '_' + ''.join(str(t+1) if t in members else '-' for t in range(4))
+        cut = str(sum(1 << (3-t) for t in range(4) if t not in members))
+        self.assertEqual(self.table.reconcile(cut, bits), combo)
+        self.assertEqual(self.table.reconcile('NULL', bits), combo)
+        self.assertEqual(self.table.reconcile(cut, 0), combo)
+        self.assertEqual(self.table.reconcile(cut, 15), combo)
+
+  def test_vectorized(self):
+    pairs = list(itertools.product(CUT_MASKS, CONFIG_MASKS))
+    cuts = [cut for cut, config in pairs]
+    configs = [config for cut, config in pairs]
+    self.assertEqual(list(self.table.reconcile_many(cuts, configs)), [ref_reconcile(cut, config) for cut, config in pairs])
+    #DQM alone, the observer where there's no DQM info
+    self.assertEqual(list(self.table.dqm_many(cuts, configs)),
+                     [ref_combo(config) if cut == 'NULL' else ref_dqm_combo(cut) for cut, config in pairs])
+
+
+class TestClassification(unittest.TestCase):
+  '''per-run (classify_run) and vectorized (classify_runs) agree on every mask & epoch edge'''
+
+  def get_rows(self):
+    q_offline = {}
+    q_ver = {}
+    runIDs = []
+    #run dates at the NA & UA boundaries, diffs as the DATEDIFF columns give them
+    dates = [('2009-07-31 03:00:00', -1, -1128), ('2009-08-01 03:00:00', 0, -1127),
+             ('2012-08-31 03:00:00', 1126, -1), ('2012-09-01 03:00:00', 1127, 0)]
+    for n, (cut, config, (start, diff_NA, diff_UA)) in enumerate(itertools.product(CUT_MASKS, CONFIG_MASKS, dates)):
+      runID = str(10000 + n)
+      runIDs.append(runID)
+      q_offline[runID] = '%s\tscience' %(cut)
+      q_ver[runID] = '%s\t%d\t%d\t%d\tobserving\t%s' %(start, diff_NA, diff_UA, config, start)
+    #runs missing from either database
+    runIDs += ['20000', '20001']
+    q_offline['20000'], q_ver['20000'] = 'FAILED', '2012-09-01 03:00:00\t1127\t0\t7\tobserving\tNULL'
+    q_offline['20001'], q_ver['20001'] = '3\tscience', 'FAILED'
+    return runIDs, q_offline, q_ver
+
+  def classify(self, dqm_tels):
+    runsobj = ListGen(backend=object())
+    runsobj.dqm_tels = dqm_tels
+    runIDs, q_offline, q_ver = self.get_rows()
+    stderr, sys.stderr = sys.stderr, StringIO()
+    try:
+      single = [runsobj.classify_run(runID, q_offline[runID], q_ver[runID]) for runID in runIDs]
+      vectorized = runsobj.classify_runs(runIDs, q_offline, q_ver)
+    finally:
+      sys.stderr = stderr
+    return runIDs, q_offline, q_ver, single, vectorized
+
+  def test_reconciled(self):
+    runIDs, q_offline, q_ver, single, vectorized = self.classify(False)
+    self.assertEqual(vectorized, single)
+    for runID, fullConfig in zip(runIDs, single):
+      if q_offline[runID] != 'FAILED' and q_ver[runID] != 'FAILED':
+        cut, config = q_offline[runID].split('\t')[0], int(q_ver[runID].split('\t')[3])
+        expected = ref_combo(config) if cut == 'NULL' else ref_reconcile(cut, config)
+        self.assertEqual('_' + fullConfig.split('_')[3], expected, (cut, config))
+
+  def test_dqm_tels(self):
+    runIDs, q_offline, q_ver, single, vectorized = self.classify(True)
+    self.assertEqual(vectorized, single)
+
+  def test_array_config(self):
+    runsobj = ListGen(backend=object())
+    for diff_NA, diff_UA, array in [(-1, -1128, 'V4_OldArray'), (0, -1127, 'V5_T1Move'),
+                                    (1126, -1, 'V5_T1Move'), (1127, 0, 'V6_PMTUpgrade')]:
+      self.assertEqual(runsobj.get_array_config('2012-01-01 03:00:00\t%d\t%d\t15\tobserving' %(diff_NA, diff_UA)), array)
+
+
+if __name__ == '__main__':
+  unittest.main()